@@ -0,0 +1,84 @@
+import argparse
+import math
+import sys
+from typing import Dict, List
+from benchmarks import fakes
+from trip_detector import TripDetector
+from trips.batch import detect_trips_batch
+
+# (points, gaps, no_fix) cases; gaps are 30 s to 15 min so some cross max_stop_duration
+CASES = (
+    (20000, 0, 0),
+    (20000, 0, 0.05),
+    (20000, 20, 0),
+    (86400, 40, 0.02),
+)
+
+def _differences(expected, actual, path='') -> List[str]:
+    """
+    Compare two trip values, allowing for float rounding in the summed distances
+
+    Returns:
+    - List of "path: expected != actual" descriptions
+    """
+    if isinstance(expected, dict) and isinstance(actual, dict):
+        problems = []
+        for key in sorted(set(expected) | set(actual), key=str):
+            if key not in expected or key not in actual:
+                problems.append(f"{path}.{key}: only in {'batch' if key in actual else 'detect_trips'}")
+            else:
+                problems.extend(_differences(expected[key], actual[key], f"{path}.{key}"))
+        return problems
+    if isinstance(expected, float) and isinstance(actual, (int, float)):
+        if math.isclose(expected, actual, rel_tol=1e-9, abs_tol=1e-6) or (math.isnan(expected) and math.isnan(actual)):
+            return []
+    elif expected == actual:
+        return []
+    return [f"{path}: {expected!r} != {actual!r}"]
+
+def compare(logs: List[Dict]) -> List[str]:
+    """
+    Detect trips in the same logs with both engines
+
+    Returns:
+    - List of differences, empty when the batch engine matches detect_trips
+    """
+    detector = TripDetector(collection=fakes.MemoryCollection(logs), persist=False)
+    expected = detector.detect_trips(use_cache=False)
+    actual = detect_trips_batch(logs)
+    if len(expected) != len(actual):
+        return [f"detect_trips found {len(expected)} trips, batch found {len(actual)}"]
+    problems = []
+    for number, (trip, batch_trip) in enumerate(zip(expected, actual), 1):
+        problems.extend(f"trip {number}{problem}" for problem in _differences(trip, batch_trip))
+    return problems
+
+def check_batch(seeds: int = 3):
+    """
+    Run every case over a few seeds of benchmarks.fakes.synthetic_logs
+
+    Returns:
+    - Number of cases where the engines disagree
+    """
+    failures = 0
+    for points, gaps, no_fix in CASES:
+        for seed in range(seeds):
+            logs = fakes.synthetic_logs(points, seed=seed, gaps=gaps, no_fix=no_fix)
+            problems = compare(logs)
+            status = 'MISMATCH' if problems else 'OK'
+            print(f"[{status}] {points} points, seed {seed}, {gaps} gaps, {no_fix:.0%} without fix: "
+                  f"{len(logs)} logs")
+            for problem in problems[:10]:
+                print(f"    {problem}")
+            failures += bool(problems)
+    return failures
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Check that detect_trips_batch finds the same trips as detect_trips')
+    parser.add_argument('--seeds', type=int, default=3, help='Seeds per case')
+    args = parser.parse_args()
+
+    failures = check_batch(args.seeds)
+    if failures:
+        print(f"[ERROR] detect_trips_batch disagrees with detect_trips in {failures} cases")
+        sys.exit(1)
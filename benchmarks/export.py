@@ -0,0 +1,70 @@
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta, UTC
+import numpy as np
+
+from trips.export import FORMATS, export_trips
+from trips.track import TripTrack, to_epoch_us
+
+def synthetic_trips(count=50, points=3600, seed=0):
+    """Trips shaped like detect_trips() output with 1 Hz tracks"""
+    rng = np.random.default_rng(seed)
+    trips = []
+    start = datetime(2025, 6, 1, 8, tzinfo=UTC)
+    for trip_id in range(1, count + 1):
+        t0 = to_epoch_us(start)
+        heading = np.cumsum(rng.normal(0, 0.05, points))
+        lats = 51 + np.cumsum(np.cos(heading)) * 1e-4
+        lons = np.cumsum(np.sin(heading)) * 1.6e-4
+        timestamps = t0 + np.arange(points, dtype=np.int64) * 1_000_000
+        end = start + timedelta(seconds=points - 1)
+        trips.append({
+            'trip_id': trip_id,
+            'start_time': start,
+            'end_time': end,
+            'duration_seconds': points - 1.0,
+            'total_distance_meters': points * 12.0,
+            'track': TripTrack.from_arrays(timestamps, lats, lons, np.full(points, 12.0))
+        })
+        start = end + timedelta(hours=1)
+    return trips
+
+def timed(function):
+    started = time.perf_counter()
+    function()
+    return time.perf_counter() - started
+
+def geodataframe_export(trips, output_dir):
+    """The existing TripDetector KML path (pandas, shapely, GeoDataFrame and GDAL)"""
+    from trip_detector import TripDetector
+    # Exporting needs no database connection, so skip __init__
+    detector = TripDetector.__new__(TripDetector)
+    return detector.export_all_trips_to_kml(trips, output_dir)
+
+if __name__ == '__main__':
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    workers = os.cpu_count()
+    trips = synthetic_trips(count)
+    print(f"{count} trips x {len(trips[0]['track'])} points, {workers} workers")
+    print(f"{'method':<44} {'seconds':>8} {'trips/s':>8}")
+
+    def report(name, seconds):
+        print(f"{name:<44} {seconds:>8.2f} {count / seconds:>8.1f}")
+
+    with tempfile.TemporaryDirectory() as output_dir:
+        try:
+            report('kml geodataframe (current)', timed(lambda: geodataframe_export(trips, output_dir)))
+        except ImportError as e:
+            print(f"{'kml geodataframe (current)':<44} {'skipped':>8}  ({e})")
+
+        for fmt in FORMATS:
+            report(f'{fmt} streaming, file per trip', timed(
+                lambda: export_trips(trips, output_dir, fmt)))
+            report(f'{fmt} streaming, file per trip, parallel', timed(
+                lambda: export_trips(trips, output_dir, fmt, workers=workers)))
+            report(f'{fmt} streaming, one file, parallel', timed(
+                lambda: export_trips(trips, output_dir, fmt, workers=workers, filename=f'all.{fmt}')))
+        report('kml streaming, one file, 5 m tolerance', timed(
+            lambda: export_trips(trips, output_dir, 'kml', 5, workers, filename='all_5m.kml')))
@@ -0,0 +1,411 @@
+"""
+Simulated hardware and services for benchmarks and desk testing.
+
+Each install_*() call swaps in one stand-in so the real device, logger and
+detector code runs unchanged:
+- install_i2c(): `board` and the Adafruit SHTC3, BMP5xx and LTR390 drivers
+- FakeGPSD: a gpsd server on localhost speaking the JSON protocol
+- install_elm327(): the `elm327://` serial port (see protocol_elm327.py)
+- install_mongo(): mongomock in place of pymongo.MongoClient (bulk_write included)
+- install_rabbitmq(): an in-memory pika.BlockingConnection (publish and consume)
+- MemoryCollection, BulkDatabase: logs to read and a bulk-write target without a query engine
+"""
+import inspect
+import json
+import math
+import socketserver
+import sys
+import threading
+import time
+import types
+from datetime import datetime, timedelta, UTC
+from typing import Dict, List
+
+# Simulated position: loops around Recife
+HOME = (-8.0476, -34.877)
+
+class Unsupported(Exception):
+    """A stand-in was asked for something it doesn't simulate"""
+
+def _diurnal(low: float, high: float, peak_hour: float = 14) -> float:
+    """Value following a daily sine wave that peaks at peak_hour (UTC-3)"""
+    hour = (time.time() / 3600 - 3) % 24
+    return low + (high - low) * (1 + math.cos((hour - peak_hour) / 24 * 2 * math.pi)) / 2
+
+# -------------------------
+# I2C sensors
+# -------------------------
+
+class FakeSHTC3:
+    def __init__(self, i2c):
+        pass
+
+    @property
+    def measurements(self):
+        return _diurnal(22, 31), _diurnal(85, 55)
+
+class FakeBMP5XX:
+    def __init__(self, i2c):
+        self.sea_level_pressure = 1013.25
+        self.data_ready = True
+
+    @property
+    def temperature(self):
+        return _diurnal(23, 33)
+
+    @property
+    def pressure(self):
+        return 1012 + math.sin(time.time() / 3600) * 2
+
+class FakeLTR390:
+    def __init__(self, i2c):
+        self.gain = None
+        self.resolution = None
+
+    @property
+    def light(self):
+        return int(_diurnal(0, 60000, 12))
+
+    @property
+    def lux(self):
+        return _diurnal(0, 100000, 12)
+
+    @property
+    def uvi(self):
+        return _diurnal(0, 12, 12)
+
+def _module(name: str, **attributes):
+    module = types.ModuleType(name)
+    module.__dict__.update(attributes)
+    sys.modules[name] = module
+    return module
+
+def install_i2c():
+    """Register fake `board` and Adafruit driver modules; call before creating the devices"""
+    _module('board', I2C=lambda: object())
+    _module('adafruit_shtc3', SHTC3=FakeSHTC3)
+    _module('adafruit_bmp5xx', BMP5XX_I2C=FakeBMP5XX)
+    _module('adafruit_ltr390', LTR390=FakeLTR390,
+            Gain=types.SimpleNamespace(GAIN_1X=0),
+            Resolution=types.SimpleNamespace(RESOLUTION_20BIT=0))
+
+# -------------------------
+# gpsd
+# -------------------------
+
+class _GPSDHandler(socketserver.StreamRequestHandler):
+    def write(self, packet: Dict):
+        self.wfile.write((json.dumps(packet) + '\n').encode())
+
+    def handle(self):
+        self.write({'class': 'VERSION', 'release': '3.22', 'proto_major': 3, 'proto_minor': 14})
+        for line in self.rfile:
+            command = line.decode().strip()
+            if command.startswith('?WATCH'):
+                self.write({'class': 'DEVICES', 'devices': [
+                    {'class': 'DEVICE', 'path': '/dev/ttyAMA0', 'driver': 'u-blox', 'bps': 9600}]})
+                self.write({'class': 'WATCH', 'enable': True, 'json': False})
+            elif command.startswith('?POLL'):
+                self.write(self.server.poll())
+
+class FakeGPSD(socketserver.ThreadingTCPServer):
+    """
+    gpsd on localhost answering ?POLL with a 3D fix that drives in a circle.
+
+    Usage:
+        with FakeGPSD() as gpsd_server:
+            gps = GPS(port=gpsd_server.port)
+    """
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, port: int = 0, speed: float = 12, radius: float = 1000):
+        """
+        Parameters:
+        - port: TCP port (0 picks a free one)
+        - speed: Vehicle speed in m/s
+        - radius: Radius of the driven circle in meters
+        """
+        super().__init__(('127.0.0.1', port), _GPSDHandler)
+        self.port = self.server_address[1]
+        self.speed = speed
+        self.radius = radius
+        self.thread = threading.Thread(target=self.serve_forever, daemon=True)
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.shutdown()
+        self.server_close()
+
+    def poll(self) -> Dict:
+        now = datetime.now(UTC)
+        angle = now.timestamp() * self.speed / self.radius
+        lat = HOME[0] + math.degrees(self.radius * math.sin(angle) / 6371000)
+        lon = HOME[1] + math.degrees(self.radius * math.cos(angle) / 6371000) / math.cos(math.radians(HOME[0]))
+        tpv = {
+            'class': 'TPV', 'mode': 3, 'time': now.isoformat(timespec='milliseconds').replace('+00:00', 'Z'),
+            'lat': lat, 'lon': lon, 'alt': 12.0 + 5 * math.sin(angle), 'speed': self.speed,
+            'track': (math.degrees(-angle) + 180) % 360, 'climb': 0.0,
+            'eps': 0.5, 'ept': 0.005, 'epx': 2.5, 'epy': 2.5, 'epv': 5.0
+        }
+        satellites = [{'PRN': prn, 'used': prn < 10} for prn in range(1, 13)]
+        return {'class': 'POLL', 'time': tpv['time'], 'active': 1,
+                'tpv': [tpv], 'sky': [{'class': 'SKY', 'satellites': satellites}]}
+
+# -------------------------
+# OBD-II adapter
+# -------------------------
+
+ELM327_URL = 'elm327://'
+
+def install_elm327():
+    """Make ELM327_URL open the simulated adapter in benchmarks/protocol_elm327.py"""
+    import serial
+    if 'benchmarks' not in serial.protocol_handler_packages:
+        serial.protocol_handler_packages.append('benchmarks')
+
+# -------------------------
+# MongoDB and RabbitMQ
+# -------------------------
+
+def install_mongo():
+    """
+    Route loggers.mongodb.MongoClient() to an in-memory mongomock server
+
+    Returns:
+    - False when mongomock isn't installed (a local mongod is used instead)
+    """
+    try:
+        import mongomock
+    except ImportError:
+        return False
+    import pymongo
+    _accept_bulk_sort(mongomock.collection.BulkOperationBuilder)
+    server = mongomock.MongoClient()
+    pymongo.MongoClient = lambda *args, **kwargs: server
+    return True
+
+def _accept_bulk_sort(builder):
+    """
+    Let mongomock's bulk_write take recent pymongo's ReplaceOne/UpdateOne
+
+    pymongo 4.11+ passes sort= to the bulk builder's add_replace and
+    add_update, which mongomock 4.3 doesn't accept. Nothing here sends a
+    sort with a bulk request, so it is dropped.
+    """
+    for name in ('add_replace', 'add_update'):
+        method = getattr(builder, name)
+        if getattr(method, 'accepts_sort', False) or 'sort' in inspect.signature(method).parameters:
+            continue
+
+        def accept_sort(self, *args, _method=method, sort=None, **kwargs):
+            return _method(self, *args, **kwargs)
+        accept_sort.accepts_sort = True
+        setattr(builder, name, accept_sort)
+
+class FakeChannel:
+    """
+    In-memory channel: publishing appends to broker[queue]; consuming
+    delivers up to the prefetch limit per process_data_events() and keeps
+    deliveries unacknowledged until acked, nacked or the channel closes
+    """
+
+    def __init__(self, broker):
+        self.broker = broker
+        self.prefetch = 0
+        self.consumers = []
+        self.unacked = {}  # delivery tag -> (queue, body)
+        self.next_tag = 1
+
+    def queue_declare(self, queue, **kwargs):
+        self.broker.setdefault(queue, [])
+
+    def basic_publish(self, exchange, routing_key, body, properties=None):
+        self.broker.setdefault(routing_key, []).append(body)
+
+    def basic_qos(self, prefetch_count=0, **kwargs):
+        self.prefetch = prefetch_count
+
+    def basic_consume(self, queue, on_message_callback, auto_ack=False, **kwargs):
+        self.consumers.append((queue, on_message_callback, auto_ack))
+
+    def deliver(self) -> int:
+        """Hand queued messages to the consumers; returns how many were delivered"""
+        delivered = 0
+        for queue, callback, auto_ack in self.consumers:
+            messages = self.broker.setdefault(queue, [])
+            while messages and (auto_ack or not self.prefetch or len(self.unacked) < self.prefetch):
+                body = messages.pop(0)
+                tag = self.next_tag
+                self.next_tag += 1
+                if not auto_ack:
+                    self.unacked[tag] = (queue, body)
+                method = types.SimpleNamespace(delivery_tag=tag, routing_key=queue, redelivered=False)
+                callback(self, method, None, body)
+                delivered += 1
+        return delivered
+
+    def _settle(self, delivery_tag, multiple, requeue):
+        tags = [tag for tag in self.unacked if tag <= delivery_tag] if multiple else [delivery_tag]
+        for tag in reversed(tags):
+            queue, body = self.unacked.pop(tag)
+            if requeue:
+                self.broker[queue].insert(0, body)
+
+    def basic_ack(self, delivery_tag=0, multiple=False):
+        self._settle(delivery_tag, multiple, requeue=False)
+
+    def basic_nack(self, delivery_tag=0, multiple=False, requeue=True):
+        self._settle(delivery_tag, multiple, requeue)
+
+    def basic_reject(self, delivery_tag=0, requeue=True):
+        self._settle(delivery_tag, False, requeue)
+
+    def close(self):
+        """Like a dropped connection: unacknowledged messages return to their queues"""
+        if self.unacked:
+            self._settle(max(self.unacked), True, requeue=True)
+
+class FakeBlockingConnection:
+    """pika.BlockingConnection that keeps published bodies in FakeBlockingConnection.queues"""
+
+    queues = {}
+
+    def __init__(self, parameters=None):
+        self.is_closed = False
+        self.channels = []
+
+    def channel(self):
+        channel = FakeChannel(self.queues)
+        self.channels.append(channel)
+        return channel
+
+    def process_data_events(self, time_limit=0):
+        if not sum(channel.deliver() for channel in self.channels) and time_limit:
+            time.sleep(time_limit)
+
+    def close(self):
+        for channel in self.channels:
+            channel.close()
+        self.is_closed = True
+
+def install_rabbitmq():
+    """Replace pika.BlockingConnection with FakeBlockingConnection"""
+    import pika
+    pika.BlockingConnection = FakeBlockingConnection
+
+# -------------------------
+# Stored logs
+# -------------------------
+
+class BulkCollection:
+    """
+    Collection keeping documents by _id that only takes ReplaceOne bulk writes
+
+    That is all ingest.IngestConsumer sends, and each upsert is a dict
+    store, so ingest timings cover the consumer; mongomock scans the whole
+    collection for every upsert.
+    """
+
+    def __init__(self):
+        self.documents = {}
+
+    def bulk_write(self, requests, ordered=True):
+        from pymongo import ReplaceOne
+
+        for request in requests:
+            if not isinstance(request, ReplaceOne) or set(request._filter) != {'_id'}:
+                raise Unsupported(f"BulkCollection only takes ReplaceOne by _id, not {request!r}")
+            self.documents[request._filter['_id']] = dict(request._doc, _id=request._filter['_id'])
+
+    def count_documents(self, query):
+        if query:
+            raise Unsupported("BulkCollection only counts every document")
+        return len(self.documents)
+
+class BulkDatabase(dict):
+    """Database of BulkCollections, created on first use"""
+
+    def __missing__(self, name):
+        self[name] = collection = BulkCollection()
+        return collection
+
+class _Cursor(list):
+    def sort(self, *args, **kwargs):
+        return self
+
+class _Database(dict):
+    def __missing__(self, name):
+        self[name] = collection = MemoryCollection([], self)
+        return collection
+
+class MemoryCollection:
+    """
+    Read-only logs collection over a list already sorted by timestamp
+
+    find() ignores the filter and returns every log, so detector timings
+    cover detection rather than a stand-in query engine.
+    """
+
+    def __init__(self, logs: List[Dict], database=None):
+        self.logs = logs
+        self.database = database if database is not None else _Database()
+
+    def find(self, query=None, projection=None):
+        return _Cursor(self.logs)
+
+    def create_indexes(self, models):
+        return []
+
+def synthetic_logs(points: int, seed: int = 0, gaps: int = 0, no_fix: float = 0) -> List[Dict]:
+    """
+    1 Hz GPS logs alternating between drives and parked periods
+
+    Parameters:
+    - points: Number of logs
+    - seed: Random seed
+    - gaps: Number of stretches (30 s to 15 min) with no logs at all
+    - no_fix: Fraction of logs without a GPS position
+
+    Returns:
+    - Logs sorted by timestamp with the fields trip detection reads
+    """
+    import numpy as np  # only the detector benchmarks need it
+
+    rng = np.random.default_rng(seed)
+    speeds = np.zeros(points)
+    position = 0
+    while position < points:
+        drive = min(int(rng.integers(300, 2400)), points - position)
+        parked = int(rng.integers(600, 7200))
+        speeds[position:position + drive] = np.clip(rng.normal(12, 4, drive), 0, 35)
+        position += drive + parked
+    heading = np.cumsum(rng.normal(0, 0.05, points))
+    drift = rng.normal(0, 1.5, (2, points))  # meters of GPS noise
+    north = np.cumsum(speeds * np.cos(heading)) + drift[0]
+    east = np.cumsum(speeds * np.sin(heading)) + drift[1]
+    lats = HOME[0] + np.degrees(north / 6371000)
+    lons = HOME[1] + np.degrees(east / 6371000) / math.cos(math.radians(HOME[0]))
+    altitudes = 10 + np.cumsum(rng.normal(0, 0.05, points))
+    start = datetime(2025, 1, 1, 6)
+    logs = [{
+        'timestamp': start + timedelta(seconds=i),
+        'gps_latitude': float(lats[i]),
+        'gps_longitude': float(lons[i]),
+        'gps_speed': float(speeds[i]),
+        'gps_altitude': float(altitudes[i])
+    } for i in range(points)]
+    # Extra draws come last so the default logs don't change
+    if no_fix:
+        for i in np.flatnonzero(rng.random(points) < no_fix):
+            logs[i].update(gps_latitude=None, gps_longitude=None, gps_speed=None, gps_altitude=None)
+    if gaps:
+        dropped = np.zeros(points, dtype=bool)
+        for first in rng.integers(0, points, gaps):
+            dropped[first:first + int(rng.integers(30, 900))] = True
+        logs = [log for log, drop in zip(logs, dropped) if not drop]
+    return logs
@@ -0,0 +1,91 @@
+"""
+pyserial URL handler for a simulated ELM327 adapter: `elm327://`
+
+python-OBD opens ports with serial.serial_for_url(), so USBOBD("elm327://")
+talks to this class through the real ELM327 driver and protocol parser.
+Register it with benchmarks.fakes.install_elm327().
+
+The adapter answers AT commands, reports CAN 11 bit / 500 kbaud
+(protocol 6) and serves speed and MAF for a car cruising at a varying
+speed. FUEL_RATE is not supported, like on most petrol cars, so the
+calculated fuel flow falls back to MAF.
+"""
+import math
+import time
+from serial.serialutil import SerialException, PortNotOpenError
+from serial.urlhandler.protocol_loop import Serial as LoopSerial
+
+ECU_HEADER = '7E8'
+
+# Mode 01 PIDs the simulated ECU supports, besides the PID listing commands
+SUPPORTED_PIDS = (0x0C, 0x0D, 0x10)
+
+def _pid_mask(first: int) -> bytes:
+    """Bit array answered to a PID listing command (PIDs first+1 .. first+32)"""
+    # Listing commands up to the highest supported PID are supported too
+    supported = set(SUPPORTED_PIDS) | set(range(0x20, max(SUPPORTED_PIDS), 0x20))
+    mask = sum(1 << (first + 32 - pid) for pid in supported if first < pid <= first + 32)
+    return mask.to_bytes(4, 'big')
+
+def _vehicle(now: float):
+    """Speed (kph), rpm and MAF (g/s) at a moment, varying over a 5 minute cycle"""
+    speed = 60 + 40 * math.sin(now / 300 * 2 * math.pi)
+    rpm = 800 + speed * 30
+    maf = 2 + speed * 0.12
+    return speed, rpm, maf
+
+class Serial(LoopSerial):
+    """Loop-back port whose writes are answered like an ELM327 on a CAN car"""
+
+    def __init__(self, *args, **kwargs):
+        self.command = bytearray()
+        super().__init__(*args, **kwargs)
+
+    def from_url(self, url):
+        if not url.lower().startswith('elm327://'):
+            raise SerialException(f'expected "elm327://", got {url!r}')
+
+    def write(self, data):
+        if not self.is_open:
+            raise PortNotOpenError()
+        for byte in bytes(data):
+            if byte == 0x0D:
+                self._answer(self.command.decode('ascii', 'ignore').strip().upper())
+                self.command.clear()
+            else:
+                self.command.append(byte)
+        return len(data)
+
+    def _answer(self, command: str):
+        lines = self.respond(command.replace(' ', ''))
+        self.queue.put(('\r'.join(lines) + '\r\r>').encode())
+
+    def respond(self, command: str):
+        """Response lines to one command, without the prompt"""
+        if command.startswith('AT'):
+            if command == 'ATZ':
+                return ['', 'ELM327 v1.5']
+            if command == 'ATRV':
+                return ['12.6V']
+            if command == 'ATDPN':
+                return ['A6']
+            return ['OK']
+        if not command.strip('\x7f'):
+            # Nonsense sent while detecting the baud rate
+            return ['?']
+        if len(command) != 4 or not command.startswith('01'):
+            return ['NO DATA']
+        pid = int(command[2:], 16)
+        speed, rpm, maf = _vehicle(time.time())
+        if pid % 0x20 == 0:
+            data = _pid_mask(pid)
+        elif pid == 0x0C:
+            data = int(rpm * 4).to_bytes(2, 'big')
+        elif pid == 0x0D:
+            data = bytes([int(speed)])
+        elif pid == 0x10:
+            data = int(maf * 100).to_bytes(2, 'big')
+        else:
+            return ['NO DATA']
+        payload = bytes([0x41, pid]) + data
+        return [' '.join([ECU_HEADER, f'{len(payload):02X}'] + [f'{b:02X}' for b in payload])]
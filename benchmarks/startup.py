@@ -0,0 +1,159 @@
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+# What each entry point does before it starts its main loop
+ENTRY_POINTS = {
+    'dashboard': 'import dashboard',
+    'sampler': 'import sampler; sampler.build_devices(); sampler.build_loggers()',
+    'trip_detector': 'import trip_detector'
+}
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BASELINE = os.path.join(ROOT, 'benchmarks', 'startup_baseline.json')
+
+# Allowed slowdown against the baseline before --check fails
+TOLERANCE = 0.25
+SLACK_SECONDS = 0.05
+
+HEAVY_MODULES = ('dash', 'dash_daq', 'plotly', 'pandas', 'geopandas', 'shapely', 'matplotlib', 'numpy')
+
+# Entry points that open devices and services at startup run against the
+# simulated hardware and services of benchmarks/fakes.py, so the numbers
+# don't depend on what is plugged in. The stand-ins (and pymongo, pika and
+# pyserial, which they patch) are set up before the clock starts.
+SIMULATED = ('dashboard', 'sampler')
+
+SIMULATION = '''
+from benchmarks import fakes
+fakes.install_i2c()
+fakes.install_elm327()
+fakes.install_rabbitmq()
+fakes.install_mongo()
+gpsd = fakes.FakeGPSD().__enter__()
+os.environ.pop('DASHBOARD_SHARED_FRAME', None)
+os.environ.update({
+    'SAMPLER_DEVICES': 'bmp581,ltr390,obd,shtc3,gps', 'ODB_PORT': fakes.ELM327_URL,
+    'GPSD_PORT': str(gpsd.port), 'RABBITMQ_HOST': 'localhost',
+    'RABBITMQ_USER': 'startup', 'RABBITMQ_PASSWORD': 'startup'
+})
+'''
+
+# Runs in a fresh interpreter; prints one JSON line and exits without
+# waiting for logger threads or hardware handles to shut down.
+CHILD = '''
+import json, os, resource, sys, time
+{setup}
+start = time.perf_counter()
+exec({statement!r})
+elapsed = time.perf_counter() - start
+print(json.dumps({{
+    'seconds': elapsed,
+    'max_rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    'modules': len(sys.modules),
+    'heavy': sorted(m for m in {heavy!r} if m in sys.modules)
+}}), flush=True)
+os._exit(0)
+'''
+
+def measure(name, runs=3):
+    """
+    Start an entry point in fresh interpreters and measure its startup
+
+    Returns:
+    - Dict with median startup seconds, median peak RSS (MB), module count
+      and heavy modules loaded, or with 'error' (last stderr line) when the
+      entry point failed to start
+    """
+    setup = SIMULATION if name in SIMULATED else ''
+    code = CHILD.format(setup=setup, statement=ENTRY_POINTS[name], heavy=HEAVY_MODULES)
+    samples = []
+    for _ in range(runs):
+        result = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, cwd=ROOT)
+        if result.returncode != 0:
+            lines = result.stderr.strip().splitlines() or [f"exit status {result.returncode}"]
+            return {'error': lines[-1]}
+        samples.append(json.loads(result.stdout.strip().splitlines()[-1]))
+    return {
+        'seconds': statistics.median(s['seconds'] for s in samples),
+        'max_rss_mb': statistics.median(s['max_rss_mb'] for s in samples),
+        'modules': samples[-1]['modules'],
+        'heavy': samples[-1]['heavy']
+    }
+
+def load_baseline(path=BASELINE):
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+def regressions(name, result, baseline, tolerance=TOLERANCE):
+    """
+    Compare one entry point with its baseline
+
+    Returns:
+    - List of problems, empty when within budget; an entry point that
+      failed to start or has no baseline is a problem too
+    """
+    if 'error' in result:
+        return [f"failed to start: {result['error']}"]
+    expected = baseline.get(name)
+    if expected is None:
+        return ["no baseline (record one with --update-baseline)"]
+    problems = []
+    budget = expected['seconds'] * (1 + tolerance) + SLACK_SECONDS
+    if result['seconds'] > budget:
+        problems.append(f"startup {result['seconds']:.2f}s over budget {budget:.2f}s "
+                        f"(baseline {expected['seconds']:.2f}s)")
+    if 'max_rss_mb' in expected:
+        rss_budget = expected['max_rss_mb'] * (1 + tolerance)
+        if result['max_rss_mb'] > rss_budget:
+            problems.append(f"peak RSS {result['max_rss_mb']:.1f} MB over budget {rss_budget:.1f} MB "
+                            f"(baseline {expected['max_rss_mb']:.1f} MB)")
+    new_heavy = sorted(set(result['heavy']) - set(expected['heavy']))
+    if new_heavy:
+        problems.append(f"now imports {', '.join(new_heavy)} at startup")
+    return problems
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Measure cold-start time of each entry point")
+    parser.add_argument('names', nargs='*', default=list(ENTRY_POINTS), help="entry points to measure")
+    parser.add_argument('--runs', type=int, default=3)
+    parser.add_argument('--check', action='store_true', help="exit 1 if an entry point regressed against the baseline")
+    parser.add_argument('--tolerance', type=float, default=TOLERANCE, help="allowed slowdown as a fraction")
+    parser.add_argument('--update-baseline', action='store_true', help="record these results as the new baseline")
+    args = parser.parse_args()
+
+    baseline = load_baseline()
+    results = {}
+    failed = False
+    print(f"{'entry point':<14} {'startup (s)':>12} {'baseline (s)':>13} {'peak RSS (MB)':>14} {'modules':>8}  heavy imports")
+    for name in args.names:
+        r = results[name] = measure(name, args.runs)
+        expected = baseline.get(name, {}).get('seconds')
+        expected = f"{expected:.2f}" if expected is not None else '-'
+        if 'error' in r:
+            print(f"{name:<14} {'-':>12} {expected:>13} {'-':>14} {'-':>8}  -")
+        else:
+            print(f"{name:<14} {r['seconds']:>12.2f} {expected:>13} {r['max_rss_mb']:>14.1f} {r['modules']:>8}  {', '.join(r['heavy']) or '-'}")
+        problems = regressions(name, r, baseline, args.tolerance)
+        if args.update_baseline and 'error' not in r:
+            # Only failing to start still counts when recording a new baseline
+            problems = []
+        for problem in problems:
+            print(f"[FAIL] {name}: {problem}")
+            failed = True
+
+    if args.update_baseline:
+        baseline.update({name: {'seconds': round(r['seconds'], 3), 'max_rss_mb': round(r['max_rss_mb'], 1),
+                                'heavy': r['heavy']}
+                         for name, r in results.items() if 'error' not in r})
+        with open(BASELINE, 'w') as f:
+            json.dump(baseline, f, indent=2, sort_keys=True)
+            f.write('\n')
+        print(f"[OK] Baseline written to {BASELINE}")
+    if args.check and failed:
+        sys.exit(1)
@@ -0,0 +1,322 @@
+import argparse
+import contextlib
+import json
+import logging
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+from datetime import date, datetime, timedelta, UTC
+from pymongo.errors import OperationFailure
+
+from benchmarks import fakes
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BASELINE = os.path.join(ROOT, 'benchmarks', 'suite_baseline.json')
+
+# Allowed slowdown against the baseline before --check fails
+TOLERANCE = 0.25
+
+DETECT_POINTS = (100_000, 1_000_000)
+
+def _metric(value, unit, better):
+    return {'value': value, 'unit': unit, 'better': better}
+
+def _percentile(samples, fraction):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+@contextlib.contextmanager
+def _quiet():
+    """Silence the per-write progress prints of the loggers"""
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        yield
+
+def _environment(gpsd_port):
+    os.environ.update({
+        'SAMPLER_DEVICES': 'bmp581,ltr390,obd,shtc3,gps',
+        'ODB_PORT': fakes.ELM327_URL,
+        'GPSD_PORT': str(gpsd_port),
+        'RABBITMQ_HOST': 'localhost',
+        'RABBITMQ_USER': 'benchmark',
+        'RABBITMQ_PASSWORD': 'benchmark'
+    })
+
+def bench_sampler(samples=2000):
+    """Sampling loop over every simulated device and the default processors, without sleeping"""
+    from sampler import Sampler, build_devices, build_processors
+
+    # Needs pyserial, so a missing one skips only this benchmark
+    fakes.install_elm327()
+    sampler = Sampler(build_devices(), processors=build_processors())
+    for device in sampler.devices:
+        if hasattr(device, 'wait_connected'):
+            # OBD connects in the background; time samples with it connected
+            device.wait_connected()
+    # python-OBD warns on every query of a PID the simulated car lacks
+    logging.getLogger('obd').setLevel(logging.ERROR)
+    latencies = []
+    started = time.perf_counter()
+    for _ in range(samples):
+        begin = time.perf_counter()
+        sampler.sample()
+        latencies.append(time.perf_counter() - begin)
+    elapsed = time.perf_counter() - started
+    for device in sampler.devices:
+        if hasattr(device, 'close'):
+            device.close()
+    return {
+        'sampler.samples_per_second': _metric(samples / elapsed, 'samples/s', 'higher'),
+        'sampler.latency_p50_ms': _metric(statistics.median(latencies) * 1000, 'ms', 'lower'),
+        'sampler.latency_p99_ms': _metric(_percentile(latencies, 0.99) * 1000, 'ms', 'lower')
+    }
+
+def _frames(count):
+    start = datetime(2025, 1, 1, 9, tzinfo=UTC)
+    for i in range(count):
+        yield {
+            'timestamp': start + timedelta(seconds=i),
+            'gps_latitude': fakes.HOME[0], 'gps_longitude': fakes.HOME[1], 'gps_speed': 12.5,
+            'shtc3_temperature': 27.1, 'shtc3_humidity': 71.3, 'bmp581_pressure': 1011.8,
+            'obd_speed': 45.0, 'obd_maf': 7.41, 'odometer_today': 12.3, 'trip_active': True
+        }
+
+def bench_loggers(writes=2000):
+    """Writes per second of each logger against the MongoDB and RabbitMQ stand-ins"""
+    from loggers.json import JSONLogger
+    from loggers.mongodb import MongoDBLogger
+    from loggers.rabbit_mq import RabbitMQLogger
+
+    results = {}
+    with tempfile.TemporaryDirectory() as directory, _quiet():
+        factories = {
+            'json': lambda: JSONLogger(os.path.join(directory, 'log.json')),
+            'mongodb': lambda: MongoDBLogger(enable_rabbitmq=False),
+            'mongodb_rabbitmq': lambda: MongoDBLogger(enable_rabbitmq=True),
+            'rabbitmq': lambda: RabbitMQLogger(sync_interval=3600)
+        }
+        for name, factory in factories.items():
+            logger = factory()
+            if name == 'rabbitmq':
+                logger._setup_rabbitmq()
+            frames = list(_frames(writes))
+            started = time.perf_counter()
+            for frame in frames:
+                logger.write(frame)
+            elapsed = time.perf_counter() - started
+            if hasattr(logger, 'collection'):
+                logger.collection.drop()
+            logger.close()
+            results[f'logger.{name}.writes_per_second'] = _metric(writes / elapsed, 'writes/s', 'higher')
+    return results
+
+def bench_detect_trips(sizes=DETECT_POINTS):
+    """
+    detect_trips (per-point state machine) and the batch engine over synthetic 1 Hz days
+
+    Both engines read the same preloaded logs through the detector, so
+    their timings include the same (small) MemoryCollection load, which
+    is also reported on its own.
+    """
+    from trip_detector import TripDetector
+
+    results = {}
+    for points in sizes:
+        logs = fakes.synthetic_logs(points)
+        # Explicit so the timings don't depend on VEHICLE_ID or on cache eviction
+        detector = TripDetector(collection=fakes.MemoryCollection(logs), persist=False,
+                                vehicle='benchmark', max_cached_days=0)
+        started = time.perf_counter()
+        list(detector.collection.find(detector._build_query(use_cache=False)).sort('timestamp', 1))
+        load = time.perf_counter() - started
+        started = time.perf_counter()
+        detector.detect_trips(use_cache=False)
+        serial = time.perf_counter() - started
+        started = time.perf_counter()
+        detector.detect_trips_batch()
+        batch = time.perf_counter() - started
+        results[f'detect_trips.{points}.load_seconds'] = _metric(load, 's', 'lower')
+        results[f'detect_trips.{points}.seconds'] = _metric(serial, 's', 'lower')
+        results[f'detect_trips_batch.{points}.seconds'] = _metric(batch, 's', 'lower')
+    return results
+
+def bench_replay(frames=20000):
+    """Full pipeline (default processors, MongoDB logger) fed by ReplayDevice as fast as possible"""
+    from devices.replay import ReplayDevice, replay
+    from loggers.mongodb import MongoDBLogger
+    from sampler import Sampler, build_processors
+
+    logs = fakes.synthetic_logs(frames)
+    with _quiet():
+        logger = MongoDBLogger(enable_rabbitmq=False)
+        device = ReplayDevice(logs, speed=None)
+        sampler = Sampler([device], [logger], processors=build_processors(), interval=0)
+        started = time.perf_counter()
+        replay(sampler, device)
+        elapsed = time.perf_counter() - started
+        logger.collection.drop()
+        logger.close()
+    return {'replay.frames_per_second': _metric(frames / elapsed, 'frames/s', 'higher')}
+
+def bench_ingest(messages=20000):
+    """Central ingest consumer draining synthetic uplink envelopes from the in-memory broker"""
+    from benchmarks.telemetry import Vehicle, day_documents, envelope
+    from ingest import IngestConsumer
+
+    queue = 'benchmark_ingest'
+    documents = day_documents(date(2025, 1, 6), Vehicle(), iso=True)[:messages]
+    fakes.FakeBlockingConnection.queues[queue] = [json.dumps(envelope(document)) for document in documents]
+    # Upserts are dict stores, so this times the consumer, not a stand-in MongoDB
+    db = fakes.BulkDatabase()
+    with _quiet():
+        consumer = IngestConsumer(db, queues=[queue], flush_interval=0)
+        consumer.connect()
+        started = time.perf_counter()
+        while fakes.FakeBlockingConnection.queues[queue] or consumer.pending:
+            consumer.poll(0)
+        elapsed = time.perf_counter() - started
+        consumer.close()
+    if db['logs'].count_documents({}) != len(documents):
+        raise RuntimeError(f"ingest stored {db['logs'].count_documents({})} of {len(documents)} documents")
+    return {'ingest.messages_per_second': _metric(len(documents) / elapsed, 'messages/s', 'higher')}
+
+def bench_dashboard(calls=50):
+    """Cost of the dashboard's one-second update callback reading a shared frame"""
+    from helpers.shared_frame import SharedFrame
+
+    name = f'benchmark_{os.getpid()}'
+    frame = SharedFrame.create(name)
+    os.environ['DASHBOARD_SHARED_FRAME'] = name
+    try:
+        frame.publish(next(_frames(1)))
+        import dashboard
+        # Five minutes of today's logs for the daily min/max figures
+        now = datetime.now(UTC)
+        for seconds, values in enumerate(_frames(300)):
+            values['timestamp'] = now - timedelta(seconds=seconds)
+            dashboard.stats.collection.insert_one(values)
+        latencies = []
+        for n in range(calls):
+            begin = time.perf_counter()
+            dashboard.update_output(n)
+            latencies.append(time.perf_counter() - begin)
+        dashboard.stats.collection.drop()
+    finally:
+        frame.close()
+    return {
+        'dashboard.callback_p50_ms': _metric(statistics.median(latencies) * 1000, 'ms', 'lower'),
+        'dashboard.callback_p99_ms': _metric(_percentile(latencies, 0.99) * 1000, 'ms', 'lower')
+    }
+
+BENCHMARKS = {
+    'sampler': bench_sampler,
+    'loggers': bench_loggers,
+    'detect_trips': bench_detect_trips,
+    'replay': bench_replay,
+    'ingest': bench_ingest,
+    'dashboard': bench_dashboard
+}
+
+def load_results(path):
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f).get('metrics', {})
+
+def regressions(metrics, baseline, tolerance=TOLERANCE):
+    """
+    Compare metrics with a previous run
+
+    Returns:
+    - List of problems, empty when every metric is within tolerance; a
+      metric with no baseline is a problem too
+    """
+    problems = []
+    for name, metric in metrics.items():
+        expected = baseline.get(name)
+        if expected is None:
+            problems.append(f"{name}: no baseline (record one with --update-baseline)")
+            continue
+        if metric['better'] == 'higher':
+            worse = metric['value'] < expected['value'] / (1 + tolerance)
+        else:
+            worse = metric['value'] > expected['value'] * (1 + tolerance)
+        if worse:
+            problems.append(f"{name}: {metric['value']:.4g} {metric['unit']} "
+                            f"(baseline {expected['value']:.4g})")
+    return problems
+
+def run(names, detect_points=DETECT_POINTS):
+    """
+    Run the named benchmarks against the simulated devices and services
+
+    Returns:
+    - Dict of metric name -> {value, unit, better}; benchmarks that cannot
+      run here (missing optional dependency) are reported and skipped
+    """
+    fakes.install_i2c()
+    fakes.install_rabbitmq()
+    if not fakes.install_mongo():
+        print("[WARN] mongomock not installed, using the local MongoDB server")
+
+    metrics = {}
+    with fakes.FakeGPSD() as gpsd_server:
+        _environment(gpsd_server.port)
+        for name in names:
+            started = time.perf_counter()
+            try:
+                if name == 'detect_trips':
+                    results = bench_detect_trips(detect_points)
+                else:
+                    results = BENCHMARKS[name]()
+            except (ImportError, fakes.Unsupported, NotImplementedError, OperationFailure) as e:
+                # Optional dependency missing, or a query the stand-in can't run
+                # (mongomock raises NotImplementedError for operators it lacks)
+                print(f"[SKIP] {name}: {e}")
+                continue
+            print(f"[OK] {name} in {time.perf_counter() - started:.1f}s")
+            metrics.update(results)
+    return metrics
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Benchmark the sampler, loggers, trip detector and dashboard "
+                                                 "against simulated hardware")
+    parser.add_argument('names', nargs='*', default=list(BENCHMARKS), help="benchmarks to run")
+    parser.add_argument('--points', type=float, nargs='+', default=DETECT_POINTS,
+                        help="synthetic log sizes for detect_trips (1e7 needs about 10 GB of RAM)")
+    parser.add_argument('--save', help="write the results to this JSON file")
+    parser.add_argument('--baseline', default=BASELINE, help="results to compare with")
+    parser.add_argument('--check', action='store_true', help="exit 1 if a metric regressed against the baseline")
+    parser.add_argument('--tolerance', type=float, default=TOLERANCE, help="allowed slowdown as a fraction")
+    parser.add_argument('--update-baseline', action='store_true', help="record these results as the new baseline")
+    args = parser.parse_args()
+
+    metrics = run(args.names, [int(points) for points in args.points])
+    baseline = load_results(args.baseline)
+
+    print(f"{'metric':<42} {'value':>12} {'baseline':>12}  unit")
+    for name, metric in metrics.items():
+        expected = baseline.get(name, {}).get('value')
+        expected = f"{expected:>12.4g}" if expected is not None else f"{'-':>12}"
+        print(f"{name:<42} {metric['value']:>12.4g} {expected}  {metric['unit']}")
+    # Recording a new baseline replaces the old one, so there is nothing to compare with
+    problems = [] if args.update_baseline else regressions(metrics, baseline, args.tolerance)
+    for problem in problems:
+        print(f"[FAIL] {problem}")
+
+    document = {
+        'created_at': datetime.now(UTC).isoformat(),
+        'python': platform.python_version(),
+        'machine': platform.machine(),
+        'node': platform.node(),
+        'metrics': metrics
+    }
+    for path in filter(None, [args.save, args.baseline if args.update_baseline else None]):
+        with open(path, 'w') as f:
+            json.dump(document, f, indent=2, sort_keys=True)
+            f.write('\n')
+        print(f"[OK] Results written to {path}")
+    if args.check and problems:
+        sys.exit(1)
@@ -0,0 +1,462 @@
+"""
+Synthetic telemetry for scale testing: months or years of 1 Hz logs in the
+document schema the sampler writes.
+
+Each local day is generated on its own from (seed, date), so days can be
+produced in any order and on any number of processes:
+- Weekdays drive to work and back, with an occasional evening errand;
+  weekends have a few drives to random places
+- Drives accelerate, cruise and stop at junctions; the OBD channels
+  (speed, MAF, derived fuel flow/economy) are only present while driving
+- Parked positions wander a few meters with GPS drift and speed noise
+- Temperature, humidity and pressure follow the season, the time of day
+  and day-to-day weather; light and UV follow the sun's elevation
+
+Usage:
+    python3 -m benchmarks.telemetry --start 2024-01-01 --days 365 --output mongodb --workers 4
+    python3 -m benchmarks.telemetry --days 30 --output jsonl --file month.json
+    python3 -m benchmarks.telemetry --days 7 --vehicles 50 --output uplink --file fleet.json
+"""
+import argparse
+import contextlib
+import json
+import math
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date, datetime, timedelta, UTC
+from typing import Dict, Iterator, List, Tuple
+from zoneinfo import ZoneInfo
+import numpy as np
+from helpers.fuel import AFR, FUEL_DENSITY, MIN_ECONOMY_SPEED_KPH
+from helpers.solar_position import sun_positions
+from helpers.vehicle import log_id
+
+EARTH_RADIUS_M = 6371000
+TIMEZONE = "America/Recife"
+HOME = (-8.0476, -34.877)
+
+# Days generated ahead of the one being written, per worker process
+JOBS_PER_WORKER = 2
+SEA_LEVEL_PRESSURE_HPA = 1013.25
+
+# Fields present in every document and only while the engine runs, with
+# the precision their sensors round to
+FIELDS = {
+    'gps_latitude': 5, 'gps_longitude': 5, 'gps_altitude': 0, 'gps_speed': 2, 'gps_climb': 2,
+    'gps_heading': 1, 'gps_satellites': 0,
+    'shtc3_temperature': 2, 'shtc3_humidity': 1, 'shtc3_dewpoint': 1,
+    'bmp581_temperature': 2, 'bmp581_pressure': 1, 'bmp581_altitude': 1,
+    'ltr390_ambient_light': 2, 'ltr390_lux': 2, 'ltr390_uv_index': 2,
+    'odometer_today': 2, 'trip_distance': 1, 'fuel_today_l': 3, 'fuel_trip_l': 3
+}
+ENGINE_FIELDS = {
+    'obd_speed': 2, 'obd_maf': 2, 'obd_fuel_flow': 2, 'obd_fuel_economy': 1
+}
+
+class Vehicle:
+    """Places a simulated vehicle drives between, fixed by its seed"""
+
+    def __init__(self, seed: int = 0, home: Tuple[float, float] = HOME, places: int = 12):
+        rng = np.random.default_rng(seed)
+        self.seed = seed
+        self.vehicle_id = f"sim-{seed}"
+        if seed:
+            # Each vehicle of a fleet lives in its own part of town
+            home = _offset(home, rng.uniform(0, 15000), rng.uniform(0, 360))
+        self.home = home
+        self.work = _offset(home, rng.uniform(4000, 12000), rng.uniform(0, 360))
+        self.places = [_offset(home, rng.uniform(1000, 20000), rng.uniform(0, 360)) for _ in range(places)]
+
+def _offset(origin: Tuple[float, float], distance: float, bearing: float) -> Tuple[float, float]:
+    north = distance * math.cos(math.radians(bearing))
+    east = distance * math.sin(math.radians(bearing))
+    return (origin[0] + math.degrees(north / EARTH_RADIUS_M),
+            origin[1] + math.degrees(east / EARTH_RADIUS_M) / math.cos(math.radians(origin[0])))
+
+def day_plan(day: date, vehicle: Vehicle, rng) -> List[Tuple[int, Tuple, Tuple]]:
+    """
+    Drives of one day as (departure second of the local day, origin, destination)
+
+    Every day ends at home, so consecutive days join up.
+    """
+    hour = 3600
+    plan = []
+    if day.weekday() < 5:
+        leave = int(rng.normal(7.5 * hour, 900))
+        back = int(rng.normal(17.75 * hour, 1800))
+        plan += [(leave, vehicle.home, vehicle.work), (back, vehicle.work, vehicle.home)]
+        if rng.random() < 0.35:
+            place = vehicle.places[rng.integers(len(vehicle.places))]
+            errand = int(rng.uniform(19 * hour, 20.5 * hour))
+            plan += [(errand, vehicle.home, place), (errand + int(rng.uniform(1200, 3600)), place, vehicle.home)]
+    else:
+        departure = int(rng.uniform(8 * hour, 11 * hour))
+        for _ in range(rng.integers(0, 3)):
+            place = vehicle.places[rng.integers(len(vehicle.places))]
+            stay = int(rng.uniform(1800, 3 * hour))
+            plan += [(departure, vehicle.home, place), (departure + 2400 + stay, place, vehicle.home)]
+            departure += 2400 + stay + int(rng.uniform(1800, 4 * hour))
+    return plan
+
+def speed_profile(distance: float, rng) -> np.ndarray:
+    """
+    Speed (m/s) for each second of a drive covering about `distance` meters
+
+    Cruises between junctions at varying speeds, accelerating and braking
+    at realistic rates and stopping at some junctions.
+    """
+    speeds = []
+    speed = 0.0
+    covered = 0.0
+    while covered < distance:
+        cruise = rng.uniform(8, 22) if distance - covered > 2000 else rng.uniform(6, 14)
+        segment = min(rng.uniform(300, 1500), distance - covered)
+        stop = rng.random() < 0.4 or distance - covered <= segment
+        travelled = 0.0
+        while travelled < segment:
+            braking = speed * speed / 4  # distance to stop at 2 m/s²
+            if stop and segment - travelled <= braking:
+                speed = max(speed - 2.0, 0.0)
+                if speed == 0:
+                    break
+            elif speed < cruise:
+                speed = min(speed + rng.uniform(1.2, 2.5), cruise)
+            else:
+                speed = cruise + rng.normal(0, 0.3)
+            speeds.append(speed)
+            travelled += speed
+        covered += max(travelled, 1.0)
+        if stop:
+            speeds.extend([0.0] * int(rng.uniform(10, 60)) if covered < distance else [0.0])
+            speed = 0.0
+    return np.array(speeds)
+
+def _drive_track(origin, destination, rng):
+    """Speeds, positions and headings of one drive along a gently curving road"""
+    north = math.radians(destination[0] - origin[0]) * EARTH_RADIUS_M
+    east = math.radians(destination[1] - origin[1]) * EARTH_RADIUS_M * math.cos(math.radians(origin[0]))
+    straight = math.hypot(north, east)
+    speeds = speed_profile(straight * 1.3, rng)
+    travelled = np.cumsum(speeds)
+    fraction = travelled / travelled[-1]
+    # Bend the path sideways so it isn't a straight line
+    bend = straight * rng.uniform(-0.15, 0.15) * np.sin(np.pi * fraction) \
+        + 60 * np.sin(fraction * rng.integers(2, 7) * 2 * np.pi)
+    unit_north, unit_east = north / straight, east / straight
+    y = fraction * north - bend * unit_east
+    x = fraction * east + bend * unit_north
+    lats = origin[0] + np.degrees(y / EARTH_RADIUS_M)
+    lons = origin[1] + np.degrees(x / EARTH_RADIUS_M) / math.cos(math.radians(origin[0]))
+    headings = np.degrees(np.arctan2(np.gradient(x), np.gradient(y))) % 360
+    return speeds, lats, lons, headings
+
+def _drift(rng, count: int, meters: float) -> np.ndarray:
+    """Slowly wandering GPS error (meters) with the given standard deviation"""
+    window = 60
+    noise = rng.normal(0, meters * math.sqrt(window), count + window - 1)
+    return np.convolve(noise, np.ones(window) / window, mode='valid')
+
+def _terrain(lats: np.ndarray, lons: np.ndarray) -> np.ndarray:
+    """Smooth ground elevation (m) so repeated routes climb the same hills"""
+    return 20 + 15 * np.sin(lats * 300) * np.cos(lons * 250) + 8 * np.sin(lons * 900)
+
+def day_columns(day: date, vehicle: Vehicle, timezone: str = TIMEZONE) -> Dict[str, np.ndarray]:
+    """
+    Every sensor column for one local day at 1 Hz
+
+    Returns:
+    - Dict of arrays: 't' (datetime64[s], UTC), 'engine' (bool) and one
+      array per FIELDS/ENGINE_FIELDS key (NaN where a field is absent)
+    """
+    rng = np.random.default_rng([vehicle.seed, day.toordinal()])
+    start = datetime.combine(day, datetime.min.time(), tzinfo=ZoneInfo(timezone)).astimezone(UTC)
+    count = int((datetime.combine(day + timedelta(days=1), datetime.min.time(), tzinfo=ZoneInfo(timezone))
+                 .astimezone(UTC) - start).total_seconds())
+    t = np.datetime64(start.replace(tzinfo=None), 's') + np.arange(count)
+    seconds = np.arange(count)
+
+    # Parked at home unless a drive says otherwise
+    lats = np.full(count, vehicle.home[0])
+    lons = np.full(count, vehicle.home[1])
+    speeds = np.zeros(count)
+    headings = np.zeros(count)
+    engine = np.zeros(count, dtype=bool)
+    position = 0
+    for departure, origin, destination in day_plan(day, vehicle, rng):
+        departure = max(departure, position)
+        if departure >= count:
+            break
+        drive_speeds, drive_lats, drive_lons, drive_headings = _drive_track(origin, destination, rng)
+        end = min(departure + len(drive_speeds), count)
+        span = slice(departure, end)
+        lats[span], lons[span] = drive_lats[:end - departure], drive_lons[:end - departure]
+        speeds[span], headings[span] = drive_speeds[:end - departure], drive_headings[:end - departure]
+        engine[span] = True
+        lats[end:], lons[end:] = drive_lats[end - departure - 1], drive_lons[end - departure - 1]
+        headings[end:] = drive_headings[end - departure - 1]
+        position = end
+
+    # GPS error: wandering a few meters, less while moving
+    error = np.where(engine, 1.5, 3.0)
+    lats = lats + np.degrees(_drift(rng, count, 1) * error / EARTH_RADIUS_M)
+    lons = lons + np.degrees(_drift(rng, count, 1) * error / EARTH_RADIUS_M) / math.cos(math.radians(vehicle.home[0]))
+    gps_speeds = np.where(engine, speeds + rng.normal(0, 0.1, count), np.abs(rng.normal(0, 0.15, count)))
+    gps_speeds = np.maximum(gps_speeds, 0)
+    altitudes = _terrain(lats, lons) + _drift(rng, count, 2)
+
+    # Weather: season, time of day and a random offset for the day
+    local_hour = (seconds / 3600) % 24
+    season = math.cos((day.timetuple().tm_yday - 15) / 365.25 * 2 * math.pi)
+    weather = rng.normal(0, 1.2)
+    temperature = 26 + 1.5 * season + weather + 4 * np.cos((local_hour - 14) / 24 * 2 * np.pi) \
+        + rng.normal(0, 0.05, count)
+    humidity = np.clip(75 - 3.5 * (temperature - 26) + rng.normal(0, 0.5, count), 20, 100)
+    gamma = np.log(humidity / 100) + 17.625 * temperature / (243.04 + temperature)
+    dew_point = 243.04 * gamma / (17.625 - gamma)
+    sea_level = SEA_LEVEL_PRESSURE_HPA + rng.normal(0, 3) + 1.2 * np.cos((local_hour - 10) / 12 * 2 * np.pi)
+    pressure = sea_level * (1 - altitudes / 44330) ** 5.255 + rng.normal(0, 0.05, count)
+    baro_altitude = 44330 * (1 - (pressure / SEA_LEVEL_PRESSURE_HPA) ** (1 / 5.255))
+
+    sun = sun_positions(t, lats, lons)
+    daylight = np.maximum(np.sin(np.radians(sun['elevation'])), 0)
+    clouds = rng.uniform(0.3, 1.0)
+    lux = 110000 * daylight * clouds * rng.uniform(0.9, 1.0, count)
+    uv_index = 13 * daylight ** 2.5 * clouds
+
+    # OBD channels while the engine runs
+    acceleration = np.gradient(speeds)
+    obd_speed = np.where(engine, speeds * 3.6, np.nan)
+    maf = np.where(engine, 2.2 + 0.11 * obd_speed + 4 * np.maximum(acceleration, 0) + rng.normal(0, 0.1, count), np.nan)
+    fuel_flow = maf / AFR / FUEL_DENSITY * 3600
+    economy = np.full(count, np.nan)
+    economical = obd_speed >= MIN_ECONOMY_SPEED_KPH
+    economy[economical] = fuel_flow[economical] / obd_speed[economical] * 100
+
+    # What the trips and fuel processors add
+    moved = np.where(engine, speeds, 0.0)
+    trip_start = np.maximum.accumulate(np.where(engine & ~np.roll(engine, 1), seconds, 0))
+    distance = np.cumsum(moved)
+    fuel = np.cumsum(np.nan_to_num(fuel_flow) / 3600)
+    trip_distance = np.where(engine, distance - distance[trip_start] + moved[trip_start], 0.0)
+    trip_fuel = np.where(engine, fuel - fuel[trip_start] + np.nan_to_num(fuel_flow[trip_start]) / 3600, 0.0)
+
+    return {
+        't': t, 'engine': engine,
+        'gps_latitude': lats, 'gps_longitude': lons, 'gps_altitude': altitudes,
+        'gps_speed': gps_speeds, 'gps_climb': np.gradient(altitudes), 'gps_heading': headings,
+        'gps_satellites': rng.integers(7, 13, count),
+        'shtc3_temperature': temperature, 'shtc3_humidity': humidity, 'shtc3_dewpoint': dew_point,
+        'bmp581_temperature': temperature + 1.5, 'bmp581_pressure': pressure, 'bmp581_altitude': baro_altitude,
+        'ltr390_ambient_light': lux * 0.6, 'ltr390_lux': lux, 'ltr390_uv_index': uv_index,
+        'odometer_today': distance / 1000, 'trip_distance': trip_distance,
+        'fuel_today_l': fuel, 'fuel_trip_l': trip_fuel,
+        'obd_speed': obd_speed, 'obd_maf': maf, 'obd_fuel_flow': fuel_flow, 'obd_fuel_economy': economy
+    }
+
+def _rounded(columns: Dict[str, np.ndarray], fields: Dict[str, int], rows) -> List[list]:
+    """Rounded column values as Python lists, None where a reading is missing (NaN)"""
+    lists = []
+    for key, precision in fields.items():
+        column = np.round(columns[key][rows], precision)
+        values = column.tolist()
+        if column.dtype.kind == 'f' and np.isnan(column).any():
+            values = [None if value != value else value for value in values]
+        lists.append(values)
+    return lists
+
+def day_documents(day: date, vehicle: Vehicle, iso: bool = False, timezone: str = TIMEZONE) -> List[Dict]:
+    """
+    One day of log documents, as MongoDBLogger (datetimes) or the
+    JSON/RabbitMQ loggers (ISO 8601 strings, iso=True) would write them
+    """
+    columns = day_columns(day, vehicle, timezone)
+    if iso:
+        stamps = np.datetime_as_string(columns['t'], unit='s', timezone='UTC').tolist()
+        stamps = [stamp.replace('Z', '+00:00') for stamp in stamps]
+    else:
+        # Aware datetimes, like the sampler's frames
+        stamps = [stamp.replace(tzinfo=UTC) for stamp in columns['t'].astype(datetime).tolist()]
+
+    keys = ('_id', 'timestamp', 'gps_timestamp', 'vehicle_id', 'trip_active') + tuple(FIELDS)
+    engine_keys = keys + tuple(ENGINE_FIELDS)
+    engine = columns['engine']
+    values = _rounded(columns, FIELDS, slice(None))
+    engine_values = iter(zip(*_rounded(columns, ENGINE_FIELDS, engine)))
+
+    vehicle = vehicle.vehicle_id
+    documents = []
+    for stamp, running, row in zip(stamps, engine.tolist(), zip(*values)):
+        _id = log_id(vehicle, stamp)
+        if running:
+            documents.append(dict(zip(engine_keys, (_id, stamp, stamp, vehicle, True) + row + next(engine_values))))
+        else:
+            documents.append(dict(zip(keys, (_id, stamp, stamp, vehicle, False) + row)))
+    return documents
+
+def envelope(document: Dict) -> Dict:
+    """RabbitMQLogger's uplink message around an ISO-timestamped document"""
+    return {'collection': 'logs', 'document': document, 'timestamp': document['timestamp'],
+            'vehicle_id': document['vehicle_id']}
+
+# -------------------------
+# Output
+# -------------------------
+
+class _Null:
+    """Stands in for a missing reading in day_json_lines; %r writes it as JSON null"""
+
+    def __repr__(self):
+        return 'null'
+
+NULL = _Null()
+
+def _template(keys, uplink: bool, vehicle_id: str, running: bool) -> str:
+    """
+    %-format string of one JSON line, laid out like json.dumps
+
+    _id and the timestamps take %s inside quotes (they need no escaping),
+    numbers take %r (float/int repr is what json.dumps writes), and the
+    vehicle ID and trip_active are the same on every line, so they are
+    written into the template.
+    """
+    constants = {'vehicle_id': json.dumps(vehicle_id).replace('%', '%%'),
+                 'trip_active': json.dumps(running)}
+    placeholders = {'_id': '"%s"', 'timestamp': '"%s"', 'gps_timestamp': '"%s"'}
+    document = '{' + ', '.join(f'{json.dumps(key)}: {constants.get(key) or placeholders.get(key, "%r")}'
+                               for key in keys) + '}'
+    if uplink:
+        # envelope(): the document, then its timestamp and vehicle_id again
+        return ('{"collection": "logs", "document": ' + document +
+                ', "timestamp": "%s", "vehicle_id": ' + constants['vehicle_id'] + '}\n')
+    return document + '\n'
+
+def day_json_lines(day: date, vehicle: Vehicle, uplink: bool = False, timezone: str = TIMEZONE) -> bytes:
+    """
+    One day as JSON lines, byte for byte json.dumps() of each
+    day_documents(iso=True) document (or of its envelope())
+
+    Each run of rows with the engine off or on is formatted from one
+    template in a single map(), so no dict is built or walked per document.
+    """
+    columns = day_columns(day, vehicle, timezone)
+    stamps = [stamp.replace('Z', '+00:00')
+              for stamp in np.datetime_as_string(columns['t'], unit='s', timezone='UTC').tolist()]
+    ids = [log_id(vehicle.vehicle_id, stamp) for stamp in stamps]
+    values = [[NULL if value is None else value for value in column] if None in column else column
+              for column in _rounded(columns, {**FIELDS, **ENGINE_FIELDS}, slice(None))]
+    keys = ('_id', 'timestamp', 'gps_timestamp', 'vehicle_id', 'trip_active') + tuple(FIELDS)
+    templates = {False: _template(keys, uplink, vehicle.vehicle_id, False),
+                 True: _template(keys + tuple(ENGINE_FIELDS), uplink, vehicle.vehicle_id, True)}
+
+    running = columns['engine']
+    edges = np.flatnonzero(np.diff(running.astype(np.int8))) + 1
+    lines = []
+    for first, last in zip(np.r_[0, edges].tolist(), np.r_[edges, len(stamps)].tolist()):
+        on = bool(running[first])
+        # The engine fields come last in values; parked rows leave them out
+        fields = values if on else values[:len(FIELDS)]
+        rows = [ids[first:last], stamps[first:last], stamps[first:last]]
+        rows += [column[first:last] for column in fields]
+        if uplink:
+            rows.append(stamps[first:last])
+        lines.extend(map(templates[on].__mod__, zip(*rows)))
+    return ''.join(lines).encode()
+
+def _insert_day(day: date, vehicle: Vehicle, batch_size: int) -> int:
+    from loggers.mongodb import MongoClient
+
+    client, _, collection = MongoClient()
+    documents = day_documents(day, vehicle)
+    for first in range(0, len(documents), batch_size):
+        # Unordered: the server may apply a batch in parallel
+        collection.insert_many(documents[first:first + batch_size], ordered=False)
+    client.close()
+    return len(documents)
+
+def _work(job):
+    output, day, seed, batch_size = job
+    vehicle = Vehicle(seed)
+    if output == 'mongodb':
+        return _insert_day(day, vehicle, batch_size)
+    return day_json_lines(day, vehicle, uplink=output == 'uplink')
+
+def _in_order(pool: ProcessPoolExecutor, jobs: Iterator[tuple], window: int) -> Iterator[tuple]:
+    """
+    (job, result) pairs in job order with at most `window` jobs in flight
+
+    pool.map would submit every day x vehicle job at once and hold each
+    finished day (tens of MB of JSON) until its turn; this only submits
+    the next job once the oldest result has been taken.
+    """
+    pending = deque()
+    for job in jobs:
+        pending.append((job, pool.submit(_work, job)))
+        if len(pending) >= window:
+            job, future = pending.popleft()
+            yield job, future.result()
+    while pending:
+        job, future = pending.popleft()
+        yield job, future.result()
+
+def generate(start: date, days: int, output: str, path: str = None, seed: int = 0,
+             workers: int = 1, batch_size: int = 10000, vehicles: int = 1) -> int:
+    """
+    Stream synthetic days to MongoDB or a JSON lines file
+
+    Parameters:
+    - start, days: First local day and number of days
+    - output: 'mongodb' (logs collection, as MongoDBLogger), 'jsonl'
+      (as JSONLogger) or 'uplink' (RabbitMQ envelopes, one per line)
+    - path: Output file for jsonl/uplink
+    - seed: Vehicle and randomness seed; the same seed gives the same data
+    - vehicles: Fleet size; vehicle n has seed + n and vehicle_id "sim-<seed + n>"
+    - workers: Processes generating (and inserting) days in parallel
+    - batch_size: Documents per insert_many
+
+    Returns:
+    - Number of documents written
+    """
+    jobs = ((output, start + timedelta(days=offset), seed + n, batch_size)
+            for offset in range(days) for n in range(vehicles))
+    total = 0
+    started = time.perf_counter()
+    out = open(path, 'wb') if output != 'mongodb' else None
+    try:
+        with contextlib.ExitStack() as stack:
+            if workers == 1:
+                # No pool: the days don't have to be copied between processes
+                results = ((job, _work(job)) for job in jobs)
+            else:
+                pool = stack.enter_context(ProcessPoolExecutor(max_workers=workers))
+                results = _in_order(pool, jobs, JOBS_PER_WORKER * workers)
+            for (_, day, vehicle_seed, _), result in results:
+                if out is not None:
+                    out.write(result)
+                    written = result.count(b'\n')
+                else:
+                    written = result
+                total += written
+                rate = total / (time.perf_counter() - started)
+                print(f"[OK] {day} sim-{vehicle_seed}: {written} documents ({rate:,.0f}/s overall)")
+    finally:
+        if out is not None:
+            out.close()
+    return total
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Generate synthetic telemetry in the logged document schema")
+    parser.add_argument('--start', type=date.fromisoformat, default=date(2025, 1, 1), help="first day (YYYY-MM-DD)")
+    parser.add_argument('--days', type=int, default=30)
+    parser.add_argument('--output', choices=('mongodb', 'jsonl', 'uplink'), default='jsonl')
+    parser.add_argument('--file', default='synthetic.json', help="output file for jsonl/uplink")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--vehicles', type=int, default=1, help="fleet size")
+    parser.add_argument('--workers', type=int, default=os.cpu_count())
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    total = generate(args.start, args.days, args.output, args.file, args.seed, args.workers, vehicles=args.vehicles)
+    elapsed = time.perf_counter() - started
+    print(f"[OK] {total} documents in {elapsed:.1f}s ({total / elapsed:,.0f}/s)")
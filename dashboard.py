@@ -1,16 +1,13 @@
 from dash import Dash, html, dcc, Input, Output, callback
 import dash_daq as daq
-import time
-import asyncio
 import threading
-from datetime import datetime, UTC
-from devices.bmp581 import BMP581
-from devices.ltr390 import LTR390
-from devices.usb_obd import USBOBD
-from devices.shtc3 import SHTC3
-from devices.gps import GPS
-#from loggers.mongodb import MongoDBLogger
-from loggers.rabbit_mq import RabbitMQLogger
+from sensors.bmp581.pressure import Pressure
+from sensors.ltr390.ambient_light import AmbientLight
+from sensors.shtc3.temperature import Temperature
+from sensors.shtc3.humidity import Humidity
+from loggers.mongodb import MongoDBLogger
+from helpers.shared_frame import SharedFrame
+from sampler import Sampler, build_devices, build_loggers, build_processors
 
 from sensors.calculated.odometer_today import OdometerToday
 from dotenv import load_dotenv
@@ -19,18 +16,38 @@ import os
 LOG_FILE = "dashboard_log.json"
 load_dotenv()
 
-bmp581 = BMP581(1019)
-ltr390 = LTR390()
-shtc3 = SHTC3()
-usb_gps = GPS()
-usb_odb = USBOBD(os.environ.get('ODB_PORT', 'ttyUSB0'))
+# When set, frames come from a separate `python sampler.py` process through
+# shared memory and this module only serves pages (e.g. under gunicorn).
+SHARED_FRAME = os.environ.get('DASHBOARD_SHARED_FRAME')
+
+# Display-only sensors; the sampler owns the hardware
+pressure_sensor = Pressure(None)
+ambient_light_sensor = AmbientLight(None)
+temperature_sensor = Temperature(None)
+humidity_sensor = Humidity(None)
 odometer_today = OdometerToday()
 
-devices = [bmp581, ltr390, usb_odb, shtc3, usb_gps]
-values = {}
+if SHARED_FRAME:
+    sampler = None
+else:
+    sampler = Sampler(build_devices(), build_loggers(), processors=build_processors())
+shared_frame = None
+
+# Read-only access for the daily min/max figures
+stats = MongoDBLogger(enable_rabbitmq=False)
+
+def current_values():
+    """Latest frame from the in-process sampler or the shared-memory segment"""
+    global shared_frame
+    if sampler is not None:
+        return sampler.values
+    if shared_frame is None:
+        try:
+            shared_frame = SharedFrame.attach(SHARED_FRAME)
+        except FileNotFoundError:
+            return {}
+    return shared_frame.latest()
 
-#logger = MongoDBLogger()
-logger = RabbitMQLogger()
 app = Dash()
 
 app.layout = html.Div(
@@ -42,10 +59,10 @@ app.layout = html.Div(
         "padding": "20px"
     },
     children=[
-        bmp581.sensor("bmp581_pressure").dashboard_gauge(),
-        ltr390.sensor("ltr390_ambient_light").dashboard_gauge(),
-        shtc3.sensor("shtc3_temperature").dashboard_gauge(),
-        shtc3.sensor("shtc3_humidity").dashboard_gauge(),
+        pressure_sensor.dashboard_gauge(),
+        ambient_light_sensor.dashboard_gauge(),
+        temperature_sensor.dashboard_gauge(),
+        humidity_sensor.dashboard_gauge(),
         odometer_today.dashboard_gauge(),
         dcc.Interval(
             id='interval-component',
@@ -67,13 +84,14 @@ app.layout = html.Div(
 )
 
 def update_output(n):
-    figure = shtc3.sensor("shtc3_temperature").figure(
+    values = current_values()
+    figure = temperature_sensor.figure(
         current=values.get("shtc3_temperature", 0),
-        daily_range=logger.daily_max_min("shtc3_temperature")[0]
+        daily_range=stats.daily_max_min("shtc3_temperature")[0]
     )
-    humidity = shtc3.sensor("shtc3_humidity").figure(
+    humidity = humidity_sensor.figure(
         current=values.get("shtc3_humidity", 0),
-        daily_range=logger.daily_max_min("shtc3_humidity")[0]
+        daily_range=stats.daily_max_min("shtc3_humidity")[0]
     )
     if 'bmp581_pressure' not in values:    
         pressure = '0' 
@@ -85,30 +103,20 @@ def update_output(n):
     else:
         light = f"{values['ltr390_lux']:.0f}"
 
-    return [figure, pressure, light, humidity, f"{odometer_today.value():0>6.2f}"]
+    # Kept up to date by the sampler's OnlineTripDetector, no database reads
+    odometer = values.get('odometer_today') or 0
 
-def read_sensors():
-    while True:
-        values["timestamp"] = datetime.now(UTC).replace(microsecond=0)
-        for device in devices:
-            if device.is_connected():
-                device.read()
-        time.sleep(1)
-        for device in devices:
-            values.update(device.values)
-        values["timestamp"] = values.get("gps_timestamp", values["timestamp"])        
-        logger.write(values)
+    return [figure, pressure, light, humidity, f"{odometer:0>6.2f}"]
 
-def run_async_loop(loop):
-    asyncio.set_event_loop(loop)
-    loop.run_forever(read_sensors())
+# WSGI entry point for production serving, e.g.
+# DASHBOARD_SHARED_FRAME=trip_telemetry gunicorn -w 4 -b 0.0.0.0:8050 dashboard:server
+server = app.server
 
 if __name__ == '__main__':
-    new_loop = asyncio.new_event_loop()
-    
-    # Start the async sensor reading in a separate thread
-    async_thread = threading.Thread(target=run_async_loop, args=(new_loop,))
-    async_thread.daemon = True # Allow the main program to exit even if this thread is running
-    async_thread.start()
+    if sampler is not None:
+        # Development mode: sample in a background thread of the Dash process
+        sampler_thread = threading.Thread(target=sampler.run)
+        sampler_thread.daemon = True # Allow the main program to exit even if this thread is running
+        sampler_thread.start()
 
     app.run(host='0.0.0.0', debug=True)
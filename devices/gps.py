@@ -8,13 +8,19 @@ from sensors.gps.time import Time
 from sensors.gps.climb import Climb
 from sensors.gps.satellites import Satellites
 from sensors.gps.heading import Heading
-from helpers.solar_position import SolarPosition
+from helpers.solar_position import SolarCache, SolarPosition
 
 class GPS(Device):
-    def __init__(self):
+    def __init__(self, solar_grid_degrees: float = 0.05, host: str = "127.0.0.1", port: int = 2947):
+        """
+        Parameters:
+        - solar_grid_degrees: Location grid of the sun position cache (see SolarCache)
+        - host, port: gpsd address
+        """
         super().__init__("GPS")
+        self.solar_cache = SolarCache(solar_grid_degrees, timezone="America/Recife")
         try:
-            gpsd.connect()
+            gpsd.connect(host, port)
             self.connected = True
         except:
             self.connected = False
@@ -36,15 +42,11 @@ class GPS(Device):
         self.report = gpsd.get_current()
         super().read()
 
-    def solar_position(self):
+    def solar_position(self) -> SolarPosition:
+        """Sun times for today at the current fix, from the per-day location cache"""
         if not self.report:
             return None
-        coords = {
-            'latitude': self.report.lat,
-            'longitude': self.report.lon
-        }
-        sp = SolarPosition(self.report.get_time(), coords, timezone="America/Recife")
-        return sp
+        return self.solar_cache.get(self.report.get_time(), self.report.lat, self.report.lon)
     
     def is_connected(self):
         return self.connected
\ No newline at end of file
@@ -0,0 +1,177 @@
+import argparse
+import heapq
+import json
+import os
+import signal
+import time
+from datetime import datetime, UTC
+from typing import Dict, Iterable, Iterator, Optional
+from devices.device import Device
+
+# Fields of a stored log that are not sensor readings
+SKIPPED_FIELDS = ('_id',)
+TIMESTAMP_FIELDS = ('timestamp', 'gps_timestamp')
+
+def _as_datetime(value):
+    """Stored timestamps are naive UTC datetimes (MongoDBLogger) or ISO strings (RabbitMQ/JSON loggers)"""
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value)
+    if isinstance(value, datetime) and value.tzinfo is None:
+        value = value.replace(tzinfo=UTC)
+    return value
+
+def json_logs(path: str) -> Iterator[Dict]:
+    """Logs written by JSONLogger, one JSON document per line"""
+    with open(path) as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+def mongo_logs(start: datetime = None, end: datetime = None, collection=None, vehicle: str = None) -> Iterator[Dict]:
+    """
+    One vehicle's logs (default: this vehicle) of a time range from MongoDB, oldest first
+
+    MongoDB sorts every string before every date, so the two timestamp
+    formats (see timestamp_range) are queried separately and merged.
+    """
+    from loggers.mongodb import MongoClient, timestamp_range
+
+    if collection is None:
+        _, _, collection = MongoClient()
+    start = start or datetime.min.replace(tzinfo=UTC)
+    end = end or datetime.now(UTC)
+    cursors = [collection.find(branch).sort('timestamp', 1)
+               for branch in timestamp_range(start, end, vehicle)['$or']]
+    return heapq.merge(*cursors, key=lambda log: _as_datetime(log['timestamp']))
+
+class ReplayDevice(Device):
+    """
+    Device that plays back recorded logs instead of reading hardware.
+
+    Each read() loads the next log into `values`, so a Sampler built with
+    this device runs the real processors, loggers and publishers on
+    recorded data. Frames are stamped with their recorded time. With a
+    speed factor, read() waits until the frame is due (10 = ten times
+    faster than recorded); with speed=None it never waits.
+    """
+
+    def __init__(self, logs: Iterable[Dict], speed: Optional[float] = 1.0):
+        """
+        Parameters:
+        - logs: Recorded logs sorted by timestamp (see json_logs, mongo_logs)
+        - speed: Playback speed-up factor, None for as fast as possible
+        """
+        super().__init__("Replay")
+        self.logs = iter(logs)
+        self.speed = speed
+        self.next_log = self._advance()
+        self.first_time = None
+        self.started = None
+        self.frames = 0
+
+    def _advance(self) -> Optional[Dict]:
+        for log in self.logs:
+            values = {key: value for key, value in log.items() if key not in SKIPPED_FIELDS}
+            for key in TIMESTAMP_FIELDS:
+                if values.get(key) is not None:
+                    values[key] = _as_datetime(values[key])
+            if not isinstance(values.get('timestamp'), datetime):
+                continue
+            # The sampler stamps frames with gps_timestamp when it has one
+            values['gps_timestamp'] = values.get('gps_timestamp') or values['timestamp']
+            return values
+        return None
+
+    def _wait(self, timestamp: datetime):
+        if self.first_time is None:
+            self.first_time = timestamp
+            self.started = time.monotonic()
+            return
+        due = self.started + (timestamp - self.first_time).total_seconds() / self.speed
+        delay = due - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+
+    def read(self):
+        if self.next_log is None:
+            return
+        if self.speed:
+            self._wait(self.next_log['timestamp'])
+        self.values = self.next_log
+        self.frames += 1
+        self.next_log = self._advance()
+
+    def is_connected(self):
+        return self.next_log is not None
+
+def replay(sampler, device: ReplayDevice) -> int:
+    """
+    Sample until the recording ends (or sampler.stop() is called)
+
+    Sampler.run() paces itself by its interval and keeps sampling after the
+    last log; this loop is paced by the replay device and stops at the end.
+
+    Returns:
+    - Number of frames replayed
+    """
+    sampler.running = True
+    while sampler.running and device.is_connected():
+        try:
+            sampler.sample()
+        except Exception as e:
+            print(f"[ERROR] Sample failed: {e}")
+    sampler.running = False
+    return device.frames
+
+def _timestamp(text: str) -> datetime:
+    return _as_datetime(datetime.fromisoformat(text))
+
+def main():
+    """
+    Replay a recorded day through the configured processors, loggers and dashboard frame
+
+    Configuration as for sampler.py (SAMPLER_LOGGERS, SAMPLER_PROCESSORS,
+    DASHBOARD_SHARED_FRAME). Don't log into the collection being replayed:
+    the recorded _id values already exist there.
+    """
+    from dotenv import load_dotenv
+    from sampler import Sampler, build_loggers, build_processors
+
+    parser = argparse.ArgumentParser(description="Replay recorded telemetry through the sampler pipeline")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument('--json', help="JSONLogger output file")
+    source.add_argument('--start', type=_timestamp, help="first MongoDB log to replay (ISO 8601, UTC if naive)")
+    parser.add_argument('--end', type=_timestamp, help="end of the MongoDB range (default: now)")
+    parser.add_argument('--vehicle', help="vehicle whose MongoDB logs are replayed (default: VEHICLE_ID)")
+    parser.add_argument('--speed', type=float, default=1.0, help="speed-up factor, 0 for as fast as possible")
+    args = parser.parse_args()
+    load_dotenv()
+
+    logs = json_logs(args.json) if args.json else mongo_logs(args.start, args.end, vehicle=args.vehicle)
+    device = ReplayDevice(logs, args.speed or None)
+
+    publishers = []
+    shared_frame_name = os.environ.get('DASHBOARD_SHARED_FRAME')
+    if shared_frame_name:
+        from helpers.shared_frame import SharedFrame
+        publishers.append(SharedFrame.create(shared_frame_name))
+
+    loggers = build_loggers()
+    sampler = Sampler([device], loggers, publishers=publishers, processors=build_processors(), interval=0)
+    signal.signal(signal.SIGTERM, lambda signum, frame: sampler.stop())
+
+    started = time.perf_counter()
+    try:
+        replay(sampler, device)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        for logger in loggers:
+            logger.close()
+        for publisher in publishers:
+            publisher.close()
+    elapsed = time.perf_counter() - started
+    print(f"[OK] Replayed {device.frames} frames in {elapsed:.1f}s ({device.frames / max(elapsed, 1e-9):.0f} frames/s)")
+
+if __name__ == '__main__':
+    main()
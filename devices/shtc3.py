@@ -1,7 +1,6 @@
 from devices.device import Device
 from sensors.shtc3.temperature import Temperature
 from sensors.shtc3.humidity import Humidity
-from sensors.shtc3.dew_point import DewPoint
 
 class SHTC3(Device):
     def __init__(self):
@@ -15,8 +14,7 @@ class SHTC3(Device):
         self.values = {}
         self.sensors = [
             Temperature(self.device),
-            Humidity(self.device),
-            DewPoint(self.device)
+            Humidity(self.device)
         ]
 
     def is_connected(self):
@@ -9,22 +9,61 @@
 # ENGINE_LOAD
 
 
+import threading
 from devices.device import Device
-from obd import OBD
-from sensors.obd.speed import Speed
 
 class USBOBD(Device):
-    def __init__(self, port):
+    def __init__(self, port, background: bool = False):
+        """
+        Parameters:
+        - port: Serial port (or pyserial URL) of the ELM327 adapter
+        - background: Connect on a thread started by the first
+          is_connected(), so building the device doesn't wait for
+          python-OBD's import (pint, NumPy) or the adapter handshake;
+          the device reads as disconnected until the connection is up
+        """
         super().__init__("OBD")
-        self.obd = OBD(port, fast=False)
+        self.port = port
+        self.obd = None
+        self.connect_thread = None
+        if not background:
+            self._connect()
+
+    def _connect(self):
+        # python-OBD pulls in pint and NumPy, so it is only imported here
+        from obd import OBD
+        from sensors.obd.speed import Speed
+        from sensors.obd.maf import MAF
+        from sensors.obd.fuel_rate import FuelRate
+
+        connection = OBD(self.port, fast=False)
+        # Fuel flow and economy are derived by the sampler's calculated sensors
         self.sensors = [
-            Speed(self)
+            Speed(self),
+            MAF(self),
+            FuelRate(self)
         ]
+        self.obd = connection
+
+    def wait_connected(self, timeout: float = None) -> bool:
+        """Start a background connection if needed and wait for it to finish"""
+        self.is_connected()
+        if self.connect_thread is not None:
+            self.connect_thread.join(timeout)
+        return self.is_connected()
 
     def close(self):
-        self.obd.close()
+        if self.connect_thread is not None:
+            self.connect_thread.join()
+        if self.obd is not None:
+            self.obd.close()
 
     def is_connected(self):
+        if self.obd is None:
+            if self.connect_thread is None:
+                self.connect_thread = threading.Thread(target=self._connect, daemon=True)
+                self.connect_thread.start()
+            return False
         return self.obd.is_connected()
     
     def supported_commands(self):
@@ -0,0 +1,134 @@
+import sys
+from datetime import datetime, timedelta, UTC
+from loggers.mongodb import MongoClient, MongoDBLogger, ensure_indexes
+from helpers.vehicle import vehicle_id, log_id
+from trip_detector import TripDetector
+from trips.spatial import radius_query, box_query
+from trips.store import TripStore
+
+# Scratch database so the check never touches logged data
+CHECK_DATABASE = 'pi_i2c_logger_plan_check'
+
+def _seed(db):
+    """Insert a few representative documents so the planner has something to plan for"""
+    now = datetime.now(UTC).replace(microsecond=0)
+    docs = []
+    for i in range(50):
+        timestamp = now - timedelta(seconds=i)
+        # Two vehicles, so the plans have to use the vehicle prefix
+        vehicle = vehicle_id() if i % 3 else 'other'
+        doc = {
+            '_id': log_id(vehicle, timestamp),
+            'vehicle_id': vehicle,
+            'timestamp': timestamp if i % 2 else timestamp.isoformat(),
+            'shtc3_temperature': 20 + i / 10,
+            'shtc3_humidity': 60 - i / 10
+        }
+        if i % 5:
+            doc.update({
+                'gps_latitude': -8.05 + i / 10000,
+                'gps_longitude': -34.9 + i / 10000,
+                'gps_speed': i % 10
+            })
+        docs.append(doc)
+    db['logs'].insert_many(docs)
+    db['trips'].insert_one({'_id': {'vehicle_id': vehicle_id(), 'start_time': now},
+                            'vehicle_id': vehicle_id(), 'start_time': now, 'end_time': now})
+    db['rabbitmq_queue'].insert_one({'message': {}, 'created_at': now, 'log_id': now})
+
+def production_queries(db):
+    """
+    Build every indexed production query against the given database
+
+    Returns:
+    - List of (name, explain callable) tuples
+    """
+    logs = db['logs']
+    detector = TripDetector(collection=logs, persist=False)
+    store = TripStore(db)
+    start, end = datetime.now(UTC) - timedelta(days=1), datetime.now(UTC)
+
+    def explain_find(query, sort_key):
+        return lambda: logs.find(query).sort(sort_key, 1).explain()
+
+    def explain_aggregate(collection, pipeline):
+        return lambda: db.command('aggregate', collection, pipeline=pipeline, explain=True)
+
+    queries = [
+        ('TripDetector.detect_trips (range)',
+         explain_find(detector._build_query(start, end, use_cache=False), 'timestamp')),
+        ('TripDetector.detect_trips (no range)',
+         explain_find(detector._build_query(use_cache=False), 'timestamp')),
+    ]
+    detector.last_processed_timestamp = start
+    queries.append(('TripDetector.detect_trips (incremental)',
+                    explain_find(detector._build_query(start, end), 'timestamp')))
+    queries.append(('MongoDBLogger.daily_max_min',
+                    explain_aggregate('logs', MongoDBLogger.daily_max_min_pipeline('shtc3_temperature'))))
+    queries.append(('TripStore.find_trips',
+                    lambda: store.trips.find(dict(store.scope, start_time={'$gte': start, '$lte': end}))
+                                           .sort('start_time', 1).explain()))
+    queries.append(('TripStore.trips_near (endpoint)',
+                    lambda: store.trips.find(dict(radius_query(-8.05, -34.9, 500), **store.scope)).explain()))
+    queries.append(('TripStore.trips_near (route)',
+                    lambda: store.trips.find(dict(radius_query(-8.05, -34.9, 500, 'route'), **store.scope)).explain()))
+    queries.append(('TripStore.trips_in_box',
+                    lambda: store.trips.find(dict(box_query(-8.1, -34.95, -8.0, -34.85, 'start'), **store.scope)).explain()))
+    queries.append(('TripStore.frequent_places',
+                    lambda: store.places.find(dict(store.scope, visits={'$gte': 2})).sort('visits', -1).limit(10).explain()))
+    queries.append(('RabbitMQLogger._sync_queue',
+                    lambda: db['rabbitmq_queue'].find().sort('created_at', 1).limit(100).explain()))
+    return queries
+
+def _winning_plans(explain):
+    """Yield every winningPlan found anywhere in an explain document"""
+    if isinstance(explain, dict):
+        for key, value in explain.items():
+            if key == 'winningPlan':
+                yield value
+            else:
+                yield from _winning_plans(value)
+    elif isinstance(explain, list):
+        for value in explain:
+            yield from _winning_plans(value)
+
+def _stages(plan):
+    """Yield every stage name in a plan tree"""
+    if isinstance(plan, dict):
+        if 'stage' in plan:
+            yield plan['stage']
+        for value in plan.values():
+            yield from _stages(value)
+    elif isinstance(plan, list):
+        for value in plan:
+            yield from _stages(value)
+
+def check_query_plans():
+    """
+    Explain each production query against a scratch database on the local mongod
+
+    Returns:
+    - List of names of queries whose winning plan contains a COLLSCAN
+    """
+    client, db, _ = MongoClient(database=CHECK_DATABASE)
+    client.drop_database(CHECK_DATABASE)
+    try:
+        ensure_indexes(db)
+        _seed(db)
+        failures = []
+        for name, explain in production_queries(db):
+            stages = [stage for plan in _winning_plans(explain()) for stage in _stages(plan)]
+            status = 'COLLSCAN' if 'COLLSCAN' in stages else 'OK'
+            print(f"[{status}] {name}: {' > '.join(stages)}")
+            if status != 'OK':
+                failures.append(name)
+        return failures
+    finally:
+        client.drop_database(CHECK_DATABASE)
+        client.close()
+
+if __name__ == '__main__':
+    failures = check_query_plans()
+    if failures:
+        print(f"[ERROR] {len(failures)} queries fall back to a collection scan")
+        sys.exit(1)
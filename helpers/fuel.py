@@ -0,0 +1,143 @@
+from datetime import datetime, UTC
+from typing import Dict, Optional
+from helpers.today import Today
+
+AFR = 14.7          # Stoichiometric air-fuel ratio for gasoline
+FUEL_DENSITY = 745  # g/L
+
+# Below this speed L/100km is meaningless (idling gives infinity)
+MIN_ECONOMY_SPEED_KPH = 3
+
+# Longer gaps between samples are not integrated (logger was off)
+MAX_GAP_SECONDS = 5
+
+def fuel_flow_lph(fuel_rate: Optional[float], maf: Optional[float]) -> Optional[float]:
+    """
+    Instantaneous fuel flow in L/h
+
+    Parameters:
+    - fuel_rate: OBD FUEL_RATE (L/h), used when the vehicle reports it
+    - maf: OBD MAF air flow (g/s), converted with AFR and FUEL_DENSITY otherwise
+    """
+    if fuel_rate is not None:
+        return fuel_rate
+    if maf is not None:
+        return maf / AFR / FUEL_DENSITY * 3600
+    return None
+
+def fuel_economy(flow_lph: Optional[float], speed_kph: Optional[float]) -> Optional[float]:
+    """Instantaneous consumption in L/100km, None when stopped or unknown"""
+    if flow_lph is None or speed_kph is None or speed_kph < MIN_ECONOMY_SPEED_KPH:
+        return None
+    return flow_lph / speed_kph * 100
+
+def litres(flow_lph: Optional[float], seconds: float) -> float:
+    """Fuel used over one sample interval (0 for unknown flow or long gaps)"""
+    if flow_lph is None or seconds <= 0 or seconds > MAX_GAP_SECONDS:
+        return 0.0
+    return flow_lph * seconds / 3600
+
+class FuelTotals:
+    """
+    Sampler processor keeping running fuel totals for today and the current trip.
+
+    Reads obd_fuel_flow from the `calculated` processor (see
+    sensors.calculated.fuel_flow) and trip_active from the `trips`
+    processor, so list it after both.
+    """
+
+    # Fields written into every frame by process()
+    KEYS = ('fuel_today_l', 'fuel_trip_l', 'fuel_trip_l_per_100km')
+
+    def __init__(self):
+        self.day_start = None
+        self.day_end = None
+        self.today = 0.0
+        self.trip = 0.0
+        self.last_time = None
+
+    def _roll_day(self, timestamp: datetime):
+        if timestamp.tzinfo is None:
+            timestamp = timestamp.replace(tzinfo=UTC)
+        if self.day_start is not None and self.day_start <= timestamp < self.day_end:
+            return
+        self.day_start, self.day_end = Today.day_range_for(timestamp)
+        self.today = 0.0
+
+    def update(self, frame: Dict) -> float:
+        """
+        Integrate one frame
+
+        Returns:
+        - Litres used since the previous frame
+        """
+        timestamp = frame.get('timestamp')
+        if not isinstance(timestamp, datetime):
+            return 0.0
+        seconds = (timestamp - self.last_time).total_seconds() if self.last_time else 0
+        self.last_time = timestamp
+        self._roll_day(timestamp)
+
+        used = litres(frame.get('obd_fuel_flow'), seconds)
+        self.today += used
+        if frame.get('trip_active'):
+            self.trip += used
+        else:
+            self.trip = 0.0
+        return used
+
+    def process(self, values: Dict):
+        """Sampler processor hook: update totals and add the fuel fields to the frame"""
+        self.update(values)
+        trip_distance = values.get('trip_distance') or 0
+        values['fuel_today_l'] = round(self.today, 3)
+        values['fuel_trip_l'] = round(self.trip, 3)
+        values['fuel_trip_l_per_100km'] = (round(self.trip / trip_distance * 100_000, 2)
+                                           if trip_distance > 0 else None)
+
+def fuel_history(logs) -> Dict:
+    """
+    The same fuel math vectorized over logged frames
+
+    Parameters:
+    - logs: Logs sorted by timestamp with obd_fuel_rate/obd_maf and obd_speed
+
+    Returns:
+    - Dict of NumPy arrays: 'flow_lph' and 'economy' (L/100km) per log
+      (NaN when unknown) and 'litres' used up to each log
+    """
+    import numpy as np
+    from trips.batch import epoch_us
+
+    def column(key):
+        return np.array([np.nan if log.get(key) is None else log[key] for log in logs], dtype=np.float64)
+
+    fuel_rate, maf, speed = column('obd_fuel_rate'), column('obd_maf'), column('obd_speed')
+    flow = np.where(np.isnan(fuel_rate), maf / AFR / FUEL_DENSITY * 3600, fuel_rate)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        economy = np.where(speed >= MIN_ECONOMY_SPEED_KPH, flow / speed * 100, np.nan)
+
+    used = np.zeros(len(logs))
+    if len(logs) > 1:
+        seconds = np.diff(epoch_us([log['timestamp'] for log in logs])) / 1e6
+        step = np.where((seconds > 0) & (seconds <= MAX_GAP_SECONDS), flow[1:] * seconds / 3600, 0)
+        used[1:] = np.cumsum(np.nan_to_num(step))
+    return {'flow_lph': flow, 'economy': economy, 'litres': used}
+
+# Fields fuel_used() needs from each log
+FUEL_FIELDS = ('timestamp', 'obd_fuel_rate', 'obd_maf', 'obd_speed')
+
+def fuel_used(collection, start: datetime, end: datetime, vehicle: str = None) -> float:
+    """
+    Litres one vehicle (default: this one) used between two times, from the logged OBD channels
+
+    Works for a stored trip (its start_time/end_time) or a day (Today.day_range_for)
+    """
+    from loggers.mongodb import vehicle_filter
+
+    query = {**vehicle_filter(vehicle), 'timestamp': {'$gte': start, '$lte': end}}
+    projection = {field: 1 for field in FUEL_FIELDS}
+    logs = list(collection.find(query, projection).sort('timestamp', 1))
+    if not logs:
+        return 0.0
+    return float(fuel_history(logs)['litres'][-1])
@@ -0,0 +1,136 @@
+import pickle
+import struct
+import time
+from multiprocessing import shared_memory, resource_tracker
+
+class SharedFrame:
+    """
+    Latest sensor frame plus a short history in a shared-memory ring buffer.
+
+    One writer (the sampler) publishes frames; any number of reader processes
+    (dashboard workers) attach by name and read without talking to the writer.
+
+    Layout:
+    - header: sequence number of the newest frame, history length, slot size
+    - history slots: frame sequence number, payload length, pickled frame
+
+    Readers check the slot's sequence number before and after copying the
+    payload and retry if the writer touched the slot in between.
+    """
+
+    HEADER = struct.Struct('<QII')
+    SLOT_HEADER = struct.Struct('<QI')
+
+    def __init__(self, shm, history, slot_size, owner):
+        self.shm = shm
+        self.history = history
+        self.slot_size = slot_size
+        self.owner = owner
+        self.buf = shm.buf
+
+    @classmethod
+    def create(cls, name, history=300, slot_size=4096):
+        """
+        Create a new segment (writer side)
+
+        Parameters:
+        - name: Segment name shared with the readers
+        - history: Number of frames kept
+        - slot_size: Maximum pickled size of one frame in bytes
+        """
+        size = cls.HEADER.size + history * slot_size
+        try:
+            shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+        except FileExistsError:
+            # Left behind by a sampler that did not shut down cleanly
+            stale = shared_memory.SharedMemory(name=name)
+            stale.close()
+            stale.unlink()
+            shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+        shm.buf[:size] = bytes(size)
+        cls.HEADER.pack_into(shm.buf, 0, 0, history, slot_size)
+        return cls(shm, history, slot_size, owner=True)
+
+    @classmethod
+    def attach(cls, name):
+        """Attach to an existing segment (reader side)"""
+        shm = shared_memory.SharedMemory(name=name)
+        # The resource tracker would unlink the segment when this reader exits
+        resource_tracker.unregister(shm._name, 'shared_memory')
+        _, history, slot_size = cls.HEADER.unpack_from(shm.buf, 0)
+        return cls(shm, history, slot_size, owner=False)
+
+    def _slot_offset(self, seq):
+        return self.HEADER.size + ((seq - 1) % self.history) * self.slot_size
+
+    def publish(self, frame):
+        """Write a frame into the next slot and make it the latest one"""
+        payload = pickle.dumps(frame, protocol=pickle.HIGHEST_PROTOCOL)
+        max_payload = self.slot_size - self.SLOT_HEADER.size
+        if len(payload) > max_payload:
+            raise ValueError(f"Frame is {len(payload)} bytes, slot holds {max_payload}")
+
+        seq = self.sequence() + 1
+        offset = self._slot_offset(seq)
+        data_offset = offset + self.SLOT_HEADER.size
+
+        # Invalidate the slot, write the payload, then publish it
+        self.SLOT_HEADER.pack_into(self.buf, offset, 0, 0)
+        self.buf[data_offset:data_offset + len(payload)] = payload
+        self.SLOT_HEADER.pack_into(self.buf, offset, seq, len(payload))
+        struct.pack_into('<Q', self.buf, 0, seq)
+
+    def sequence(self):
+        """Sequence number of the newest frame (0 before the first publish)"""
+        return struct.unpack_from('<Q', self.buf, 0)[0]
+
+    def _read_slot(self, seq):
+        """Return the frame with the given sequence number, or None if it was overwritten"""
+        offset = self._slot_offset(seq)
+        slot_seq, length = self.SLOT_HEADER.unpack_from(self.buf, offset)
+        if slot_seq != seq:
+            return None
+        data_offset = offset + self.SLOT_HEADER.size
+        payload = bytes(self.buf[data_offset:data_offset + length])
+        if self.SLOT_HEADER.unpack_from(self.buf, offset)[0] != seq:
+            return None
+        return pickle.loads(payload)
+
+    def latest(self, retries=3):
+        """
+        Return the newest frame
+
+        Returns:
+        - Frame dict, or an empty dict if nothing was published yet
+        """
+        for _ in range(retries):
+            seq = self.sequence()
+            if seq == 0:
+                return {}
+            frame = self._read_slot(seq)
+            if frame is not None:
+                return frame
+            time.sleep(0)
+        return {}
+
+    def recent(self, count=None):
+        """
+        Return up to `count` recent frames, oldest first
+
+        Frames overwritten while reading are skipped.
+        """
+        newest = self.sequence()
+        count = self.history if count is None else min(count, self.history)
+        frames = []
+        for seq in range(max(1, newest - count + 1), newest + 1):
+            frame = self._read_slot(seq)
+            if frame is not None:
+                frames.append(frame)
+        return frames
+
+    def close(self):
+        """Detach from the segment; the writer also removes it"""
+        self.buf = None
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
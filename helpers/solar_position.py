@@ -1,7 +1,7 @@
-from datetime import datetime, timedelta, date
+from datetime import datetime, timedelta
 from zoneinfo import ZoneInfo
 import math
-from functools import lru_cache
+from collections import OrderedDict
 
 
 class SolarPosition:
@@ -356,29 +356,143 @@ class SolarPosition:
 
 
 # -------------------------
-# Convenience factory function with caching
+# Vectorized API
 # -------------------------
 
-@lru_cache(maxsize=128)
-def get_solar_position(date_key: tuple, lat: float, lon: float, timezone: str) -> SolarPosition:
+def sun_positions(timestamps, latitudes, longitudes) -> dict:
     """
-    Cached factory function for SolarPosition
-    
+    Sun position for arrays of times and places in one NumPy pass
+
+    Same NOAA equations as SolarPosition.get_sun_position, evaluated in UTC
+    (the scalar version takes the fractional year from local time, which
+    moves the elevation by up to about 0.1 degrees). Azimuths also agree
+    at night, where the scalar hour angle can fall outside -180..180.
+
     Parameters:
-    - date_key: tuple of (year, month, day) for caching
-    - lat: latitude
-    - lon: longitude
-    - timezone: timezone string
-    
+    - timestamps: datetime64 array, int64 microseconds since the epoch, or
+      a sequence of datetimes (aware, or naive UTC as MongoDB returns them)
+    - latitudes, longitudes: Degrees; arrays of the same length or scalars
+
     Returns:
-    - SolarPosition instance
-    
-    Usage:
-        from datetime import date
-        coords = {'latitude': -8.0476, 'longitude': -34.877}
-        date_key = (2025, 10, 13)
-        solar = get_solar_position(date_key, coords['latitude'], coords['longitude'], 'America/Recife')
+    - Dictionary of arrays:
+        - 'elevation', 'azimuth', 'zenith': Degrees, as in get_sun_position
+        - 'daylight': Sun above the sunrise/sunset angle
+        - 'twilight': Between the civil twilight and sunrise/sunset angles
     """
-    date_obj = date(*date_key)
-    coordinates = {'latitude': lat, 'longitude': lon}
-    return SolarPosition(date_obj, coordinates, timezone)
\ No newline at end of file
+    import numpy as np
+
+    times = np.asarray(timestamps)
+    if times.dtype == object:
+        epoch = datetime(1970, 1, 1)
+        times = np.array([
+            (t.astimezone(ZoneInfo('UTC')).replace(tzinfo=None) if t.tzinfo else t) - epoch
+            for t in times
+        ], dtype='timedelta64[us]').astype(np.int64)
+    times = times.astype('datetime64[us]')
+    lat = np.radians(np.asarray(latitudes, dtype=np.float64))
+    lon = np.asarray(longitudes, dtype=np.float64)
+
+    days = times.astype('datetime64[D]')
+    doy = (days - times.astype('datetime64[Y]').astype('datetime64[D]')).astype(np.int64) + 1
+    minutes = (times - days).astype(np.int64) / 60e6
+
+    # Fractional year, equation of time (minutes) and declination (radians)
+    g = SolarPosition.TWO_PI * (doy - 1 + (minutes / 60 - 12) / 24) / 365.0
+    eq_time = 229.18 * (0.000075 + 0.001868 * np.cos(g) - 0.032077 * np.sin(g)
+                        - 0.014615 * np.cos(2 * g) - 0.040849 * np.sin(2 * g))
+    decl = (0.006918 - 0.399912 * np.cos(g) + 0.070257 * np.sin(g)
+            - 0.006758 * np.cos(2 * g) + 0.000907 * np.sin(2 * g)
+            - 0.002697 * np.cos(3 * g) + 0.00148 * np.sin(3 * g))
+
+    # Hour angle wrapped to -180..180 degrees so the afternoon test below also
+    # holds near midnight
+    hour_angle_deg = ((minutes + eq_time + 4 * lon) / 4.0) % 360.0 - 180.0
+    hour_angle = np.radians(hour_angle_deg)
+    sin_elevation = np.sin(lat) * np.sin(decl) + np.cos(lat) * np.cos(decl) * np.cos(hour_angle)
+    elevation_rad = np.arcsin(np.clip(sin_elevation, -1, 1))
+    elevation = np.degrees(elevation_rad)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        cos_azimuth = (np.sin(decl) - np.sin(lat) * sin_elevation) / (np.cos(lat) * np.cos(elevation_rad))
+    azimuth = np.degrees(np.arccos(np.clip(np.nan_to_num(cos_azimuth, nan=1.0), -1, 1)))
+    azimuth = np.where(hour_angle_deg > 0, 360 - azimuth, azimuth)
+
+    rise_set = 90 - SolarPosition.RISE_SET_ANGLE
+    civil = 90 - SolarPosition.CIVIL_TWILIGHT_ANGLE
+    return {
+        'elevation': elevation,
+        'azimuth': azimuth,
+        'zenith': 90 - elevation,
+        'daylight': elevation >= rise_set,
+        'twilight': (elevation < rise_set) & (elevation >= civil)
+    }
+
+
+# -------------------------
+# Per-day cache on a location grid
+# -------------------------
+
+class SolarCache:
+    """
+    SolarPosition instances per local day and quantized location, with LRU eviction.
+
+    Positions are snapped to the center of a grid cell, so a moving vehicle
+    reuses one instance (and its sunrise/sunset math) until it crosses into
+    another cell or day. Snapping moves event times by about 4 minutes per
+    degree of longitude error, so with the default 0.05 degree grid the
+    east-west part stays within 6 seconds; the latitude offset adds a few
+    more, for about 10 seconds in total below 40 degrees of latitude.
+    """
+
+    def __init__(self, grid_degrees: float = 0.05, maxsize: int = 32, timezone: str = "America/Recife"):
+        """
+        Parameters:
+        - grid_degrees: Cell size in degrees of latitude and longitude
+        - maxsize: Number of (day, cell) entries kept
+        - timezone: Timezone used for the local day and event times
+        """
+        self.grid_degrees = grid_degrees
+        self.maxsize = maxsize
+        self.timezone = timezone
+        self.tz = ZoneInfo(timezone)
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def max_error_seconds(self) -> float:
+        """Bound on the east-west error of event times from snapping to the grid"""
+        return self.grid_degrees / 2 * 4 * 60
+
+    def _snap(self, degrees: float) -> float:
+        return (math.floor(degrees / self.grid_degrees) + 0.5) * self.grid_degrees
+
+    def get(self, moment: datetime, lat: float, lon: float) -> SolarPosition:
+        """
+        SolarPosition for the cell and local day containing a fix
+
+        Parameters:
+        - moment: Time of the fix (aware)
+        - lat, lon: Position of the fix in degrees
+        """
+        day = moment.astimezone(self.tz).date()
+        key = (day, math.floor(lat / self.grid_degrees), math.floor(lon / self.grid_degrees))
+        solar = self.entries.get(key)
+        if solar is not None:
+            self.hits += 1
+            self.entries.move_to_end(key)
+            return solar
+
+        self.misses += 1
+        noon = datetime.combine(day, datetime.min.time(), tzinfo=self.tz).replace(hour=12)
+        coordinates = {'latitude': self._snap(lat), 'longitude': self._snap(lon)}
+        solar = SolarPosition(noon, coordinates, self.timezone)
+        self.entries[key] = solar
+        if len(self.entries) > self.maxsize:
+            self.entries.popitem(last=False)
+        return solar
+
+    def clear(self):
+        self.entries.clear()
+        self.hits = 0
+        self.misses = 0
@@ -1,14 +1,117 @@
-from loggers.mongodb import MongoClient
+import argparse
+import json
+import time
+from bson import json_util
+from pymongo.errors import OperationFailure
+from loggers.mongodb import MongoClient, vehicle_filter
 
-def tail_log(limit=10):
+FORMATS = ('repr', 'json', 'kv')
+
+def format_document(doc, output_format='repr'):
+    """
+    Render a log document for printing
+
+    Parameters:
+    - doc: MongoDB document
+    - output_format: 'repr' (Python dict), 'json' (one line of extended JSON) or 'kv' (key=value pairs)
     """
-    Fetch and print the last `limit` documents from the MongoDB collection.
+    if output_format == 'json':
+        return json.dumps(doc, default=json_util.default)
+    if output_format == 'kv':
+        return ' '.join(f"{key}={value}" for key, value in doc.items())
+    return str(doc)
+
+def _projection(fields):
+    """Build a find() projection from a list of field names (None for all fields)"""
+    if not fields:
+        return None
+    return {field: 1 for field in fields}
+
+def tail_log(limit=10, fields=None, output_format='repr', vehicle=None):
+    """
+    Fetch and print one vehicle's last `limit` documents from the MongoDB collection.
     """
     # Connect to MongoDB
     client, db, collection = MongoClient()
 
     # Find the last 10 documents by sorting in descending natural order and limiting
-    for doc in collection.find().sort([('$natural', -1)]).limit(limit):
-        print(doc)
+    for doc in collection.find(vehicle_filter(vehicle), _projection(fields)).sort([('$natural', -1)]).limit(limit):
+        print(format_document(doc, output_format))
+
+    client.close()
+
+def follow_log(limit=10, fields=None, output_format='repr', poll_interval=0.5, vehicle=None):
+    """
+    Print one vehicle's last `limit` documents, then stream new ones as they are inserted (like `tail -f`)
+
+    Uses a change stream when the server supports one (replica set), otherwise
+    polls the `_id` index for documents newer than the last one printed.
+
+    Parameters:
+    - limit: Number of existing documents to print first
+    - fields: Optional list of fields to print
+    - output_format: One of FORMATS
+    - poll_interval: Seconds between polls when change streams are unavailable
+    - vehicle: Vehicle to print (default: this vehicle)
+    """
+    client, db, collection = MongoClient()
+    projection = _projection(fields)
+    scope = vehicle_filter(vehicle)
+
+    # Open the change stream before reading the last documents, so nothing
+    # inserted in between is missed
+    try:
+        pipeline = [{'$match': {'operationType': 'insert',
+                                **{f"fullDocument.{key}": value for key, value in scope.items()}}}]
+        if projection:
+            # find() keeps _id too; it is also what skips documents printed twice
+            pipeline.append({'$project': {f"fullDocument.{field}": 1 for field in ['_id', *projection]}})
+        stream = collection.watch(pipeline, max_await_time_ms=int(poll_interval * 1000))
+    except OperationFailure:
+        # Standalone mongod: change streams need a replica set
+        stream = None
+
+    last = list(collection.find(scope, projection).sort([('$natural', -1)]).limit(limit))
+    for doc in reversed(last):
+        print(format_document(doc, output_format), flush=True)
+    last_id = last[0]['_id'] if last else None
+
+    try:
+        if stream is not None:
+            printed = {doc['_id'] for doc in last}
+            with stream:
+                for change in stream:
+                    doc = change['fullDocument']
+                    if doc['_id'] in printed:
+                        # Inserted after the stream opened but already in the last documents
+                        continue
+                    print(format_document(doc, output_format), flush=True)
+        else:
+            while True:
+                # A vehicle's _ids sort chronologically (see helpers.vehicle.log_id)
+                query = dict(scope, _id={'$gt': last_id}) if last_id is not None else scope
+                for doc in collection.find(query, projection).sort('_id', 1):
+                    print(format_document(doc, output_format), flush=True)
+                    last_id = doc['_id']
+                time.sleep(poll_interval)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if stream is not None:
+            stream.close()
+        client.close()
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Print the most recent log documents")
+    parser.add_argument('-n', '--limit', type=int, default=10, help="number of documents to print")
+    parser.add_argument('-f', '--follow', action='store_true', help="keep printing new documents as they arrive")
+    parser.add_argument('--fields', help="comma separated list of fields to print")
+    parser.add_argument('--format', dest='output_format', choices=FORMATS, default='repr')
+    parser.add_argument('--vehicle', help="vehicle to print (default: VEHICLE_ID)")
+    args = parser.parse_args()
 
-    client.close()
\ No newline at end of file
+    fields = args.fields.split(',') if args.fields else None
+    if args.follow:
+        follow_log(args.limit, fields, args.output_format, vehicle=args.vehicle)
+    else:
+        tail_log(args.limit, fields, args.output_format, vehicle=args.vehicle)
@@ -28,6 +28,24 @@ class Today:
         # Convert to UTC
         return local_midnight.astimezone(ZoneInfo("UTC"))
     
+    @staticmethod
+    def day_range_for(moment: datetime) -> tuple[datetime, datetime]:
+        """
+        Get the local day containing a given moment
+        
+        Parameters:
+        - moment: timezone-aware datetime (naive values are taken as UTC)
+        
+        Returns:
+        - Tuple of (start, end) datetime objects in UTC
+        """
+        if moment.tzinfo is None:
+            moment = moment.replace(tzinfo=ZoneInfo("UTC"))
+        local_midnight = moment.astimezone().replace(hour=0, minute=0, second=0, microsecond=0)
+        start = local_midnight.astimezone(ZoneInfo("UTC"))
+        end = (local_midnight + timedelta(days=1)).astimezone(ZoneInfo("UTC"))
+        return (start, end)
+    
     @staticmethod
     def start() -> datetime:
         """Get start of today (00:00:00) in UTC"""
@@ -0,0 +1,49 @@
+import os
+import socket
+import zlib
+from datetime import datetime
+from typing import List
+
+def vehicle_id() -> str:
+    """This vehicle's identifier: VEHICLE_ID, or the host name when unset"""
+    return os.environ.get('VEHICLE_ID') or socket.gethostname()
+
+def log_id(vehicle: str, timestamp) -> str:
+    """
+    `_id` of a log document, unique across a fleet
+
+    Parameters:
+    - vehicle: Vehicle identifier
+    - timestamp: Frame timestamp (datetime or ISO 8601 string)
+
+    Returns:
+    - "<vehicle>:<ISO timestamp>"; both loggers give the same _id for a
+      frame, and one vehicle's _ids sort chronologically
+    """
+    if isinstance(timestamp, datetime):
+        timestamp = timestamp.isoformat()
+    return f"{vehicle}:{timestamp}"
+
+def _queue_settings(queue: str = None, shards: int = None):
+    return (queue or os.environ.get('RABBITMQ_QUEUE', 'telemetry_sync'),
+            shards or int(os.environ.get('RABBITMQ_QUEUE_SHARDS', 1)))
+
+def queue_for(vehicle: str, queue: str = None, shards: int = None) -> str:
+    """
+    Uplink queue a vehicle publishes to
+
+    With RABBITMQ_QUEUE_SHARDS > 1 vehicles are spread over "<queue>.<n>"
+    by a stable hash, so one vehicle's messages stay in order on one queue
+    and consumers of different shards never contend.
+    """
+    queue, shards = _queue_settings(queue, shards)
+    if shards <= 1:
+        return queue
+    return f"{queue}.{zlib.crc32(vehicle.encode()) % shards}"
+
+def shard_queues(queue: str = None, shards: int = None) -> List[str]:
+    """Every uplink queue, for consumers"""
+    queue, shards = _queue_settings(queue, shards)
+    if shards <= 1:
+        return [queue]
+    return [f"{queue}.{shard}" for shard in range(shards)]
@@ -0,0 +1,302 @@
+"""
+Central-side consumer of the telemetry_sync queue.
+
+Vehicles publish `{'collection', 'document', 'timestamp', 'vehicle_id'}`
+envelopes (RabbitMQLogger, MongoDBLogger), to one queue or, with
+RABBITMQ_QUEUE_SHARDS, to a shard chosen by vehicle (helpers.vehicle).
+The shards are divided between the workers. Each worker process holds up to
+INGEST_PREFETCH unacknowledged messages, writes them to MongoDB as one
+unordered bulk of upserts per collection and then acknowledges the whole
+batch with a single multiple-ack. Upserts are keyed by the document `_id`,
+so a batch redelivered after a crash (written but not yet acknowledged)
+just rewrites the same documents.
+
+Messages that can never be stored (malformed envelopes, documents the
+server refuses) are rejected without requeueing. Give the queues a
+dead-letter exchange with a broker policy to keep them, e.g.
+    rabbitmqctl set_policy -p trip_sync telemetry-dlx "^telemetry_sync" \
+        '{"dead-letter-exchange":"telemetry_dead"}' --apply-to queues
+
+Usage:
+    python3 ingest.py
+    INGEST_WORKERS=4 INGEST_BATCH_SIZE=1000 python3 ingest.py
+"""
+import json
+import multiprocessing
+import os
+import signal
+import time
+from typing import Dict, List, Optional, Tuple
+import pika
+import pymongo
+from pymongo.errors import PyMongoError, BulkWriteError, AutoReconnect, ExecutionTimeout, WTimeoutError
+from dotenv import load_dotenv
+from loggers.mongodb import MongoClient, ensure_indexes
+from helpers.vehicle import log_id, shard_queues
+
+load_dotenv()
+
+def rabbitmq_parameters() -> pika.ConnectionParameters:
+    """Broker settings from the same RABBITMQ_* variables the loggers use"""
+    timeout = int(os.getenv('RABBITMQ_TIMEOUT', 5))
+    return pika.ConnectionParameters(
+        host=os.getenv('RABBITMQ_HOST', 'localhost'),
+        port=int(os.getenv('RABBITMQ_PORT', 5672)),
+        virtual_host=os.getenv('RABBITMQ_VHOST', 'trip_sync'),
+        credentials=pika.PlainCredentials(os.getenv('RABBITMQ_USER', 'guest'),
+                                          os.getenv('RABBITMQ_PASSWORD', 'guest')),
+        heartbeat=600,
+        blocked_connection_timeout=timeout,
+        socket_timeout=timeout
+    )
+
+def parse_message(body) -> Optional[Tuple[str, Dict]]:
+    """
+    Unpack one envelope
+
+    Returns:
+    - (collection name, document with `_id`), or None for a malformed message
+    """
+    try:
+        message = json.loads(body)
+        document = message['document']
+    except (ValueError, TypeError, KeyError):
+        return None
+    if not isinstance(document, dict):
+        return None
+    vehicle = message.get('vehicle_id')
+    if vehicle and not document.get('vehicle_id'):
+        document['vehicle_id'] = vehicle
+    # The loggers derive _id from the timestamp; older messages may lack it
+    if document.get('_id') is None:
+        if document.get('timestamp') is None:
+            return None
+        document['_id'] = log_id(vehicle, document['timestamp']) if vehicle else document['timestamp']
+    return message.get('collection') or 'logs', document
+
+# Failures worth retrying: the same writes can succeed later (AutoReconnect
+# covers NetworkTimeout and a primary stepping down)
+TRANSIENT_ERRORS = (AutoReconnect, ExecutionTimeout, WTimeoutError)
+
+def bulk_upserts(documents: List[Dict]) -> List[pymongo.ReplaceOne]:
+    """Idempotent writes for a batch; the last copy of a repeated _id wins"""
+    latest = {}
+    for document in documents:
+        latest[document['_id']] = document
+    return [pymongo.ReplaceOne({'_id': _id}, document, upsert=True) for _id, document in latest.items()]
+
+def failed_ids(error: BulkWriteError, documents: List[Dict]) -> set:
+    """_id of every upsert of bulk_upserts(documents) the bulk write reported as failed"""
+    ids = list(dict.fromkeys(document['_id'] for document in documents))  # request order
+    return {ids[write_error['index']] for write_error in error.details.get('writeErrors', [])}
+
+class IngestConsumer:
+    def __init__(self, db, connection_parameters=None, queues: List[str] = None,
+                 prefetch: int = 2000, batch_size: int = 500, flush_interval: float = 1.0):
+        """
+        Consume telemetry envelopes into MongoDB in acknowledged batches
+
+        Parameters:
+        - db: pymongo Database the envelopes' collections live in
+        - connection_parameters: pika.ConnectionParameters (default: rabbitmq_parameters())
+        - queues: Queues to consume (default: every uplink shard, see shard_queues)
+        - prefetch: Unacknowledged messages the broker may send ahead; keep
+          it above batch_size so the next batch arrives while one is written
+        - batch_size: Messages per bulk write and acknowledgement
+        - flush_interval: Seconds a partial batch may wait for more messages
+        """
+        self.db = db
+        self.connection_parameters = connection_parameters
+        self.queues = queues or shard_queues()
+        self.prefetch = prefetch
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.connection = None
+        self.channel = None
+        self.pending = []      # (delivery tag, collection, document) of the unacknowledged batch
+        self.batch_started = None
+        self.running = False
+        self.stats = {'messages': 0, 'batches': 0, 'rejected': 0, 'failed_batches': 0}
+
+    def connect(self):
+        parameters = self.connection_parameters or rabbitmq_parameters()
+        self.connection = pika.BlockingConnection(parameters)
+        self.channel = self.connection.channel()
+        # Delivery tags are per channel, so one channel lets a single
+        # multiple-ack cover a batch drawn from several shards
+        self.channel.basic_qos(prefetch_count=self.prefetch)
+        for queue in self.queues:
+            self.channel.queue_declare(queue=queue, durable=True)
+            self.channel.basic_consume(queue=queue, on_message_callback=self._on_message, auto_ack=False)
+        print(f"[OK] Consuming {', '.join(self.queues)} (prefetch {self.prefetch}, batch {self.batch_size})")
+
+    def _on_message(self, channel, method, properties, body):
+        parsed = parse_message(body)
+        if parsed is None:
+            # Requeueing would redeliver it forever
+            channel.basic_reject(delivery_tag=method.delivery_tag, requeue=False)
+            self.stats['rejected'] += 1
+            print(f"[WARN] Rejected malformed message {method.delivery_tag}")
+            return
+        if not self.pending:
+            self.batch_started = time.monotonic()
+        self.pending.append((method.delivery_tag, *parsed))
+        if len(self.pending) >= self.batch_size:
+            self.flush()
+
+    def flush(self) -> int:
+        """
+        Write the pending batch and acknowledge it
+
+        - Transient errors (TRANSIENT_ERRORS, write concern timeouts): the
+          whole batch is returned to the queue and redelivered later; the
+          upserts make the retry safe
+        - Documents the server refuses (write errors of the unordered
+          bulk): their messages are rejected without requeueing and the
+          rest of the batch is acknowledged
+        - Any other database error: the batch is rejected, since retrying
+          the same writes would fail the same way
+
+        Returns:
+        - Number of messages written
+        """
+        if not self.pending:
+            return 0
+        batch, self.pending = self.pending, []
+        by_collection = {}
+        for _, collection, document in batch:
+            by_collection.setdefault(collection, []).append(document)
+        refused = {}  # collection -> _ids the server refused
+        try:
+            for collection, documents in by_collection.items():
+                try:
+                    # Unordered: one bad document doesn't stop the rest
+                    self.db[collection].bulk_write(bulk_upserts(documents), ordered=False)
+                except BulkWriteError as e:
+                    if e.details.get('writeConcernErrors'):
+                        raise WTimeoutError(f"write concern not satisfied: {e.details['writeConcernErrors']}")
+                    refused[collection] = failed_ids(e, documents)
+                    print(f"[ERROR] {len(refused[collection])} documents refused by {collection}: "
+                          f"{e.details['writeErrors'][0].get('errmsg')}")
+        except TRANSIENT_ERRORS as e:
+            print(f"[ERROR] Bulk write of {len(batch)} messages failed, requeueing: {e}")
+            self.channel.basic_nack(delivery_tag=batch[-1][0], multiple=True, requeue=True)
+            self.stats['failed_batches'] += 1
+            return 0
+        except PyMongoError as e:
+            print(f"[ERROR] Bulk write of {len(batch)} messages failed, rejecting: {e}")
+            self.channel.basic_nack(delivery_tag=batch[-1][0], multiple=True, requeue=False)
+            self.stats['failed_batches'] += 1
+            self.stats['rejected'] += len(batch)
+            return 0
+
+        written = [tag for tag, collection, document in batch
+                   if document['_id'] not in refused.get(collection, ())]
+        for tag, collection, document in batch:
+            if document['_id'] in refused.get(collection, ()):
+                self.channel.basic_reject(delivery_tag=tag, requeue=False)
+                self.stats['rejected'] += 1
+        if written:
+            # Acknowledges every still unsettled message up to the newest written one
+            self.channel.basic_ack(delivery_tag=written[-1], multiple=True)
+        self.stats['messages'] += len(written)
+        self.stats['batches'] += 1
+        return len(written)
+
+    def poll(self, time_limit: float = None):
+        """Process broker events for up to time_limit seconds, flushing a batch that waited too long"""
+        self.connection.process_data_events(time_limit=self.flush_interval if time_limit is None else time_limit)
+        if self.pending and time.monotonic() - self.batch_started >= self.flush_interval:
+            self.flush()
+
+    def run(self):
+        """Consume until stop() is called, reconnecting after broker failures"""
+        self.running = True
+        while self.running:
+            try:
+                if self.connection is None or self.connection.is_closed:
+                    self.connect()
+                self.poll()
+            except pika.exceptions.AMQPError as e:
+                # Unacknowledged messages go back to the queue with the connection
+                print(f"[ERROR] Broker connection lost: {e}")
+                self.pending = []
+                self.connection = None
+                time.sleep(self.flush_interval)
+        self.close()
+
+    def stop(self):
+        self.running = False
+
+    def close(self):
+        """Write and acknowledge what is pending, then close the connection"""
+        if self.connection is None or self.connection.is_closed:
+            return
+        try:
+            self.flush()
+        finally:
+            self.connection.close()
+
+def worker_queues(queues: List[str], workers: int) -> List[List[str]]:
+    """
+    Queues each worker consumes: shards are dealt out round-robin, and
+    with more workers than shards the extra workers share a shard
+    """
+    return [queues[worker::workers] or [queues[worker % len(queues)]] for worker in range(workers)]
+
+def _worker(options: Dict):
+    client, db, _ = MongoClient()
+    consumer = IngestConsumer(db, **options)
+    signal.signal(signal.SIGTERM, lambda signum, frame: consumer.stop())
+    signal.signal(signal.SIGINT, lambda signum, frame: consumer.stop())
+    try:
+        consumer.run()
+    finally:
+        client.close()
+        print(f"[STOP] Worker {os.getpid()}: {consumer.stats}")
+
+def main():
+    """
+    Start INGEST_WORKERS consumer processes sharing the uplink queues (see worker_queues)
+
+    Configuration (environment or .env):
+    - RABBITMQ_HOST, RABBITMQ_PORT, RABBITMQ_VHOST, RABBITMQ_USER,
+      RABBITMQ_PASSWORD, RABBITMQ_QUEUE, RABBITMQ_QUEUE_SHARDS: Broker, as
+      for RabbitMQLogger
+    - INGEST_WORKERS: Consumer processes (default: number of CPUs)
+    - INGEST_PREFETCH: Unacknowledged messages per worker (default: 2000)
+    - INGEST_BATCH_SIZE: Messages per bulk write (default: 500)
+    - INGEST_FLUSH_INTERVAL: Seconds before a partial batch is written (default: 1)
+    """
+    client, db, _ = MongoClient()
+    ensure_indexes(db)
+    client.close()
+
+    options = {
+        'prefetch': int(os.getenv('INGEST_PREFETCH', 2000)),
+        'batch_size': int(os.getenv('INGEST_BATCH_SIZE', 500)),
+        'flush_interval': float(os.getenv('INGEST_FLUSH_INTERVAL', 1))
+    }
+    count = int(os.getenv('INGEST_WORKERS', os.cpu_count()))
+    workers = [multiprocessing.Process(target=_worker, args=({**options, 'queues': queues},))
+               for queues in worker_queues(shard_queues(), count)]
+    for worker in workers:
+        worker.start()
+
+    def stop(signum, frame):
+        for worker in workers:
+            if worker.is_alive():
+                worker.terminate()  # SIGTERM: the worker flushes and exits
+
+    signal.signal(signal.SIGTERM, stop)
+    print(f"[INIT] Started {len(workers)} ingest workers")
+    try:
+        for worker in workers:
+            worker.join()
+    except KeyboardInterrupt:
+        # Ctrl+C reaches the workers too
+        for worker in workers:
+            worker.join()
+
+if __name__ == '__main__':
+    main()
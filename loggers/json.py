@@ -1,4 +1,11 @@
 import json
+from datetime import datetime
+
+def _default(value):
+    # Sampler frames carry datetimes; store them as ISO 8601 like RabbitMQLogger
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"Object of type {value.__class__.__name__} is not JSON serializable")
 
 class JSONLogger:
     def __init__(self, filename):
@@ -8,6 +15,6 @@ class JSONLogger:
         self.file.close()
 
     def write(self, data):
-        json.dump(data, self.file)
+        json.dump(data, self.file, default=_default)
         self.file.write('\n')
-        self.file.flush()
\ No newline at end of file
+        self.file.flush()
@@ -7,18 +7,155 @@ from dotenv import load_dotenv
 from os import environ as env
 from datetime import datetime
 from bson import ObjectId
+from helpers.vehicle import vehicle_id, log_id, queue_for
 
 load_dotenv()
 
-def MongoClient():
-    client = pymongo.MongoClient('localhost', 27017)
-    db = client['pi_i2c_logger']
-    collection = db['logs']
+# Documents with a usable GPS fix. Queries that only care about positioned
+# logs should include this filter so they can use the partial indexes below.
+GPS_FIX_FILTER = {
+    'gps_latitude': {'$type': 'number'},
+    'gps_longitude': {'$type': 'number'}
+}
+
+# Indexes required by the production queries, keyed by collection name.
+# Each entry is passed straight to pymongo.IndexModel.
+INDEXES = {
+    # Every logs query is scoped to one vehicle (see vehicle_filter), so the
+    # vehicle leads each index and a fleet's logs don't share one hot range
+    'logs': [
+        {
+            'keys': [('vehicle_id', pymongo.ASCENDING), ('timestamp', pymongo.ASCENDING)],
+            'name': 'vehicle_timestamp'
+        },
+        {
+            # Trip detection only reads positioned logs, so keep the GPS
+            # fields in the index and skip everything without a fix.
+            'keys': [
+                ('vehicle_id', pymongo.ASCENDING),
+                ('timestamp', pymongo.ASCENDING),
+                ('gps_latitude', pymongo.ASCENDING),
+                ('gps_longitude', pymongo.ASCENDING),
+                ('gps_speed', pymongo.ASCENDING)
+            ],
+            'name': 'vehicle_timestamp_gps_fix',
+            'partialFilterExpression': GPS_FIX_FILTER
+        }
+    ],
+    # Trips and places are per vehicle too (see trips.store.TripStore)
+    'trips': [
+        {
+            'keys': [('vehicle_id', pymongo.ASCENDING), ('start_time', pymongo.ASCENDING)],
+            'name': 'vehicle_start_time'
+        },
+        {
+            'keys': [('vehicle_id', pymongo.ASCENDING), ('end_time', pymongo.ASCENDING)],
+            'name': 'vehicle_end_time'
+        },
+        # Radius and bounding-box queries on trip endpoints and routes
+        {
+            'keys': [('vehicle_id', pymongo.ASCENDING), ('start_point', pymongo.GEOSPHERE)],
+            'name': 'vehicle_start_point'
+        },
+        {
+            'keys': [('vehicle_id', pymongo.ASCENDING), ('end_point', pymongo.GEOSPHERE)],
+            'name': 'vehicle_end_point'
+        },
+        {
+            'keys': [('vehicle_id', pymongo.ASCENDING), ('route', pymongo.GEOSPHERE)],
+            'name': 'vehicle_route'
+        },
+        # LSH buckets of the route fingerprint (multikey)
+        {
+            'keys': [('vehicle_id', pymongo.ASCENDING), ('route_bands', pymongo.ASCENDING)],
+            'name': 'vehicle_route_bands'
+        }
+    ],
+    'trip_places': [
+        {
+            'keys': [('vehicle_id', pymongo.ASCENDING), ('visits', pymongo.DESCENDING)],
+            'name': 'vehicle_visits'
+        }
+    ],
+    'rabbitmq_queue': [
+        {
+            'keys': [('created_at', pymongo.ASCENDING)],
+            'name': 'created_at'
+        }
+    ]
+}
+
+def MongoClient(database=None, collection=None):
+    """
+    Connect to MONGODB_URI (default: the local mongod)
+
+    Parameters:
+    - database: Database name (default: MONGODB_DATABASE or pi_i2c_logger)
+    - collection: Logs collection name (default: MONGODB_COLLECTION or logs)
+
+    Returns:
+    - (client, database, collection)
+    """
+    client = pymongo.MongoClient(env.get('MONGODB_URI', 'mongodb://localhost:27017'))
+    db = client[database or env.get('MONGODB_DATABASE', 'pi_i2c_logger')]
+    collection = db[collection or logs_collection_name()]
     return client, db, collection
 
+def logs_collection_name():
+    return env.get('MONGODB_COLLECTION', 'logs')
+
+def vehicle_filter(vehicle=None):
+    """Query condition selecting one vehicle's logs (default: this vehicle)"""
+    return {'vehicle_id': vehicle or vehicle_id()}
+
+def ensure_indexes(db):
+    """
+    Create every index declared in INDEXES (no-op for existing ones)
+
+    Parameters:
+    - db: pymongo Database to create the indexes in
+
+    Returns:
+    - Dict of collection name -> list of index names
+    """
+    created = {}
+    for collection_name, indexes in INDEXES.items():
+        models = []
+        for index in indexes:
+            options = {k: v for k, v in index.items() if k != 'keys'}
+            models.append(pymongo.IndexModel(index['keys'], **options))
+        if collection_name == 'logs':
+            collection_name = logs_collection_name()
+        created[collection_name] = db[collection_name].create_indexes(models)
+    return created
+
+def timestamp_range(start, end, vehicle=None):
+    """
+    Build a filter for one vehicle's logs in [start, end) that matches both storage formats
+
+    MongoDBLogger stores timestamps as datetimes while RabbitMQLogger stores
+    ISO 8601 strings, so the range is expressed once for each type. Both
+    branches can use the `vehicle_timestamp` index.
+    """
+    vehicle = vehicle_filter(vehicle)
+    return {
+        '$or': [
+            {**vehicle, 'timestamp': {'$gte': start, '$lt': end}},
+            {**vehicle, 'timestamp': {'$gte': start.isoformat(), '$lt': end.isoformat()}}
+        ]
+    }
+
 class MongoDBLogger:
-    def __init__(self, enable_rabbitmq=None):
+    def __init__(self, enable_rabbitmq=None, vehicle=None):
+        """
+        Parameters:
+        - enable_rabbitmq: Also publish each log (default: RABBITMQ_ENABLED)
+        - vehicle: Vehicle identifier stamped on every log (default: vehicle_id())
+        """
         self.client, self.db, self.collection = MongoClient()
+        ensure_indexes(self.db)
+        self.vehicle_id = vehicle or vehicle_id()
+        self.queue = queue_for(self.vehicle_id)
         if enable_rabbitmq is None:
             enable_rabbitmq = env.get('RABBITMQ_ENABLED', 'true').lower() in ('true', '1', 'yes')
      
@@ -43,7 +180,7 @@ class MongoDBLogger:
             )
             self.rabbitmq_connection = pika.BlockingConnection(parameters)
             self.rabbitmq_channel = self.rabbitmq_connection.channel()
-            self.rabbitmq_channel.queue_declare(queue='telemetry_sync', durable=True)
+            self.rabbitmq_channel.queue_declare(queue=self.queue, durable=True)
             print("RabbitMQ connected successfully")
         except Exception as e:
             print(f"RabbitMQ connection failed: {e}")
@@ -61,13 +198,14 @@ class MongoDBLogger:
             message = {
                 'collection': 'logs',
                 'document': clean_doc,
-                'timestamp': clean_doc.get('timestamp')
+                'timestamp': clean_doc.get('timestamp'),
+                'vehicle_id': self.vehicle_id
             }
             
             # Use regular json.dumps (not json_util.default)
             self.rabbitmq_channel.basic_publish(
                 exchange='',
-                routing_key='telemetry_sync',
+                routing_key=self.queue,
                 body=json.dumps(message),  # Regular JSON, not MongoDB extended JSON
                 properties=pika.BasicProperties(
                     delivery_mode=2,
@@ -106,7 +244,8 @@ class MongoDBLogger:
 
     def write(self, data):
         try:
-            data['_id'] = data['timestamp']  # Use timestamp as ID
+            data['vehicle_id'] = self.vehicle_id
+            data['_id'] = log_id(self.vehicle_id, data['timestamp'])
             self.collection.insert_one(data)
             
             # Publish to RabbitMQ after successful MongoDB insert
@@ -119,6 +258,9 @@ class MongoDBLogger:
 
     def avg_per_minute(self, key):
         pipeline = [
+            {
+                '$match': vehicle_filter(self.vehicle_id)
+            },
             {
                 '$addFields': {
                     'ts': { '$toDate': "$timestamp" }
@@ -139,7 +281,15 @@ class MongoDBLogger:
         return list(self.collection.aggregate(pipeline))
     
     def daily_max_min(self, key):
-        pipeline = [
+        return list(self.collection.aggregate(self.daily_max_min_pipeline(key, self.vehicle_id)))
+
+    @staticmethod
+    def daily_max_min_pipeline(key, vehicle=None):
+        return [
+            {
+                # Narrow to today on the indexed field before converting
+                '$match': timestamp_range(Today.start(), Today.end(), vehicle)
+            },
             {
                 '$addFields': {
                     'ts': { '$toDate': "$timestamp" }
@@ -177,5 +327,4 @@ class MongoDBLogger:
                     }
                 }
             }
-        ]
-        return list(self.collection.aggregate(pipeline))
\ No newline at end of file
+        ]
\ No newline at end of file
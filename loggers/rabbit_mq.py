@@ -7,24 +7,27 @@ from bson import ObjectId
 from dotenv import load_dotenv
 import threading
 import time
-from loggers.mongodb import MongoClient
+from loggers.mongodb import MongoClient, ensure_indexes
+from helpers.vehicle import vehicle_id, log_id, queue_for
 
 load_dotenv()
 
 class RabbitMQLogger:
-    def __init__(self, rabbitmq_config=None, sync_interval=30):
+    def __init__(self, rabbitmq_config=None, sync_interval=30, vehicle=None):
         """
         Offline-first logger that queues to MongoDB and syncs to RabbitMQ when connected
         
         Parameters:
         - rabbitmq_config: Dict with RabbitMQ connection settings
         - sync_interval: Seconds between sync attempts (default: 30)
+        - vehicle: Vehicle identifier stamped on every log (default: vehicle_id())
         """
         self.client, self.db, self.collection = MongoClient()
+        self.vehicle_id = vehicle or vehicle_id()
         
         # Collection for unsent messages queue
         self.queue_collection = self.db['rabbitmq_queue']
-        self.queue_collection.create_index('created_at')
+        ensure_indexes(self.db)
         
         # RabbitMQ config
         self.rabbitmq_config = rabbitmq_config or {
@@ -33,7 +36,7 @@ class RabbitMQLogger:
             'vhost': os.getenv('RABBITMQ_VHOST', 'trip_sync'),
             'user': os.getenv('RABBITMQ_USER'),
             'password': os.getenv('RABBITMQ_PASSWORD'),
-            'queue': os.getenv('RABBITMQ_QUEUE', 'telemetry_sync'),
+            'queue': queue_for(self.vehicle_id),
             'connection_timeout': int(os.getenv('RABBITMQ_TIMEOUT', 5))
         }
         
@@ -205,7 +208,8 @@ class RabbitMQLogger:
             elif isinstance(data['timestamp'], datetime):
                 data['timestamp'] = data['timestamp'].isoformat()
             
-            data['_id'] = data['timestamp']
+            data['vehicle_id'] = self.vehicle_id
+            data['_id'] = log_id(self.vehicle_id, data['timestamp'])
             
             # Save to MongoDB logs
             self.collection.insert_one(data)
@@ -216,7 +220,8 @@ class RabbitMQLogger:
             message = {
                 'collection': 'logs',
                 'document': clean_doc,
-                'timestamp': clean_doc.get('timestamp')
+                'timestamp': clean_doc.get('timestamp'),
+                'vehicle_id': self.vehicle_id
             }
             
             # Try to publish immediately if connected
@@ -236,7 +241,8 @@ class RabbitMQLogger:
 
     def get_queue_size(self):
         """Get number of messages waiting to be synced"""
-        return self.queue_collection.count_documents({})
+        # Uses collection metadata; count_documents({}) would scan the queue
+        return self.queue_collection.estimated_document_count()
 
     def get_connection_status(self):
         """Check if connected to RabbitMQ"""
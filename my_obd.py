@@ -5,10 +5,9 @@ from devices.bmp581 import BMP581
 from obd import commands
 from loggers.json import JSONLogger
 from datetime import datetime, UTC
+from helpers.fuel import AFR, FUEL_DENSITY
 
 # Constants
-AFR = 14.7         # Stoichiometric AFR for gasoline
-FUEL_DENSITY = 745 # g/L
 HISTORY_LENGTH = 60  # seconds of data
 LOG_FILE = "dashboard_log.json"
 
@@ -0,0 +1,214 @@
+import os
+import signal
+import time
+from datetime import datetime, UTC
+from dotenv import load_dotenv
+
+class Sampler:
+    def __init__(self, devices, loggers=None, publishers=None, processors=None, interval=1):
+        """
+        Read every device once per interval and hand the merged frame on
+
+        Parameters:
+        - devices: List of Device instances to read
+        - loggers: Objects with a write(values) method (MongoDB, RabbitMQ, JSON, ...)
+        - publishers: Objects with a publish(frame) method (e.g. SharedFrame)
+        - processors: Objects with a process(values) method that add derived
+          fields to each frame before it is published and logged
+        - interval: Seconds between samples
+        """
+        self.devices = devices
+        self.loggers = loggers or []
+        self.publishers = publishers or []
+        self.processors = processors or []
+        self.interval = interval
+        self.values = {}
+        self.running = False
+
+    def sample(self):
+        """Read all connected devices and return the merged frame"""
+        self.values["timestamp"] = datetime.now(UTC).replace(microsecond=0)
+        for device in self.devices:
+            if device.is_connected():
+                device.read()
+            else:
+                # Drop a disconnected device's last readings so calculated
+                # sensors and processors (fuel totals) don't keep using them
+                for key in device.values:
+                    self.values.pop(key, None)
+                device.values.clear()
+        for device in self.devices:
+            self.values.update(device.values)
+        self.values["timestamp"] = self.values.get("gps_timestamp", self.values["timestamp"])
+        for processor in self.processors:
+            processor.process(self.values)
+
+        # Loggers may rewrite fields in place (_id, ISO timestamps), so
+        # publishers get their own copy of the frame
+        frame = dict(self.values)
+        for publisher in self.publishers:
+            publisher.publish(frame)
+        for logger in self.loggers:
+            logger.write(self.values)
+        return frame
+
+    def run(self):
+        """Sample until stop() is called, keeping a steady interval"""
+        self.running = True
+        next_sample = time.monotonic()
+        while self.running:
+            try:
+                self.sample()
+            except Exception as e:
+                print(f"[ERROR] Sample failed: {e}")
+            next_sample += self.interval
+            delay = next_sample - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            else:
+                # Running behind; don't try to catch up with a burst of samples
+                next_sample = time.monotonic()
+
+    def stop(self):
+        self.running = False
+
+# Factories for every supported device and logger. Imports happen inside the
+# factories so the daemon only loads the drivers it is configured to use.
+
+def _bmp581():
+    from devices.bmp581 import BMP581
+    return BMP581(float(os.environ.get('SEA_LEVEL_PRESSURE_HPA', 1019)))
+
+def _ltr390():
+    from devices.ltr390 import LTR390
+    return LTR390()
+
+def _obd():
+    from devices.usb_obd import USBOBD
+    # Connects in the background so startup doesn't wait for the adapter
+    return USBOBD(os.environ.get('ODB_PORT', 'ttyUSB0'), background=True)
+
+def _shtc3():
+    from devices.shtc3 import SHTC3
+    return SHTC3()
+
+def _gps():
+    from devices.gps import GPS
+    return GPS(float(os.environ.get('SOLAR_GRID_DEGREES', 0.05)),
+               os.environ.get('GPSD_HOST', '127.0.0.1'),
+               int(os.environ.get('GPSD_PORT', 2947)))
+
+def _mongodb():
+    from loggers.mongodb import MongoDBLogger
+    return MongoDBLogger()
+
+def _rabbitmq():
+    from loggers.rabbit_mq import RabbitMQLogger
+    return RabbitMQLogger()
+
+def _json():
+    from loggers.json import JSONLogger
+    return JSONLogger(os.environ.get('JSON_LOG_FILE', 'dashboard_log.json'))
+
+def _calculated():
+    from sensors.calculated.graph import SensorGraph
+    from sensors.calculated.altitude import PressureAltitude
+    from sensors.calculated.dew_point import DewPoint
+    from sensors.calculated.fuel_flow import FuelFlow, FuelEconomy
+    return SensorGraph([
+        DewPoint(),
+        PressureAltitude(float(os.environ.get('SEA_LEVEL_PRESSURE_HPA', 1019))),
+        FuelFlow(),
+        FuelEconomy()
+    ])
+
+def _trips():
+    from trips.online import OnlineTripDetector
+    return OnlineTripDetector()
+
+def _fuel():
+    from helpers.fuel import FuelTotals
+    return FuelTotals()
+
+DEVICES = {
+    'bmp581': _bmp581,
+    'ltr390': _ltr390,
+    'obd': _obd,
+    'shtc3': _shtc3,
+    'gps': _gps
+}
+
+LOGGERS = {
+    'mongodb': _mongodb,
+    'rabbitmq': _rabbitmq,
+    'json': _json
+}
+
+# Processors run in the configured order; `fuel` uses `calculated` and `trips` fields
+PROCESSORS = {
+    'calculated': _calculated,
+    'trips': _trips,
+    'fuel': _fuel
+}
+
+def _configured(env_key, default, factories):
+    names = [name.strip() for name in os.environ.get(env_key, default).split(',') if name.strip()]
+    unknown = [name for name in names if name not in factories]
+    if unknown:
+        raise ValueError(f"{env_key}: unknown {', '.join(unknown)} (expected {', '.join(factories)})")
+    return [factories[name]() for name in names]
+
+def build_devices():
+    """Create the devices listed in SAMPLER_DEVICES (default: all of them)"""
+    return _configured('SAMPLER_DEVICES', 'bmp581,ltr390,obd,shtc3,gps', DEVICES)
+
+def build_loggers():
+    """Create the loggers listed in SAMPLER_LOGGERS (default: rabbitmq)"""
+    return _configured('SAMPLER_LOGGERS', 'rabbitmq', LOGGERS)
+
+def build_processors():
+    """Create the frame processors listed in SAMPLER_PROCESSORS (default: calculated,trips,fuel)"""
+    return _configured('SAMPLER_PROCESSORS', 'calculated,trips,fuel', PROCESSORS)
+
+def main():
+    """
+    Headless logging daemon: sample and log without importing Dash or Plotly
+
+    Configuration (environment or .env):
+    - SAMPLER_DEVICES: Comma separated device names (see DEVICES)
+    - SAMPLER_LOGGERS: Comma separated logger names (see LOGGERS)
+    - SAMPLER_PROCESSORS: Comma separated processor names (see PROCESSORS)
+    - SAMPLE_INTERVAL: Seconds between samples (default: 1)
+    - DASHBOARD_SHARED_FRAME: If set, also publish frames for dashboard workers
+    """
+    load_dotenv()
+
+    publishers = []
+    shared_frame_name = os.environ.get('DASHBOARD_SHARED_FRAME')
+    if shared_frame_name:
+        from helpers.shared_frame import SharedFrame
+        publishers.append(SharedFrame.create(shared_frame_name))
+
+    loggers = build_loggers()
+    sampler = Sampler(
+        build_devices(),
+        loggers,
+        publishers=publishers,
+        processors=build_processors(),
+        interval=float(os.environ.get('SAMPLE_INTERVAL', 1))
+    )
+    signal.signal(signal.SIGTERM, lambda signum, frame: sampler.stop())
+
+    print(f"[INIT] Sampling {', '.join(str(d) for d in sampler.devices)}")
+    try:
+        sampler.run()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        for logger in loggers:
+            logger.close()
+        for publisher in publishers:
+            publisher.close()
+
+if __name__ == '__main__':
+    main()
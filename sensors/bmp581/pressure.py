@@ -1,5 +1,4 @@
 from sensors.sensor import Sensor
-from dash_daq import LEDDisplay
 
 class Pressure(Sensor):
     def __init__(self, device):
@@ -12,6 +11,7 @@ class Pressure(Sensor):
             return None
 
     def dashboard_gauge(self):
+        from dash_daq import LEDDisplay
         return LEDDisplay(
             id=self.key,
             label="Pressure (hPa)",
@@ -1,5 +1,4 @@
 from sensors.sensor import Sensor
-from dash_daq import Thermometer
 
 class Temperature(Sensor):
     def __init__(self, device):
@@ -12,6 +11,7 @@ class Temperature(Sensor):
             return None
 
     def dashboard_gauge(self):
+        from dash_daq import Thermometer
         return Thermometer(
             id=self.key,
             min=0,
@@ -0,0 +1,13 @@
+from sensors.calculated.graph import CalculatedSensor
+
+class PressureAltitude(CalculatedSensor):
+    """Barometric altitude (m) from the BMP581 pressure, smoother than GPS altitude"""
+
+    def __init__(self, sea_level_pressure_hpa=1013.25):
+        super().__init__("bmp581_altitude", "m", ("bmp581_pressure",), precision=1)
+        self.description = "Altitude (m)"
+        self.sea_level_pressure_hpa = sea_level_pressure_hpa
+
+    def compute(self, pressure):
+        # International barometric formula
+        return 44330 * (1 - (pressure / self.sea_level_pressure_hpa) ** (1 / 5.255))
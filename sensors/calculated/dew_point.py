@@ -0,0 +1,21 @@
+from sensors.calculated.graph import CalculatedSensor
+from math import log
+
+class DewPoint(CalculatedSensor):
+    def __init__(self):
+        super().__init__("shtc3_dewpoint", "C", ("shtc3_temperature", "shtc3_humidity"), precision=1)
+        self.description = "Dew Point"
+
+    def compute(self, temperature, humidity):
+        kelvin = 243.04 + temperature
+        log_humidity = log(humidity / 100)
+        return 243.04*(log_humidity+((17.625*temperature)/kelvin)) / (17.625-log_humidity-((17.625*temperature)/kelvin))
+
+    def figure(self, current, daily_range):
+        return super().current_max_min(current, daily_range)
+
+    def dashboard_gauge(self):
+        from dash import dcc
+        return dcc.Graph(
+            id=self.key
+        )
@@ -0,0 +1,22 @@
+from sensors.calculated.graph import CalculatedSensor
+from helpers.fuel import fuel_flow_lph, fuel_economy
+
+class FuelFlow(CalculatedSensor):
+    """Fuel flow (L/h) from FUEL_RATE when the vehicle reports it, MAF otherwise"""
+
+    def __init__(self):
+        super().__init__("obd_fuel_flow", "L/h", ("obd_fuel_rate", "obd_maf"), precision=2)
+        self.description = "Fuel Flow (L/h)"
+
+    def compute(self, fuel_rate, maf):
+        return fuel_flow_lph(fuel_rate, maf)
+
+class FuelEconomy(CalculatedSensor):
+    """Instantaneous consumption (L/100km)"""
+
+    def __init__(self):
+        super().__init__("obd_fuel_economy", "L/100km", ("obd_fuel_flow", "obd_speed"), precision=1)
+        self.description = "Fuel Economy (L/100km)"
+
+    def compute(self, flow, speed):
+        return fuel_economy(flow, speed)
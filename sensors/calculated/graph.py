@@ -0,0 +1,78 @@
+from graphlib import TopologicalSorter
+from typing import Dict, List
+from sensors.sensor import Sensor
+
+class CalculatedSensor(Sensor):
+    """
+    Sensor derived from other values of the same frame instead of hardware.
+
+    Subclasses list the frame keys they read in `inputs` and implement
+    compute() with one argument per input, in the same order. Inputs may
+    be raw readings or the keys of other calculated sensors.
+    """
+
+    def __init__(self, key, unit, inputs, precision=2):
+        super().__init__(None, key, unit, precision)
+        self.inputs = tuple(inputs)
+
+    def compute(self, *inputs):
+        raise NotImplementedError("This method should be overridden by subclasses.")
+
+    def evaluate(self, inputs):
+        """Rounded value for a tuple of input values, None if it can't be computed"""
+        try:
+            return self.value(self.compute(*inputs))
+        except:
+            return None
+
+class SensorGraph:
+    """
+    Frame processor that evaluates calculated sensors in dependency order.
+
+    The order is resolved once; each frame then walks it, and a sensor is
+    only recomputed when one of its input values differs from the previous
+    frame, otherwise its last value is reused. Because outputs are written
+    back to the frame before dependants are visited, an unchanged upstream
+    value also spares everything downstream of it.
+    """
+
+    def __init__(self, sensors: List[CalculatedSensor]):
+        """
+        Parameters:
+        - sensors: Calculated sensors, in any order
+
+        Raises:
+        - ValueError: Two sensors share a key
+        - graphlib.CycleError: The inputs form a cycle
+        """
+        self.sensors = {}
+        for sensor in sensors:
+            if sensor.key in self.sensors:
+                raise ValueError(f"Duplicate calculated sensor {sensor.key}")
+            self.sensors[sensor.key] = sensor
+        dependencies = {key: [name for name in sensor.inputs if name in self.sensors]
+                        for key, sensor in self.sensors.items()}
+        self.order = [self.sensors[key] for key in TopologicalSorter(dependencies).static_order()]
+        self.last_inputs = {}
+        self.outputs = {}
+        self.evaluations = 0
+
+    def process(self, values: Dict):
+        """Add every calculated sensor whose inputs are present to the frame"""
+        for sensor in self.order:
+            if not any(name in values for name in sensor.inputs):
+                # Source device not configured (or not read yet)
+                self.last_inputs.pop(sensor.key, None)
+                values.pop(sensor.key, None)
+                continue
+            inputs = tuple(values.get(name) for name in sensor.inputs)
+            if sensor.key not in self.last_inputs or self.last_inputs[sensor.key] != inputs:
+                self.outputs[sensor.key] = sensor.evaluate(inputs)
+                self.last_inputs[sensor.key] = inputs
+                self.evaluations += 1
+            values[sensor.key] = self.outputs[sensor.key]
+
+    def reset(self):
+        """Forget cached results so the next frame recomputes everything"""
+        self.last_inputs.clear()
+        self.outputs.clear()
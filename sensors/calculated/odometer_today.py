@@ -1,21 +1,18 @@
-from trip_detector import TripDetector
-from dash_daq import LEDDisplay
 from sensors.sensor import Sensor
 
 class OdometerToday(Sensor):
+    """
+    Distance driven today (km), display only.
+
+    The value is added to every frame by the sampler's `trips` processor
+    (OnlineTripDetector), so nothing is read from the database here.
+    """
+
     def __init__(self):
         super().__init__(None, "odometer_today", "km", precision=2)
-        self.detector = TripDetector()
-
-    def value(self):
-        try:
-            trips = self.detector.todays_trips()
-            total_distance = sum(trip['total_distance_meters'] for trip in trips)
-            return super().value(total_distance / 1000)  # Convert to kilometers
-        except Exception as e:
-            return None
 
     def dashboard_gauge(self):
+        from dash_daq import LEDDisplay
         return LEDDisplay(
             id=self.key,
             label="Total Distance Today (km)",
@@ -23,4 +20,4 @@ class OdometerToday(Sensor):
             color="#FFFFFF",  # White numbers
             backgroundColor="#000000",  # Black background
             size=20,  # Adjust size as needed
-        )
\ No newline at end of file
+        )
@@ -0,0 +1,15 @@
+from sensors.sensor import Sensor
+from obd import commands
+
+class FuelRate(Sensor):
+    """Engine fuel rate (PID 5E); many vehicles do not support it"""
+
+    def __init__(self, device):
+        super().__init__(device, "obd_fuel_rate", "L/h", precision=2)
+        self.cmd = commands.FUEL_RATE
+
+    def value(self):
+        try:
+            return super().value(self.device.query(self.cmd))
+        except:
+            return None
@@ -0,0 +1,13 @@
+from sensors.sensor import Sensor
+from obd import commands
+
+class MAF(Sensor):
+    def __init__(self, device):
+        super().__init__(device, "obd_maf", "g/s", precision=2)
+        self.cmd = commands.MAF
+
+    def value(self):
+        try:
+            return super().value(self.device.query(self.cmd))
+        except:
+            return None
@@ -1,5 +1,4 @@
 from sensors.sensor import Sensor
-from dash_daq import LEDDisplay
 from obd import commands
 
 class Speed(Sensor):
@@ -14,6 +13,7 @@ class Speed(Sensor):
             return None
 
     def dashboard_gauge(self):
+        from dash_daq import LEDDisplay
         return LEDDisplay(
             id=self.key,
             label="Speed (kph)",
@@ -1,4 +1,3 @@
-import plotly.graph_objects as go
 from datetime import timezone
 
 class Sensor:
@@ -20,6 +19,9 @@ class Sensor:
         return timestamp.replace(tzinfo=timezone.utc).astimezone().strftime('%H:%M')
 
     def current_max_min(self, current, daily_range):
+        # Plotly is only needed by the dashboard, not by headless logging
+        import plotly.graph_objects as go
+
         step = (self.max - self.min) / 4
         base_gauge = go.Indicator(
                 mode="gauge+number",
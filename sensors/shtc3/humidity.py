@@ -1,5 +1,4 @@
 from sensors.sensor import Sensor
-from dash import dcc
 
 class Humidity(Sensor):
     def __init__(self, device):
@@ -17,6 +16,7 @@ class Humidity(Sensor):
         return super().current_max_min(current, daily_range)
 
     def dashboard_gauge(self):
+        from dash import dcc
         return dcc.Graph(
             id=self.key
         )
@@ -1,5 +1,4 @@
 from sensors.sensor import Sensor
-from dash import dcc
 
 class Temperature(Sensor):
     def __init__(self, device):
@@ -19,6 +18,7 @@ class Temperature(Sensor):
         return super().current_max_min(current, daily_range)
 
     def dashboard_gauge(self):
+        from dash import dcc
         return dcc.Graph(
             id=self.key
         )
@@ -1,35 +1,57 @@
 from pymongo import MongoClient
-from datetime import datetime
+from datetime import datetime, UTC
 from typing import List, Dict, Optional
-import math
 import os
-import pandas as pd
-from geopandas import GeoDataFrame
-from shapely.geometry import LineString
-from loggers.mongodb import MongoClient
+from loggers.mongodb import MongoClient, ensure_indexes, vehicle_filter, GPS_FIX_FILTER
 from helpers.today import Today
+from helpers.geo import haversine_distance
+from trips.online import TripStateMachine, finalize_trip
+from trips.store import TripStore
+
+def _as_utc(timestamp: datetime) -> datetime:
+    """MongoDB returns naive UTC datetimes; make them comparable with aware ones"""
+    return timestamp if timestamp.tzinfo else timestamp.replace(tzinfo=UTC)
 
 class TripDetector:
-    def __init__(self):
-        """Initialize connection to MongoDB"""
-        _, _, self.collection = MongoClient()
+    def __init__(self, collection=None, max_cached_days: int = 2, persist: bool = True, vehicle: str = None):
+        """
+        Initialize connection to MongoDB
+        
+        Parameters:
+        - collection: Optional logs collection to use instead of the default
+        - max_cached_days: Local days of trips kept in cached_trips, today included (0 keeps all)
+        - persist: Save trips and the resume checkpoint in the `trips` collection
+        - vehicle: Vehicle whose logs are read (default: this vehicle, see vehicle_filter)
+        """
+        if collection is None:
+            _, _, collection = MongoClient()
+        self.collection = collection
+        self.vehicle_filter = vehicle_filter(vehicle)
+        ensure_indexes(self.collection.database)
         self.cached_trips = []  # Store all detected trips
         self.last_processed_timestamp = None  # Track last processed log
         self.current_incomplete_trip = None  # Store ongoing trip state
+        self.next_trip_id = 1
+        self.max_cached_days = max_cached_days
+        self.store = TripStore(self.collection.database, vehicle=self.vehicle_filter['vehicle_id']) if persist else None
+        if self.store is not None:
+            self._restore_checkpoint()
+    
+    def _restore_checkpoint(self):
+        """Resume from the stored state so only logs after the checkpoint are processed"""
+        state = self.store.load_state()
+        if state is None:
+            return
+        self.last_processed_timestamp = state['last_processed_timestamp']
+        self.next_trip_id = state['next_trip_id']
+        self.current_incomplete_trip = state['current_incomplete_trip']
+        self.currently_travelling = self.current_incomplete_trip is not None
+        cutoff = Today.get_day_range(1 - self.max_cached_days)[0] if self.max_cached_days else None
+        self.cached_trips = self.store.find_trips(start_date=cutoff)
     
     def haversine_distance(self, lat1: float, lon1: float, lat2: float, lon2: float) -> float:
         """Calculate distance between two GPS coordinates in meters"""
-        R = 6371000  # Earth's radius in meters
-        
-        phi1 = math.radians(lat1)
-        phi2 = math.radians(lat2)
-        delta_phi = math.radians(lat2 - lat1)
-        delta_lambda = math.radians(lon2 - lon1)
-        
-        a = math.sin(delta_phi/2)**2 + math.cos(phi1) * math.cos(phi2) * math.sin(delta_lambda/2)**2
-        c = 2 * math.atan2(math.sqrt(a), math.sqrt(1-a))
-        
-        return R * c
+        return haversine_distance(lat1, lon1, lat2, lon2)
     
     def clear_cache(self):
         """Clear all cached trips and reset state"""
@@ -37,6 +59,53 @@ class TripDetector:
         self.last_processed_timestamp = None
         self.current_incomplete_trip = None
         self.currently_travelling = False
+        self.next_trip_id = 1
+    
+    def _eviction_cutoff(self) -> Optional[datetime]:
+        """Start of the oldest day kept in cached_trips, or None when nothing is evicted"""
+        if not self.max_cached_days:
+            return None
+        return Today.get_day_range(1 - self.max_cached_days)[0]
+    
+    def _evict_old_trips(self):
+        """Drop cached trips that started before the retained days"""
+        cutoff = self._eviction_cutoff()
+        if cutoff is None:
+            return
+        self.cached_trips = [trip for trip in self.cached_trips
+                             if _as_utc(trip['start_time']) >= cutoff]
+    
+    def _cached_trips_in_range(self, start_date: datetime = None,
+                               end_date: datetime = None) -> List[Dict]:
+        """
+        Trips in a range for detect_trips(use_cache=True)
+        
+        Ranges that start before the eviction cutoff (or have no start) are
+        read from the trips collection, since evicted trips are no longer in
+        cached_trips. Without persistence only the cached trips are left.
+        """
+        cutoff = self._eviction_cutoff()
+        if (self.store is None or cutoff is None
+                or (start_date is not None and _as_utc(start_date) >= cutoff)):
+            return self._filter_trips_by_date(self.cached_trips, start_date, end_date)
+        return self.store.find_trips(start_date, end_date)
+    
+    def load_points(self, trip: Dict) -> List[Dict]:
+        """
+        Load the full log documents of a trip from MongoDB
+        
+        Every positioned log between the trip's start and end is returned,
+        so stored trips whose track was simplified (TRIP_TRACK_TOLERANCE_M)
+        still give all of their logs.
+        
+        Parameters:
+        - trip: Trip dictionary from detect_trips() or the trips collection
+        
+        Returns:
+        - List of log documents in timestamp order
+        """
+        query = self._build_query(trip['start_time'], trip['end_time'], use_cache=False)
+        return list(self.collection.find(query).sort('timestamp', 1))
     
     def todays_trips(self, use_cache: bool = True) -> List[Dict]:
         """
@@ -55,6 +124,19 @@ class TripDetector:
         """Return all cached trips"""
         return self.cached_trips.copy()
     
+    def get_stored_trips(self, start_date: datetime = None, end_date: datetime = None,
+                         include_track: bool = True) -> List[Dict]:
+        """
+        Return persisted trips for any range of days with an indexed lookup
+        
+        Parameters:
+        - start_date/end_date: Bounds on the trip start time
+        - include_track: Set to False to skip loading the point arrays
+        """
+        if self.store is None:
+            return self._filter_trips_by_date(self.cached_trips, start_date, end_date)
+        return self.store.find_trips(start_date, end_date, include_track)
+    
     def _finalize_trip(self, current_trip: Dict, trip_id: int, 
                        min_trip_distance: float, min_trip_duration: int) -> Optional[Dict]:
         """
@@ -62,32 +144,7 @@ class TripDetector:
         
         Returns None if trip doesn't meet minimum requirements
         """
-        trip_duration = (current_trip['end_time'] - current_trip['start_time']).total_seconds()
-        
-        # Validate trip meets minimum requirements
-        if (current_trip['total_distance'] < min_trip_distance or 
-            trip_duration < min_trip_duration):
-            return None
-        
-        return {
-            'trip_id': trip_id,
-            'start_time': current_trip['start_time'],
-            'end_time': current_trip['end_time'],
-            'duration_seconds': trip_duration,
-            'start_location': {
-                'lat': current_trip['start_lat'],
-                'lon': current_trip['start_lon']
-            },
-            'end_location': {
-                'lat': current_trip['end_lat'],
-                'lon': current_trip['end_lon']
-            },
-            'total_distance_meters': current_trip['total_distance'],
-            'max_speed_ms': current_trip['max_speed'],
-            'avg_speed_ms': current_trip['total_distance'] / trip_duration if trip_duration > 0 else 0,
-            'point_count': len(current_trip['points']),
-            'points': current_trip['points']
-        }
+        return finalize_trip(current_trip, trip_id, min_trip_distance, min_trip_duration)
 
     def detect_trips(self, 
                      start_date: datetime = None,
@@ -110,146 +167,49 @@ class TripDetector:
         - min_trip_duration: Minimum duration for valid trip (seconds)
         - max_stationary_distance: Max distance for GPS drift detection (meters)
         - min_movement_speed: Minimum speed threshold to validate actual movement (m/s)
-        - use_cache: If True, only process logs after last_processed_timestamp
+        - use_cache: If True, only process logs after last_processed_timestamp.
+          Trips that started before the last max_cached_days days are read
+          back from the trips collection; without persistence a call still
+          returns the trips it detected, but later calls only return the
+          trips left in the cache (use use_cache=False for history)
         """
         
-        # Build query
-        query = {}
-        
-        if use_cache and self.last_processed_timestamp is not None:
-            # Only query logs after last processed timestamp
-            query['timestamp'] = {'$gt': self.last_processed_timestamp}
-            
-            # Also apply end_date if specified
-            if end_date:
-                query['timestamp']['$lte'] = end_date
-        else:
-            # Full query with date range
-            if start_date or end_date:
-                query['timestamp'] = {}
-                if start_date:
-                    query['timestamp']['$gte'] = start_date
-                if end_date:
-                    query['timestamp']['$lte'] = end_date
-        
         # Fetch logs sorted by timestamp
+        query = self._build_query(start_date, end_date, use_cache)
         logs = list(self.collection.find(query).sort('timestamp', 1))
         
         if not logs:
             # Return cached trips that fall within the date range
-            if use_cache and self.cached_trips:
-                return self._filter_trips_by_date(self.cached_trips, start_date, end_date)
+            if use_cache:
+                return self._cached_trips_in_range(start_date, end_date)
             return []
         
         # Initialize from cache if available
-        if use_cache and self.current_incomplete_trip is not None:
-            current_trip = self.current_incomplete_trip
-            # Get last log from incomplete trip for continuity
-            last_log = current_trip['points'][-1] if current_trip['points'] else None
-            last_log_time = current_trip['end_time']
-            stopped_since = current_trip.get('stopped_since')
-        else:
-            current_trip = None
-            last_log = None
-            last_log_time = None
-            stopped_since = None
+        machine = TripStateMachine(
+            min_speed=min_speed,
+            max_stop_duration=max_stop_duration,
+            max_stationary_distance=max_stationary_distance,
+            current_trip=self.current_incomplete_trip if use_cache else None
+        )
         
         new_trips = []
-        next_trip_id = len(self.cached_trips) + 1
         
-        for i, log in enumerate(logs):
-            lat = log.get('gps_latitude')
-            lon = log.get('gps_longitude')
-            speed = log.get('gps_speed', 0)
-            timestamp = log.get('timestamp')
-            
-            # Skip invalid GPS data
-            if lat is None or lon is None:
-                continue
-            
-            # Calculate distance from last point if available
-            distance_moved = 0
-            if last_log is not None:
-                distance_moved = self.haversine_distance(
-                    last_log['gps_latitude'], last_log['gps_longitude'],
-                    lat, lon
+        for log in logs:
+            ended, _ = machine.step(log)
+            if ended is not None:
+                finalized_trip = self._finalize_trip(
+                    ended, self.next_trip_id,
+                    min_trip_distance, min_trip_duration
                 )
-            
-            # Check for time gap between logs
-            if current_trip is not None and last_log_time is not None:
-                time_gap = (timestamp - last_log_time).total_seconds()
-                
-                # End trip if gap exceeds threshold
-                if time_gap > max_stop_duration:
-                    finalized_trip = self._finalize_trip(
-                        current_trip, next_trip_id, 
-                        min_trip_distance, min_trip_duration
-                    )
-                    if finalized_trip:
-                        new_trips.append(finalized_trip)
-                        self.cached_trips.append(finalized_trip)
-                        next_trip_id += 1
-                    
-                    current_trip = None
-                    stopped_since = None
-            
-            # Determine if vehicle is moving
-            is_moving = speed >= min_speed
-            
-            # Additional validation: check if actually moved significantly
-            if is_moving and last_log is not None:
-                time_delta = (timestamp - last_log_time).total_seconds() if last_log_time else 1
-                if distance_moved < max_stationary_distance and time_delta > 5:
-                    is_moving = False
-            
-            if is_moving:
-                stopped_since = None
-                
-                if current_trip is None:
-                    # Start new trip
-                    current_trip = {
-                        'start_time': timestamp,
-                        'start_lat': lat,
-                        'start_lon': lon,
-                        'end_time': timestamp,
-                        'end_lat': lat,
-                        'end_lon': lon,
-                        'max_speed': speed,
-                        'total_distance': 0,
-                        'points': [log]
-                    }
-                else:
-                    # Continue current trip
-                    if distance_moved > 0:
-                        current_trip['total_distance'] += distance_moved
-                    
-                    current_trip['end_time'] = timestamp
-                    current_trip['end_lat'] = lat
-                    current_trip['end_lon'] = lon
-                    current_trip['max_speed'] = max(current_trip['max_speed'], speed)
-                    current_trip['points'].append(log)
-            else:
-                # Vehicle stopped or stationary
-                if current_trip is not None:
-                    if stopped_since is None:
-                        stopped_since = timestamp
-                    
-                    stop_duration = (timestamp - stopped_since).total_seconds()
-                    if stop_duration > max_stop_duration:
-                        finalized_trip = self._finalize_trip(
-                            current_trip, next_trip_id,
-                            min_trip_distance, min_trip_duration
-                        )
-                        if finalized_trip:
-                            new_trips.append(finalized_trip)
-                            self.cached_trips.append(finalized_trip)
-                            next_trip_id += 1
-                        
-                        current_trip = None
-                        stopped_since = None
-            
-            last_log = log
-            last_log_time = timestamp
+                if finalized_trip:
+                    new_trips.append(finalized_trip)
+                    self.cached_trips.append(finalized_trip)
+                    self.next_trip_id += 1
+                    if use_cache and self.store is not None:
+                        self.store.save_trip(finalized_trip)
+        
+        current_trip = machine.current_trip
+        stopped_since = machine.stopped_since
         
         # Update state
         self.last_processed_timestamp = logs[-1].get('timestamp') if logs else self.last_processed_timestamp
@@ -263,14 +223,23 @@ class TripDetector:
             self.current_incomplete_trip = None
             self.currently_travelling = False
         
-        # Return appropriate trips based on date range
+        if use_cache and self.store is not None:
+            self.store.save_state(self.last_processed_timestamp, self.next_trip_id,
+                                  self.current_incomplete_trip)
+        
+        # Return appropriate trips based on date range, before evicting so
+        # this call returns the trips it just detected
         if use_cache:
-            return self._filter_trips_by_date(self.cached_trips, start_date, end_date)
+            trips = self._cached_trips_in_range(start_date, end_date)
+            self._evict_old_trips()
+            return trips
         else:
+            self._evict_old_trips()
+            
             # Handle incomplete trip at end for non-cached mode
             if current_trip is not None:
                 finalized_trip = self._finalize_trip(
-                    current_trip, next_trip_id,
+                    current_trip, self.next_trip_id,
                     min_trip_distance, min_trip_duration
                 )
                 if finalized_trip:
@@ -278,6 +247,59 @@ class TripDetector:
             
             return new_trips
     
+    def detect_trips_batch(self,
+                           start_date: datetime = None,
+                           end_date: datetime = None,
+                           min_speed: float = 1.0,
+                           max_stop_duration: int = 300,
+                           min_trip_distance: float = 200,
+                           min_trip_duration: int = 60,
+                           max_stationary_distance: float = 10) -> List[Dict]:
+        """
+        Detect trips over a historical range with the vectorized batch engine
+        
+        Same parameters and trips as detect_trips(use_cache=False), without
+        touching the cache. Only the GPS fields are loaded.
+        """
+        from trips.batch import FIELDS, detect_trips_batch
+        
+        query = self._build_query(start_date, end_date, use_cache=False)
+        projection = {field: 1 for field in FIELDS}
+        logs = list(self.collection.find(query, projection).sort('timestamp', 1))
+        
+        return detect_trips_batch(
+            logs,
+            min_speed=min_speed,
+            max_stop_duration=max_stop_duration,
+            min_trip_distance=min_trip_distance,
+            min_trip_duration=min_trip_duration,
+            max_stationary_distance=max_stationary_distance
+        )
+    
+    def _build_query(self, start_date: datetime = None, end_date: datetime = None,
+                     use_cache: bool = True) -> Dict:
+        """Build the logs query used by detect_trips()"""
+        # Only positioned logs are useful; this also selects the partial index
+        query = dict(GPS_FIX_FILTER, **self.vehicle_filter)
+        
+        if use_cache and self.last_processed_timestamp is not None:
+            # Only query logs after last processed timestamp
+            query['timestamp'] = {'$gt': self.last_processed_timestamp}
+            
+            # Also apply end_date if specified
+            if end_date:
+                query['timestamp']['$lte'] = end_date
+        else:
+            # Full query with date range
+            if start_date or end_date:
+                query['timestamp'] = {}
+                if start_date:
+                    query['timestamp']['$gte'] = start_date
+                if end_date:
+                    query['timestamp']['$lte'] = end_date
+        
+        return query
+    
     def _filter_trips_by_date(self, trips: List[Dict], start_date: datetime = None, 
                               end_date: datetime = None) -> List[Dict]:
         """Filter trips by date range"""
@@ -286,41 +308,50 @@ class TripDetector:
         
         filtered = []
         for trip in trips:
-            trip_start = trip['start_time']
-            if start_date and trip_start < start_date:
+            trip_start = _as_utc(trip['start_time'])
+            if start_date and trip_start < _as_utc(start_date):
                 continue
-            if end_date and trip_start > end_date:
+            if end_date and trip_start > _as_utc(end_date):
                 continue
             filtered.append(trip)
         
         return filtered
 
-    def export_trip_to_kml(self, trip: Dict, output_dir: str = "trips") -> str:
+    def export_trip_to_kml(self, trip: Dict, output_dir: str = "exports", tolerance: float = 0) -> str:
         """
         Export a single trip to KML format
         
         Parameters:
         - trip: Trip dictionary from detect_trips()
         - output_dir: Directory to save KML files
+        - tolerance: Simplify the line to within this many meters (0 keeps every point)
         
         Returns:
         - Path to the created KML file
         """
+        # GeoPandas and shapely take seconds to import on a Pi; only load them here
+        import pandas as pd
+        from geopandas import GeoDataFrame
+        from shapely.geometry import LineString
+        from trips.simplify import simplify_track
+
         os.makedirs(output_dir, exist_ok=True)
         
         trip_id = trip['trip_id']
         start_time = trip['start_time'].strftime('%Y%m%d_%H%M%S')
         filename = f"trip_{trip_id}_{start_time}.kml"
 
-        df = pd.DataFrame(trip['points'])
-        line = LineString(zip(df["gps_longitude"], df["gps_latitude"]))
+        track, max_error = simplify_track(trip['track'], tolerance)
+        line = LineString(zip(track.lons, track.lats))
         gdf_line = GeoDataFrame(
             pd.DataFrame([{
                 "id": trip_id,
                 "start": trip['start_time'].isoformat(),
                 "end": trip['end_time'].isoformat(),
                 "distance_m": trip['total_distance_meters'],
-                "duration_s": trip['duration_seconds']
+                "duration_s": trip['duration_seconds'],
+                "points": len(track),
+                "simplify_error_m": max_error
             }]),
             geometry=[line],
             crs="EPSG:4326"
@@ -330,20 +361,22 @@ class TripDetector:
         
         return filepath
     
-    def export_all_trips_to_kml(self, trips: List[Dict], output_dir: str = "trips") -> List[str]:
+    def export_all_trips_to_kml(self, trips: List[Dict], output_dir: str = "exports",
+                                tolerance: float = 0) -> List[str]:
         """
         Export all trips to individual KML files
         
         Parameters:
         - trips: List of trip dictionaries from detect_trips()
         - output_dir: Directory to save KML files
+        - tolerance: Simplification tolerance in meters (see export_trip_to_kml)
         
         Returns:
         - List of paths to created KML files
         """
         filepaths = []
         for trip in trips:
-            filepath = self.export_trip_to_kml(trip, output_dir)
+            filepath = self.export_trip_to_kml(trip, output_dir, tolerance)
             filepaths.append(filepath)
         
         return filepaths
@@ -353,11 +386,16 @@ class TripDetector:
         Generate summary statistics for trips
         
         Parameters:
-        - trips: List of trips to summarize (defaults to all cached trips)
+        - trips: List of trips to summarize (defaults to all cached trips).
+          Trips from get_stored_trips(include_track=False) work too, so
+          long ranges can be summarized without loading any tracks.
         
         Returns:
-        - Dictionary with aggregate statistics
+        - Dictionary with aggregate statistics, including the combined
+          per-trip analytics under 'analytics'
         """
+        from trips.analytics import aggregate_analytics
+
         if trips is None:
             trips = self.cached_trips
         
@@ -368,7 +406,8 @@ class TripDetector:
                 'total_duration_hours': 0,
                 'avg_trip_distance_km': 0,
                 'avg_trip_duration_minutes': 0,
-                'max_speed_kmh': 0
+                'max_speed_kmh': 0,
+                'analytics': aggregate_analytics([])
             }
         
         total_distance = sum(t['total_distance_meters'] for t in trips)
@@ -381,5 +420,6 @@ class TripDetector:
             'total_duration_hours': total_duration / 3600,
             'avg_trip_distance_km': (total_distance / len(trips)) / 1000,
             'avg_trip_duration_minutes': (total_duration / len(trips)) / 60,
-            'max_speed_kmh': max_speed * 3.6
+            'max_speed_kmh': max_speed * 3.6,
+            'analytics': aggregate_analytics(t.get('analytics') for t in trips)
         }
\ No newline at end of file
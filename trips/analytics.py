@@ -0,0 +1,127 @@
+from typing import Dict, Iterable
+import numpy as np
+from trips.batch import haversine_array
+from trips.track import TripTrack
+
+# A longer interval between two moving points means the vehicle stopped in
+# between (the trip track only keeps moving points)
+STOP_GAP_SECONDS = 5
+
+# Acceleration bin edges (m/s²); negative values are braking. Bins are
+# [low, high) except the last, and the outermost two are the hard braking
+# (< -3) and hard acceleration (>= 3) counts
+ACCELERATION_BINS = (-np.inf, -3, -2, -1, -0.5, 0.5, 1, 2, 3, np.inf)
+
+# Speed band edges (km/h)
+SPEED_BANDS_KMH = (0, 30, 50, 70, 90, 110, 130, np.inf)
+
+# Samples in the moving average applied to GPS altitude before summing climbs
+ALTITUDE_SMOOTHING = 5
+
+def _label(low: float, high: float) -> str:
+    if np.isinf(low):
+        return f"<{high:g}"
+    if np.isinf(high):
+        return f">={low:g}"
+    return f"{low:g}-{high:g}"
+
+ACCELERATION_LABELS = [_label(lo, hi) for lo, hi in zip(ACCELERATION_BINS[:-1], ACCELERATION_BINS[1:])]
+SPEED_BAND_LABELS = [_label(lo, hi) for lo, hi in zip(SPEED_BANDS_KMH[:-1], SPEED_BANDS_KMH[1:])]
+
+def _elevation(altitudes: np.ndarray):
+    """Smoothed elevation gain and loss in meters, ignoring points without altitude"""
+    altitudes = altitudes[~np.isnan(altitudes)]
+    if len(altitudes) < 2:
+        return 0.0, 0.0
+    window = min(ALTITUDE_SMOOTHING, len(altitudes))
+    smoothed = np.convolve(altitudes, np.ones(window) / window, mode='valid')
+    change = np.diff(smoothed)
+    return float(change[change > 0].sum()), float(-change[change < 0].sum())
+
+def trip_analytics(track: TripTrack, duration_seconds: float = None) -> Dict:
+    """
+    Driving statistics for one trip in a single vectorized pass over its track
+
+    Parameters:
+    - track: The trip's moving points
+    - duration_seconds: Trip duration (default: first to last point)
+
+    Returns:
+    - Dict with moving/idle time, stops, acceleration histogram (samples
+      per ACCELERATION_BINS bin), time per speed band (seconds per
+      SPEED_BANDS_KMH band) and elevation gain/loss
+    """
+    t = np.frombuffer(track.timestamps, dtype=np.int64) / 1e6
+    lats = np.frombuffer(track.lats, dtype=np.float64)
+    lons = np.frombuffer(track.lons, dtype=np.float64)
+    speeds = np.frombuffer(track.speeds, dtype=np.float64)
+    if duration_seconds is None:
+        duration_seconds = float(t[-1] - t[0]) if len(t) else 0.0
+
+    dt = np.diff(t)
+    driving = (dt > 0) & (dt <= STOP_GAP_SECONDS)
+    stops = dt[dt > STOP_GAP_SECONDS]
+    moving_seconds = float(dt[driving].sum())
+
+    # Acceleration from consecutive speeds while driving
+    acceleration = np.diff(speeds)[driving] / dt[driving]
+    acceleration_histogram, _ = np.histogram(acceleration, bins=ACCELERATION_BINS)
+
+    # Time in each speed band, using the average speed of each interval
+    interval_kmh = (speeds[:-1] + speeds[1:])[driving] / 2 * 3.6
+    speed_band_seconds, _ = np.histogram(interval_kmh, bins=SPEED_BANDS_KMH, weights=dt[driving])
+
+    gain, loss = _elevation(np.frombuffer(track.altitudes, dtype=np.float64))
+    moving_distance = float(haversine_array(lats[:-1], lons[:-1], lats[1:], lons[1:])[driving].sum())
+
+    return {
+        'moving_seconds': moving_seconds,
+        'idle_seconds': max(0.0, duration_seconds - moving_seconds),
+        'moving_distance_meters': moving_distance,
+        'stop_count': int(len(stops)),
+        'stop_seconds': float(stops.sum()),
+        'longest_stop_seconds': float(stops.max()) if len(stops) else 0.0,
+        'hard_braking_count': int(acceleration_histogram[0]),
+        'hard_acceleration_count': int(acceleration_histogram[-1]),
+        'acceleration_histogram': acceleration_histogram.tolist(),
+        'speed_band_seconds': speed_band_seconds.tolist(),
+        'elevation_gain_meters': gain,
+        'elevation_loss_meters': loss
+    }
+
+# Totals that add up across trips; the rest are maxima or histograms
+_SUMMED = ('moving_seconds', 'idle_seconds', 'moving_distance_meters', 'stop_count', 'stop_seconds',
+           'hard_braking_count', 'hard_acceleration_count', 'elevation_gain_meters', 'elevation_loss_meters')
+
+def aggregate_analytics(analytics: Iterable[Dict]) -> Dict:
+    """
+    Combine stored per-trip analytics without touching the tracks
+
+    Returns:
+    - Dict with the summed totals, the longest stop, labelled histograms
+      and the average moving speed
+    """
+    totals = {key: 0 for key in _SUMMED}
+    longest_stop = 0.0
+    acceleration = np.zeros(len(ACCELERATION_LABELS), dtype=np.int64)
+    speed_bands = np.zeros(len(SPEED_BAND_LABELS))
+    trips = 0
+    for item in analytics:
+        if not item:
+            continue
+        trips += 1
+        for key in _SUMMED:
+            totals[key] += item[key]
+        longest_stop = max(longest_stop, item['longest_stop_seconds'])
+        acceleration += item['acceleration_histogram']
+        speed_bands += item['speed_band_seconds']
+
+    moving = totals['moving_seconds']
+    return {
+        'trips': trips,
+        **totals,
+        'longest_stop_seconds': longest_stop,
+        'avg_moving_speed_kmh': totals['moving_distance_meters'] / moving * 3.6 if moving else 0,
+        'acceleration_histogram': dict(zip(ACCELERATION_LABELS, acceleration.tolist())),
+        'speed_band_seconds': dict(zip(SPEED_BAND_LABELS, speed_bands.tolist()))
+    }
@@ -0,0 +1,232 @@
+import argparse
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, UTC
+from typing import Dict, List
+from helpers.today import Today
+from loggers.mongodb import MongoClient, vehicle_filter, GPS_FIX_FILTER
+from trips.batch import FIELDS, to_columns, point_deltas, classify_points, group_trips, build_raw_trips
+from trips.online import finalize_trip
+from trips.track import TripTrack
+
+DEFAULT_PARAMS = {
+    'min_speed': 1.0,
+    'max_stop_duration': 300,
+    'min_trip_distance': 200,
+    'min_trip_duration': 60,
+    'max_stationary_distance': 10
+}
+
+def day_partitions(start: datetime, end: datetime) -> List[tuple]:
+    """
+    Split [start, end) at local midnights, like helpers.today.Today
+
+    Returns:
+    - List of (start, end) tuples in UTC
+    """
+    partitions = []
+    cursor = start
+    while cursor < end:
+        _, day_end = Today.day_range_for(cursor)
+        partitions.append((cursor, min(day_end, end)))
+        cursor = day_end
+    return partitions
+
+def detect_partition_logs(logs: List[Dict], halo: Dict = None, params: Dict = None) -> Dict:
+    """
+    Detect trips in one partition as if no trip was in progress at its start
+
+    Parameters:
+    - logs: Partition logs sorted by timestamp
+    - halo: Last log before the partition (inside the backfill range), so
+      the first point's moving and gap flags match a serial pass
+    - params: Detection thresholds (see DEFAULT_PARAMS)
+
+    Returns:
+    - Dict with the partition's raw trips and what stitch() needs to join
+      them with the partitions on either side
+    """
+    params = {**DEFAULT_PARAMS, **(params or {})}
+    rows = ([halo] if halo else []) + logs
+    columns = to_columns(rows)
+    distance, gap_us = point_deltas(columns)
+    moving, gap = classify_points(columns, distance, gap_us, params['min_speed'],
+                                  params['max_stop_duration'], params['max_stationary_distance'])
+    if halo and len(columns['t']):
+        # The halo belongs to the previous partition; it only informs row 1
+        columns = {key: value[1:] for key, value in columns.items()}
+        distance, moving, gap = distance[1:], moving[1:], gap[1:]
+
+    t = columns['t']
+    n = len(t)
+    if n == 0:
+        return {'count': 0}
+
+    moving_index, starts, ends, group = group_trips(t, moving, gap, params['max_stop_duration'])
+    trips = build_raw_trips(rows, columns, distance, moving_index, starts, ends)
+
+    # Leading stop (before the first moving point), for a trip carried in
+    first_moving = int(moving_index[0]) if len(moving_index) else n
+    result = {
+        'count': n,
+        'trips': trips,
+        'has_moving': len(moving_index) > 0,
+        'first_time': int(t[0]),
+        'lead_gap': bool(gap[:min(first_moving + 1, n)].any()),
+        'lead_last_time': int(t[first_moving - 1]) if first_moving > 0 else None,
+        'open': False,
+        'tail_stop': None
+    }
+
+    # Is the last trip still in progress at the end of the partition?
+    if len(moving_index):
+        last_moving = int(moving_index[-1])
+        if group[last_moving] == group[-1]:
+            result['open'] = True
+            if last_moving < n - 1:
+                result['tail_stop'] = int(t[last_moving + 1])
+    return result
+
+def _load_partition(collection, range_start: datetime, start: datetime, end: datetime, vehicle: str = None):
+    """Load a partition's logs and the last log before it within the backfill range"""
+    projection = {field: 1 for field in FIELDS}
+    scope = dict(GPS_FIX_FILTER, **vehicle_filter(vehicle))
+    halo = None
+    if start > range_start:
+        query = dict(scope, timestamp={'$gte': range_start, '$lt': start})
+        halo = next(iter(collection.find(query, projection).sort('timestamp', -1).limit(1)), None)
+    query = dict(scope, timestamp={'$gte': start, '$lt': end})
+    logs = list(collection.find(query, projection).sort('timestamp', 1))
+    return logs, halo
+
+def _detect_partition(args) -> Dict:
+    """Process pool worker: each process opens its own MongoDB connection"""
+    range_start, start, end, params, vehicle = args
+    client, _, collection = MongoClient()
+    try:
+        logs, halo = _load_partition(collection, range_start, start, end, vehicle)
+    finally:
+        client.close()
+    return detect_partition_logs(logs, halo, params)
+
+def _join(carried: Dict, trip: Dict) -> Dict:
+    """Continue a trip carried over from an earlier partition with the next partition's first trip"""
+    track = TripTrack()
+    track.extend(carried['track'])
+    track.extend(trip['track'])
+    return {
+        **carried,
+        'end_time': trip['end_time'],
+        'end_lat': trip['end_lat'],
+        'end_lon': trip['end_lon'],
+        'max_speed': max(carried['max_speed'], trip['max_speed']),
+        'total_distance': carried['total_distance'] + trip['first_distance'] + trip['total_distance'],
+        'track': track
+    }
+
+def stitch(results: List[Dict], max_stop_duration: int = 300) -> List[Dict]:
+    """
+    Join partition results, in time order, into the raw trips of one serial pass
+
+    A trip still in progress at the end of a partition either ends in the
+    next partition's leading stop (long gap or stop longer than
+    max_stop_duration) or continues into that partition's first trip.
+    """
+    max_stop_us = max_stop_duration * 1_000_000
+    raw_trips = []
+    carried = None
+    carried_stop = None
+
+    for result in results:
+        if result['count'] == 0:
+            continue
+        trips = list(result['trips'])
+
+        if carried is not None:
+            ended = result['lead_gap']
+            if not ended and result['lead_last_time'] is not None:
+                stopped_since = carried_stop if carried_stop is not None else result['first_time']
+                ended = result['lead_last_time'] - stopped_since > max_stop_us
+            if ended:
+                raw_trips.append(carried)
+            elif result['has_moving']:
+                trips[0] = _join(carried, trips[0])
+            else:
+                # Still stopped, but not for long enough to end the trip
+                if carried_stop is None:
+                    carried_stop = result['first_time']
+                continue
+            carried = None
+            carried_stop = None
+
+        if trips and result['open']:
+            carried = trips.pop()
+            carried_stop = result['tail_stop']
+        raw_trips.extend(trips)
+
+    if carried is not None:
+        raw_trips.append(carried)
+    return raw_trips
+
+def backfill(start: datetime, end: datetime, workers: int = None,
+             params: Dict = None, persist: bool = True, vehicle: str = None) -> List[Dict]:
+    """
+    Rebuild trips for [start, end) with one day partition per task
+
+    Gives the same trips as a single detect_trips(use_cache=False) pass over
+    the range.
+
+    Parameters:
+    - start/end: Range to rebuild (aware datetimes)
+    - workers: Process count (default: all cores)
+    - params: Detection thresholds (see DEFAULT_PARAMS)
+    - persist: Save the trips to the `trips` collection, numbered from
+      the detector checkpoint's next_trip_id (which is advanced past them)
+    - vehicle: Vehicle whose logs are read (default: this vehicle)
+
+    Returns:
+    - List of finalized trips
+    """
+    params = {**DEFAULT_PARAMS, **(params or {})}
+    tasks = [(start, part_start, part_end, params, vehicle) for part_start, part_end in day_partitions(start, end)]
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        results = list(pool.map(_detect_partition, tasks))
+
+    trips = []
+    for raw_trip in stitch(results, params['max_stop_duration']):
+        trip = finalize_trip(raw_trip, len(trips) + 1,
+                             params['min_trip_distance'], params['min_trip_duration'])
+        if trip is not None:
+            trips.append(trip)
+
+    if persist and trips:
+        from trips.store import TripStore
+        client, db, _ = MongoClient()
+        store = TripStore(db, vehicle=vehicle)
+        first_id = store.reserve_trip_ids(len(trips))
+        for offset, trip in enumerate(trips):
+            trip['trip_id'] = first_id + offset
+            store.save_trip(trip)
+        client.close()
+    return trips
+
+def _local_date(value: str) -> datetime:
+    """Parse YYYY-MM-DD as local midnight, in UTC"""
+    return datetime.fromisoformat(value).astimezone().astimezone(UTC)
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Rebuild trips from the raw logs in parallel")
+    parser.add_argument('--start', required=True, type=_local_date, help="first day (YYYY-MM-DD, local)")
+    parser.add_argument('--end', type=_local_date, help="day after the last one (default: today)")
+    parser.add_argument('--workers', type=int, default=os.cpu_count())
+    parser.add_argument('--dry-run', action='store_true', help="detect without writing to the trips collection")
+    args = parser.parse_args()
+
+    end = args.end or Today.start()
+    started = time.perf_counter()
+    trips = backfill(args.start, end, args.workers, persist=not args.dry_run)
+    elapsed = time.perf_counter() - started
+    distance = sum(trip['total_distance_meters'] for trip in trips) / 1000
+    print(f"[OK] {len(trips)} trips, {distance:.1f} km in {elapsed:.1f}s with {args.workers} workers")
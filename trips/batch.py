@@ -0,0 +1,222 @@
+from typing import Dict, List
+import numpy as np
+from helpers.geo import EARTH_RADIUS_M
+from trips.online import finalize_trip
+from trips.track import TripTrack, to_epoch_us
+
+# Fields the batch engine needs from each log
+FIELDS = ('timestamp', 'gps_latitude', 'gps_longitude', 'gps_speed', 'gps_altitude')
+
+def haversine_array(lat1, lon1, lat2, lon2):
+    """Vectorized haversine distance in meters between arrays of coordinates"""
+    phi1 = np.radians(lat1)
+    phi2 = np.radians(lat2)
+    delta_phi = np.radians(lat2 - lat1)
+    delta_lambda = np.radians(lon2 - lon1)
+
+    a = np.sin(delta_phi/2)**2 + np.cos(phi1) * np.cos(phi2) * np.sin(delta_lambda/2)**2
+    c = 2 * np.arctan2(np.sqrt(a), np.sqrt(1-a))
+
+    return EARTH_RADIUS_M * c
+
+def epoch_us(timestamps) -> np.ndarray:
+    """Convert datetimes (aware, or naive UTC as returned by MongoDB) to int64 microseconds since the epoch"""
+    return np.fromiter((to_epoch_us(t) for t in timestamps),
+                       dtype=np.int64, count=len(timestamps))
+
+def to_columns(logs: List[Dict]) -> Dict[str, np.ndarray]:
+    """
+    Turn logs into column arrays, dropping logs without a GPS position
+
+    Returns:
+    - Dict with 't' (int64 microseconds), 'lat', 'lon', 'speed', 'alt'
+      (NaN when missing) and 'index' (position of each row in `logs`)
+    """
+    index = [i for i, log in enumerate(logs)
+             if log.get('gps_latitude') is not None and log.get('gps_longitude') is not None]
+    rows = [logs[i] for i in index]
+    count = len(rows)
+    return {
+        't': epoch_us([row['timestamp'] for row in rows]),
+        'lat': np.fromiter((row['gps_latitude'] for row in rows), dtype=np.float64, count=count),
+        'lon': np.fromiter((row['gps_longitude'] for row in rows), dtype=np.float64, count=count),
+        'speed': np.fromiter((row.get('gps_speed') or 0 for row in rows), dtype=np.float64, count=count),
+        'alt': np.fromiter((np.nan if row.get('gps_altitude') is None else row['gps_altitude'] for row in rows),
+                           dtype=np.float64, count=count),
+        'index': np.array(index, dtype=np.int64)
+    }
+
+def point_deltas(columns: Dict[str, np.ndarray]):
+    """
+    Distance (meters) and time gap (microseconds) from the previous point
+
+    Both are 0 for the first point. These only depend on the data, so they
+    can be computed once and reused for any set of thresholds.
+    """
+    n = len(columns['t'])
+    distance = np.zeros(n)
+    gap_us = np.zeros(n, dtype=np.int64)
+    if n > 1:
+        distance[1:] = haversine_array(columns['lat'][:-1], columns['lon'][:-1],
+                                       columns['lat'][1:], columns['lon'][1:])
+        gap_us[1:] = np.diff(columns['t'])
+    return distance, gap_us
+
+def classify_points(columns: Dict[str, np.ndarray],
+                    distance: np.ndarray,
+                    gap_us: np.ndarray,
+                    min_speed: float = 1.0,
+                    max_stop_duration: int = 300,
+                    max_stationary_distance: float = 10):
+    """
+    Per-point moving and long-gap flags
+
+    Each flag only depends on the point and the one before it.
+
+    Returns:
+    - moving: Vehicle considered moving at this point
+    - gap: Time since the previous point is longer than max_stop_duration
+    """
+    n = len(columns['t'])
+
+    # Moving flags, including the GPS drift check against the previous point
+    moving = columns['speed'] >= min_speed
+    moving[1:] &= ~((distance[1:] < max_stationary_distance) & (gap_us[1:] > 5_000_000))
+
+    # A long gap ends any trip in progress
+    gap = np.zeros(n, dtype=bool)
+    gap[1:] = gap_us[1:] > max_stop_duration * 1_000_000
+    return moving, gap
+
+def group_trips(t: np.ndarray, moving: np.ndarray, gap: np.ndarray, max_stop_duration: int = 300):
+    """
+    Find raw trip boundaries with array operations
+
+    Mirrors TripStateMachine: a trip is the run of moving points between
+    breaks, where a break is either a time gap longer than max_stop_duration
+    or the first point of a stop that has lasted longer than
+    max_stop_duration. Assumes no trip is in progress before the first point.
+
+    Returns:
+    - moving_index: Row numbers of the moving points, in order
+    - starts, ends: Slices of moving_index belonging to each trip
+    - group: Number of breaks up to and including each row
+    """
+    n = len(t)
+    empty = np.zeros(0, dtype=np.int64)
+    if n == 0:
+        return empty, empty, empty, empty
+
+    max_stop_us = max_stop_duration * 1_000_000
+    rows = np.arange(n)
+
+    # Stops: runs of non-moving points. A stop only counts against a trip
+    # when it directly follows a moving point without a gap in between.
+    previous_moving = np.zeros(n, dtype=bool)
+    previous_moving[1:] = moving[:-1]
+    run_start = ~moving & (previous_moving | gap | (rows == 0))
+    run_start_row = np.maximum.accumulate(np.where(run_start, rows, 0))
+    in_trip = previous_moving & ~gap
+    stop_duration = t - t[run_start_row]
+    exceeded = ~moving & in_trip[run_start_row] & (stop_duration > max_stop_us)
+    first_exceeded = exceeded.copy()
+    first_exceeded[1:] &= ~(exceeded[:-1] & ~run_start[1:])
+
+    # Every break starts a new group; a trip is the moving points of a group
+    group = np.cumsum(gap | first_exceeded)
+    moving_index = np.flatnonzero(moving)
+    if len(moving_index) == 0:
+        return moving_index, empty, empty, group
+    moving_group = group[moving_index]
+    starts = np.concatenate(([0], np.flatnonzero(np.diff(moving_group)) + 1))
+    ends = np.concatenate((starts[1:], [len(moving_index)]))
+    return moving_index, starts, ends, group
+
+def segment_trips(columns: Dict[str, np.ndarray],
+                  distance: np.ndarray,
+                  gap_us: np.ndarray,
+                  min_speed: float = 1.0,
+                  max_stop_duration: int = 300,
+                  max_stationary_distance: float = 10):
+    """
+    Classify points and find raw trip boundaries
+
+    Returns:
+    - moving_index, starts, ends: See group_trips()
+    """
+    moving, gap = classify_points(columns, distance, gap_us, min_speed,
+                                  max_stop_duration, max_stationary_distance)
+    moving_index, starts, ends, _ = group_trips(columns['t'], moving, gap, max_stop_duration)
+    return moving_index, starts, ends
+
+def build_raw_trips(logs: List[Dict],
+                    columns: Dict[str, np.ndarray],
+                    distance: np.ndarray,
+                    moving_index: np.ndarray,
+                    starts: np.ndarray,
+                    ends: np.ndarray) -> List[Dict]:
+    """
+    Build unvalidated trips in the same shape TripStateMachine produces
+
+    Each trip also records 'first_distance', the distance from the point
+    before its first point, which is needed to join it onto a trip that was
+    still in progress (see trips.backfill).
+    """
+    if len(starts) == 0:
+        return []
+
+    # Distance added by each moving point; the first point of a trip adds none
+    moving_distance = distance[moving_index]
+    cumulative = np.cumsum(moving_distance)
+    totals = cumulative[ends - 1] - cumulative[starts]
+    max_speeds = np.maximum.reduceat(columns['speed'][moving_index], starts)
+
+    trips = []
+    for start, end, total, max_speed in zip(starts, ends, totals, max_speeds):
+        rows = moving_index[start:end]
+        first, last = logs[columns['index'][rows[0]]], logs[columns['index'][rows[-1]]]
+        trips.append({
+            'start_time': first['timestamp'],
+            'start_lat': first['gps_latitude'],
+            'start_lon': first['gps_longitude'],
+            'end_time': last['timestamp'],
+            'end_lat': last['gps_latitude'],
+            'end_lon': last['gps_longitude'],
+            'max_speed': float(max_speed),
+            'total_distance': float(total),
+            'first_distance': float(moving_distance[start]),
+            'track': TripTrack.from_arrays(columns['t'][rows], columns['lat'][rows],
+                                           columns['lon'][rows], columns['speed'][rows],
+                                           columns['alt'][rows])
+        })
+    return trips
+
+def detect_trips_batch(logs: List[Dict],
+                       min_speed: float = 1.0,
+                       max_stop_duration: int = 300,
+                       min_trip_distance: float = 200,
+                       min_trip_duration: int = 60,
+                       max_stationary_distance: float = 10,
+                       first_trip_id: int = 1) -> List[Dict]:
+    """
+    Detect trips in a list of logs sorted by timestamp
+
+    Produces the same trips as TripDetector.detect_trips(use_cache=False)
+    but computes distances, gaps and moving flags with NumPy instead of a
+    Python loop per point.
+    """
+    columns = to_columns(logs)
+    distance, gap_us = point_deltas(columns)
+    moving_index, starts, ends = segment_trips(
+        columns, distance, gap_us,
+        min_speed, max_stop_duration, max_stationary_distance
+    )
+
+    trips = []
+    trip_id = first_trip_id
+    for raw_trip in build_raw_trips(logs, columns, distance, moving_index, starts, ends):
+        trip = finalize_trip(raw_trip, trip_id, min_trip_distance, min_trip_duration)
+        if trip is not None:
+            trips.append(trip)
+            trip_id += 1
+    return trips
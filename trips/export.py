@@ -0,0 +1,222 @@
+import argparse
+import json
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from typing import Callable, Dict, Iterable, Iterator, List, TextIO
+import numpy as np
+from trips.simplify import simplify_track
+
+FORMATS = ('kml', 'gpx', 'geojson')
+
+# Default output directory (not `trips/`, which is this package)
+EXPORT_DIR = 'exports'
+
+# Trips being rendered per worker process; bounds memory for any number of trips
+TASKS_PER_WORKER = 4
+
+def _iso(timestamp: datetime) -> str:
+    return timestamp.isoformat()
+
+def _point_times(track) -> List[str]:
+    """UTC ISO 8601 times of a track's points"""
+    timestamps = np.frombuffer(track.timestamps, dtype=np.int64).astype('datetime64[us]')
+    return [f'{t}Z' for t in np.datetime_as_string(timestamps, unit='s')]
+
+def _properties(trip: Dict, points: int, max_error: float) -> Dict:
+    """Per-trip attributes, the same ones the GeoDataFrame KML export writes"""
+    return {
+        'id': trip['trip_id'],
+        'start': _iso(trip['start_time']),
+        'end': _iso(trip['end_time']),
+        'distance_m': trip['total_distance_meters'],
+        'duration_s': trip['duration_seconds'],
+        'points': points,
+        'simplify_error_m': max_error
+    }
+
+# KML
+
+KML_HEADER = ('<?xml version="1.0" encoding="utf-8"?>\n'
+              '<kml xmlns="http://www.opengis.net/kml/2.2">\n<Document>\n')
+KML_FOOTER = '</Document>\n</kml>\n'
+
+def kml_placemark(trip: Dict, tolerance: float = 0) -> str:
+    """One trip as a KML Placemark with a LineString"""
+    track, max_error = simplify_track(trip['track'], tolerance)
+    properties = _properties(trip, len(track), max_error)
+    data = ''.join(f'<Data name="{key}"><value>{value}</value></Data>'
+                   for key, value in properties.items())
+    coordinates = ' '.join(f'{lon:.7f},{lat:.7f}' for lon, lat in zip(track.lons, track.lats))
+    return (f'<Placemark><name>Trip {trip["trip_id"]}</name>'
+            f'<ExtendedData>{data}</ExtendedData>'
+            f'<LineString><coordinates>{coordinates}</coordinates></LineString>'
+            f'</Placemark>\n')
+
+# GPX
+
+GPX_HEADER = ('<?xml version="1.0" encoding="utf-8"?>\n'
+              '<gpx version="1.1" creator="TripTelemetry" xmlns="http://www.topografix.com/GPX/1/1">\n')
+GPX_FOOTER = '</gpx>\n'
+
+def gpx_track(trip: Dict, tolerance: float = 0) -> str:
+    """One trip as a GPX track with timestamped points"""
+    track, max_error = simplify_track(trip['track'], tolerance)
+    properties = _properties(trip, len(track), max_error)
+    description = ', '.join(f'{key}={value}' for key, value in properties.items())
+    points = ''.join(f'<trkpt lat="{lat:.7f}" lon="{lon:.7f}"><time>{time}</time></trkpt>'
+                     for time, lat, lon in zip(_point_times(track), track.lats, track.lons))
+    return (f'<trk><name>Trip {trip["trip_id"]}</name><desc>{description}</desc>'
+            f'<trkseg>{points}</trkseg></trk>\n')
+
+# GeoJSON
+
+GEOJSON_HEADER = '{"type": "FeatureCollection", "features": [\n'
+GEOJSON_FOOTER = '\n]}\n'
+
+def geojson_feature(trip: Dict, tolerance: float = 0) -> str:
+    """One trip as a GeoJSON LineString Feature; point times go in coordTimes"""
+    track, max_error = simplify_track(trip['track'], tolerance)
+    properties = _properties(trip, len(track), max_error)
+    properties['coordTimes'] = _point_times(track)
+    coordinates = ','.join(f'[{lon:.7f},{lat:.7f}]' for lon, lat in zip(track.lons, track.lats))
+    return ('{"type": "Feature", "properties": ' + json.dumps(properties) +
+            ', "geometry": {"type": "LineString", "coordinates": [' + coordinates + ']}}')
+
+# Format table: (header, render one trip, separator between trips, footer)
+WRITERS = {
+    'kml': (KML_HEADER, kml_placemark, '', KML_FOOTER),
+    'gpx': (GPX_HEADER, gpx_track, '', GPX_FOOTER),
+    'geojson': (GEOJSON_HEADER, geojson_feature, ',\n', GEOJSON_FOOTER)
+}
+
+def write_trips(trips: Iterable[Dict], output: TextIO, fmt: str = 'kml', tolerance: float = 0) -> int:
+    """
+    Stream trips into one open file, one trip at a time
+
+    Parameters:
+    - trips: Trips from TripDetector (any iterable, consumed lazily)
+    - output: Text file to write to
+    - fmt: One of FORMATS
+    - tolerance: Simplify each track to within this many meters (0 keeps every point)
+
+    Returns:
+    - Number of trips written
+    """
+    header, render, separator, footer = WRITERS[fmt]
+    output.write(header)
+    count = 0
+    for trip in trips:
+        if count:
+            output.write(separator)
+        output.write(render(trip, tolerance))
+        count += 1
+    output.write(footer)
+    return count
+
+def trip_filename(trip: Dict, fmt: str = 'kml') -> str:
+    """File name used for a single exported trip"""
+    start_time = trip['start_time'].strftime('%Y%m%d_%H%M%S')
+    return f"trip_{trip['trip_id']}_{start_time}.{fmt}"
+
+def export_trip(trip: Dict, output_dir: str = EXPORT_DIR, fmt: str = 'kml', tolerance: float = 0) -> str:
+    """
+    Export one trip to its own file
+
+    Returns:
+    - Path to the created file
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    filepath = os.path.join(output_dir, trip_filename(trip, fmt))
+    with open(filepath, 'w', encoding='utf-8') as output:
+        write_trips([trip], output, fmt, tolerance)
+    return filepath
+
+def _export_one(args) -> str:
+    return export_trip(*args)
+
+def _render_one(args) -> str:
+    trip, fmt, tolerance = args
+    return WRITERS[fmt][1](trip, tolerance)
+
+def _bounded_map(pool: ProcessPoolExecutor, function: Callable, items: Iterable, window: int) -> Iterator:
+    """
+    Ordered pool.map that keeps at most `window` tasks in flight
+
+    Executor.map (and Pool.imap's feeder thread) read the whole input up
+    front; here the next item is only taken once the oldest one is done,
+    so a cursor of trips is never held in memory.
+    """
+    pending = deque()
+    for item in items:
+        pending.append(pool.submit(function, item))
+        if len(pending) >= window:
+            yield pending.popleft().result()
+    while pending:
+        yield pending.popleft().result()
+
+def export_trips(trips: Iterable[Dict], output_dir: str = EXPORT_DIR, fmt: str = 'kml',
+                 tolerance: float = 0, workers: int = 1, filename: str = None) -> List[str]:
+    """
+    Export trips to one file per trip, or to a single file
+
+    Parameters:
+    - trips: Trips from TripDetector or TripStore.iter_trips() (consumed lazily)
+    - output_dir: Directory to write to
+    - fmt: One of FORMATS
+    - tolerance: Simplification tolerance in meters (0 keeps every point)
+    - workers: Processes used to render trips (1 renders in this process)
+    - filename: Write every trip into this one file instead
+
+    Returns:
+    - Paths of the created files
+    """
+    if fmt not in WRITERS:
+        raise ValueError(f"Unknown export format {fmt!r}, expected one of {', '.join(FORMATS)}")
+    os.makedirs(output_dir, exist_ok=True)
+    window = TASKS_PER_WORKER * (workers or os.cpu_count() or 1)
+
+    if filename is not None:
+        filepath = os.path.join(output_dir, filename)
+        with open(filepath, 'w', encoding='utf-8') as output:
+            if workers == 1:
+                write_trips(trips, output, fmt, tolerance)
+            else:
+                # Render in parallel, write in order as fragments arrive
+                header, _, separator, footer = WRITERS[fmt]
+                with ProcessPoolExecutor(max_workers=workers) as pool:
+                    tasks = ((trip, fmt, tolerance) for trip in trips)
+                    output.write(header)
+                    for i, fragment in enumerate(_bounded_map(pool, _render_one, tasks, window)):
+                        if i:
+                            output.write(separator)
+                        output.write(fragment)
+                    output.write(footer)
+        return [filepath]
+
+    tasks = ((trip, output_dir, fmt, tolerance) for trip in trips)
+    if workers == 1:
+        return [_export_one(task) for task in tasks]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return list(_bounded_map(pool, _export_one, tasks, window))
+
+if __name__ == '__main__':
+    from loggers.mongodb import MongoClient
+    from trips.store import TripStore
+
+    parser = argparse.ArgumentParser(description="Export stored trips to KML, GPX or GeoJSON")
+    parser.add_argument('--format', choices=FORMATS, default='kml')
+    parser.add_argument('--output-dir', default=EXPORT_DIR)
+    parser.add_argument('--single-file', metavar='NAME', help="write all trips into one file")
+    parser.add_argument('--tolerance', type=float, default=0, help="simplify tracks to within this many meters")
+    parser.add_argument('--workers', type=int, default=os.cpu_count())
+    args = parser.parse_args()
+
+    # Trips come straight off the cursor, so only the trips being rendered are in memory
+    _, db, _ = MongoClient()
+    store = TripStore(db)
+    count = store.trips.count_documents(store.scope)
+    paths = export_trips(store.iter_trips(), args.output_dir, args.format, args.tolerance,
+                         args.workers, args.single_file)
+    print(f"[OK] Exported {count} trips to {len(paths)} file(s) in {args.output_dir}")
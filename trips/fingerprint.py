@@ -0,0 +1,62 @@
+import hashlib
+import math
+import random
+from typing import Dict, List, Optional, Set, Tuple
+
+# Grid cell size in degrees (about 220 m north-south), coarse enough that
+# GPS noise rarely moves a repeated route into different cells
+CELL_DEGREES = 0.002
+
+# MinHash signature length, split into LSH bands of BAND_ROWS values.
+# Two routes with Jaccard similarity s share at least one band with
+# probability 1 - (1 - s^BAND_ROWS)^BANDS: 0.99 at s=0.5, 0.15 at s=0.1.
+SIGNATURE_SIZE = 32
+BAND_ROWS = 2
+BANDS = SIGNATURE_SIZE // BAND_ROWS
+
+# Mersenne prime for the hash permutations; keeps every product below 2**62
+_PRIME = (1 << 31) - 1
+
+# Fixed seed: signatures must stay comparable across runs and processes
+_rng = random.Random(20251019)
+_PERMUTATIONS = [(_rng.randrange(1, _PRIME), _rng.randrange(0, _PRIME)) for _ in range(SIGNATURE_SIZE)]
+
+def route_cells(track) -> Set[Tuple[int, int]]:
+    """Grid cells a track passes through"""
+    return {(math.floor(lat / CELL_DEGREES), math.floor(lon / CELL_DEGREES))
+            for lat, lon in zip(track.lats, track.lons)}
+
+def _cell_hash(cell: Tuple[int, int]) -> int:
+    digest = hashlib.blake2b(f"{cell[0]},{cell[1]}".encode(), digest_size=8).digest()
+    return int.from_bytes(digest, 'little') % _PRIME
+
+def minhash(cells: Set[Tuple[int, int]]) -> List[int]:
+    """MinHash signature of a set of cells; equal positions estimate Jaccard similarity"""
+    hashes = [_cell_hash(cell) for cell in cells]
+    return [min((a * x + b) % _PRIME for x in hashes) for a, b in _PERMUTATIONS]
+
+def band_keys(signature: List[int]) -> List[str]:
+    """LSH bucket key per band; similar routes share at least one key"""
+    keys = []
+    for band in range(BANDS):
+        rows = signature[band * BAND_ROWS:(band + 1) * BAND_ROWS]
+        digest = hashlib.blake2b(','.join(map(str, rows)).encode(), digest_size=8).hexdigest()
+        keys.append(f"{band}:{digest}")
+    return keys
+
+def route_fingerprint(track) -> Optional[Dict]:
+    """
+    Fingerprint fields stored with a finalized trip
+
+    Returns:
+    - Dict with route_signature (MinHash of the visited cells) and
+      route_bands (indexed LSH keys), or None for an empty track
+    """
+    if not len(track):
+        return None
+    signature = minhash(route_cells(track))
+    return {'route_signature': signature, 'route_bands': band_keys(signature)}
+
+def similarity(signature: List[int], other: List[int]) -> float:
+    """Estimated Jaccard similarity of two routes' cell sets"""
+    return sum(a == b for a, b in zip(signature, other)) / SIGNATURE_SIZE
@@ -0,0 +1,287 @@
+from datetime import datetime, UTC
+from typing import Callable, Dict, List, Optional, Tuple
+from helpers.geo import haversine_distance
+from helpers.today import Today
+from trips.track import TripTrack
+
+def finalize_trip(current_trip: Dict, trip_id: int,
+                  min_trip_distance: float, min_trip_duration: int) -> Optional[Dict]:
+    """
+    Validate and format a trip for output
+
+    Returns None if trip doesn't meet minimum requirements
+    """
+    trip_duration = (current_trip['end_time'] - current_trip['start_time']).total_seconds()
+
+    # Validate trip meets minimum requirements
+    if (current_trip['total_distance'] < min_trip_distance or
+        trip_duration < min_trip_duration):
+        return None
+
+    # NumPy is only needed once a trip ends
+    from trips.analytics import trip_analytics
+
+    return {
+        'trip_id': trip_id,
+        'start_time': current_trip['start_time'],
+        'end_time': current_trip['end_time'],
+        'duration_seconds': trip_duration,
+        'start_location': {
+            'lat': current_trip['start_lat'],
+            'lon': current_trip['start_lon']
+        },
+        'end_location': {
+            'lat': current_trip['end_lat'],
+            'lon': current_trip['end_lon']
+        },
+        'total_distance_meters': current_trip['total_distance'],
+        'max_speed_ms': current_trip['max_speed'],
+        'avg_speed_ms': current_trip['total_distance'] / trip_duration if trip_duration > 0 else 0,
+        'point_count': len(current_trip['track']),
+        'analytics': trip_analytics(current_trip['track'], trip_duration),
+        'track': current_trip['track']
+    }
+
+class TripStateMachine:
+    """
+    Per-point trip detection state shared by TripDetector.detect_trips and
+    OnlineTripDetector. Feed logs in timestamp order with step().
+    """
+
+    def __init__(self,
+                 min_speed: float = 1.0,
+                 max_stop_duration: int = 300,
+                 max_stationary_distance: float = 10,
+                 current_trip: Dict = None):
+        """
+        Parameters:
+        - min_speed: Minimum speed to consider vehicle moving (m/s)
+        - max_stop_duration: Maximum stop time before trip ends (seconds)
+        - max_stationary_distance: Max distance for GPS drift detection (meters)
+        - current_trip: Incomplete trip to resume, as left by a previous run
+        """
+        self.min_speed = min_speed
+        self.max_stop_duration = max_stop_duration
+        self.max_stationary_distance = max_stationary_distance
+
+        self.current_trip = current_trip
+        if current_trip is not None:
+            # Get last point from incomplete trip for continuity
+            track = current_trip['track']
+            self.last_log = {
+                'gps_latitude': track.lats[-1],
+                'gps_longitude': track.lons[-1]
+            } if len(track) else None
+            self.last_log_time = current_trip['end_time']
+            self.stopped_since = current_trip.get('stopped_since')
+        else:
+            self.last_log = None
+            self.last_log_time = None
+            self.stopped_since = None
+
+    def step(self, log: Dict) -> Tuple[Optional[Dict], Optional[Dict]]:
+        """
+        Process one log
+
+        Returns:
+        - (ended, started): the raw trip this log closed and the trip it
+          opened, each None if that did not happen
+        """
+        lat = log.get('gps_latitude')
+        lon = log.get('gps_longitude')
+        speed = log.get('gps_speed') or 0
+        altitude = log.get('gps_altitude')
+        timestamp = log.get('timestamp')
+
+        # Skip invalid GPS data
+        if lat is None or lon is None:
+            return None, None
+
+        ended = None
+        started = None
+
+        # Calculate distance from last point if available
+        distance_moved = 0
+        if self.last_log is not None:
+            distance_moved = haversine_distance(
+                self.last_log['gps_latitude'], self.last_log['gps_longitude'],
+                lat, lon
+            )
+
+        # Check for time gap between logs
+        if self.current_trip is not None and self.last_log_time is not None:
+            time_gap = (timestamp - self.last_log_time).total_seconds()
+
+            # End trip if gap exceeds threshold
+            if time_gap > self.max_stop_duration:
+                ended = self.current_trip
+                self.current_trip = None
+                self.stopped_since = None
+
+        # Determine if vehicle is moving
+        is_moving = speed >= self.min_speed
+
+        # Additional validation: check if actually moved significantly
+        if is_moving and self.last_log is not None:
+            time_delta = (timestamp - self.last_log_time).total_seconds() if self.last_log_time else 1
+            if distance_moved < self.max_stationary_distance and time_delta > 5:
+                is_moving = False
+
+        if is_moving:
+            self.stopped_since = None
+
+            if self.current_trip is None:
+                # Start new trip
+                track = TripTrack()
+                track.append(timestamp, lat, lon, speed, altitude)
+                self.current_trip = {
+                    'start_time': timestamp,
+                    'start_lat': lat,
+                    'start_lon': lon,
+                    'end_time': timestamp,
+                    'end_lat': lat,
+                    'end_lon': lon,
+                    'max_speed': speed,
+                    'total_distance': 0,
+                    'track': track
+                }
+                started = self.current_trip
+            else:
+                # Continue current trip
+                if distance_moved > 0:
+                    self.current_trip['total_distance'] += distance_moved
+
+                self.current_trip['end_time'] = timestamp
+                self.current_trip['end_lat'] = lat
+                self.current_trip['end_lon'] = lon
+                self.current_trip['max_speed'] = max(self.current_trip['max_speed'], speed)
+                self.current_trip['track'].append(timestamp, lat, lon, speed, altitude)
+        else:
+            # Vehicle stopped or stationary
+            if self.current_trip is not None:
+                if self.stopped_since is None:
+                    self.stopped_since = timestamp
+
+                stop_duration = (timestamp - self.stopped_since).total_seconds()
+                if stop_duration > self.max_stop_duration:
+                    ended = self.current_trip
+                    self.current_trip = None
+                    self.stopped_since = None
+
+        self.last_log = log
+        self.last_log_time = timestamp
+
+        return ended, started
+
+class OnlineTripDetector:
+    """
+    Trip detection fed directly by the sampler, one frame at a time.
+
+    Runs the same state machine as TripDetector.detect_trips without reading
+    MongoDB, keeps today's odometer, and reports trip-started and
+    trip-ended events to listeners. Add it to Sampler's processors.
+    """
+
+    # Fields written into every frame by process()
+    KEYS = ('odometer_today', 'trip_active', 'trip_distance')
+
+    # Frame fields kept for each trip point
+    POINT_KEYS = ('timestamp', 'gps_latitude', 'gps_longitude', 'gps_speed', 'gps_altitude')
+
+    def __init__(self,
+                 min_speed: float = 1.0,
+                 max_stop_duration: int = 300,
+                 min_trip_distance: float = 200,
+                 min_trip_duration: int = 60,
+                 max_stationary_distance: float = 10,
+                 listeners: List[Callable[[str, Dict], None]] = None):
+        """
+        Parameters:
+        - min_speed .. max_stationary_distance: Same meaning as in detect_trips()
+        - listeners: Callables invoked as listener(event, trip) with event
+          'trip_started' (raw trip) or 'trip_ended' (finalized trip)
+        """
+        self.machine = TripStateMachine(min_speed, max_stop_duration, max_stationary_distance)
+        self.min_trip_distance = min_trip_distance
+        self.min_trip_duration = min_trip_duration
+        self.listeners = listeners or []
+
+        self.day_start = None
+        self.day_end = None
+        self.trips_today = []
+        self.completed_distance = 0  # meters, ended trips today (too short to keep or not)
+        self.carried_distance = 0  # meters the current trip covered before today
+        self.next_trip_id = 1
+
+    def _emit(self, event: str, trip: Dict):
+        for listener in self.listeners:
+            try:
+                listener(event, trip)
+            except Exception as e:
+                print(f"[ERROR] Trip listener failed: {e}")
+
+    def _roll_day(self, timestamp: datetime):
+        """Reset the daily totals when a frame falls outside the current day"""
+        if timestamp.tzinfo is None:
+            # MongoDB returns naive UTC datetimes
+            timestamp = timestamp.replace(tzinfo=UTC)
+        if self.day_start is not None and self.day_start <= timestamp < self.day_end:
+            return
+        self.day_start, self.day_end = Today.day_range_for(timestamp)
+        self.trips_today = []
+        self.completed_distance = 0
+        current_trip = self.machine.current_trip
+        self.carried_distance = current_trip['total_distance'] if current_trip else 0
+
+    def update(self, frame: Dict) -> List[Tuple[str, Dict]]:
+        """
+        Feed one sampled frame
+
+        Returns:
+        - List of (event, trip) tuples produced by this frame
+        """
+        timestamp = frame.get('timestamp')
+        if not isinstance(timestamp, datetime):
+            return []
+        self._roll_day(timestamp)
+
+        events = []
+        # The sampler reuses its frame dict, so keep a copy of what we need
+        point = {key: frame[key] for key in self.POINT_KEYS if key in frame}
+        ended, started = self.machine.step(point)
+        if ended is not None:
+            # The distance was driven even if the trip is too short to keep,
+            # and odometer() already counted it, so it must not go backwards
+            self.completed_distance += ended['total_distance'] - self.carried_distance
+            self.carried_distance = 0
+            trip = finalize_trip(ended, self.next_trip_id,
+                                 self.min_trip_distance, self.min_trip_duration)
+            if trip is not None:
+                self.next_trip_id += 1
+                self.trips_today.append(trip)
+                events.append(('trip_ended', trip))
+        if started is not None:
+            events.append(('trip_started', started))
+
+        for event, trip in events:
+            self._emit(event, trip)
+        return events
+
+    @property
+    def currently_travelling(self) -> bool:
+        return self.machine.current_trip is not None
+
+    def odometer(self) -> float:
+        """Distance travelled today in meters, including the trip in progress"""
+        current_trip = self.machine.current_trip
+        if current_trip is None:
+            return self.completed_distance
+        return self.completed_distance + current_trip['total_distance'] - self.carried_distance
+
+    def process(self, values: Dict):
+        """Sampler processor hook: update state and add the trip fields to the frame"""
+        self.update(values)
+        current_trip = self.machine.current_trip
+        values['odometer_today'] = round(self.odometer() / 1000, 2)
+        values['trip_active'] = current_trip is not None
+        values['trip_distance'] = round(current_trip['total_distance'], 1) if current_trip else 0
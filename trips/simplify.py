@@ -0,0 +1,88 @@
+from typing import Tuple
+import numpy as np
+from helpers.geo import EARTH_RADIUS_M
+from trips.track import TripTrack
+
+def project_meters(lats: np.ndarray, lons: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Project coordinates to local x/y meters around their mean latitude
+
+    Equirectangular, which is accurate to well under a meter over the
+    extent of a single trip.
+    """
+    phi0 = np.radians(lats.mean()) if len(lats) else 0.0
+    x = np.radians(lons) * EARTH_RADIUS_M * np.cos(phi0)
+    y = np.radians(lats) * EARTH_RADIUS_M
+    return x, y
+
+def _segment_distances(x: np.ndarray, y: np.ndarray, first: int, last: int) -> np.ndarray:
+    """Distance in meters of points first+1..last-1 from the segment first-last"""
+    px, py = x[first + 1:last] - x[first], y[first + 1:last] - y[first]
+    dx, dy = x[last] - x[first], y[last] - y[first]
+    length_sq = dx * dx + dy * dy
+    if length_sq == 0:
+        return np.hypot(px, py)
+    along = np.clip((px * dx + py * dy) / length_sq, 0, 1)
+    return np.hypot(px - along * dx, py - along * dy)
+
+def douglas_peucker(x: np.ndarray, y: np.ndarray, tolerance: float) -> Tuple[np.ndarray, float]:
+    """
+    Douglas-Peucker line simplification
+
+    Parameters:
+    - x, y: Point coordinates in meters
+    - tolerance: Maximum distance of a dropped point from the simplified line
+
+    Returns:
+    - Indices of the kept points, in order
+    - Largest distance of any dropped point from the simplified line
+    """
+    n = len(x)
+    if n < 3:
+        return np.arange(n), 0.0
+
+    keep = np.zeros(n, dtype=bool)
+    keep[0] = keep[-1] = True
+    max_error = 0.0
+    stack = [(0, n - 1)]
+    while stack:
+        first, last = stack.pop()
+        if last - first < 2:
+            continue
+        distances = _segment_distances(x, y, first, last)
+        farthest = int(distances.argmax())
+        if distances[farthest] > tolerance:
+            split = first + 1 + farthest
+            keep[split] = True
+            stack.append((first, split))
+            stack.append((split, last))
+        else:
+            max_error = max(max_error, float(distances[farthest]))
+    return np.flatnonzero(keep), max_error
+
+def simplify_track(track: TripTrack, tolerance: float) -> Tuple[TripTrack, float]:
+    """
+    Drop track points that lie within `tolerance` meters of the simplified path
+
+    The first and last points are always kept, so start/end times and
+    locations are unchanged.
+
+    Parameters:
+    - track: Trip track
+    - tolerance: Error bound in meters (0 or less returns the track unchanged)
+
+    Returns:
+    - Simplified track
+    - Largest distance in meters of a dropped point from the simplified path
+    """
+    if tolerance <= 0 or len(track) < 3:
+        return track, 0.0
+    lats = np.frombuffer(track.lats, dtype=np.float64)
+    lons = np.frombuffer(track.lons, dtype=np.float64)
+    x, y = project_meters(lats, lons)
+    kept, max_error = douglas_peucker(x, y, tolerance)
+    timestamps = np.frombuffer(track.timestamps, dtype=np.int64)
+    speeds = np.frombuffer(track.speeds, dtype=np.float64)
+    altitudes = np.frombuffer(track.altitudes, dtype=np.float64)
+    return TripTrack.from_arrays(timestamps[kept], lats[kept], lons[kept], speeds[kept],
+                                 altitudes[kept]), max_error
@@ -0,0 +1,183 @@
+import math
+from typing import Dict, List, Optional, Tuple
+from helpers.geo import EARTH_RADIUS_M
+
+_BASE32 = '0123456789bcdefghjkmnpqrstuvwxyz'
+
+# Geohash length stored for trip endpoints: cells of roughly 150 x 150 m
+PLACE_PRECISION = 7
+
+# Tolerance (meters) of the simplified route stored for "passed near" queries
+ROUTE_TOLERANCE_M = 20
+
+def encode_geohash(lat: float, lon: float, precision: int = PLACE_PRECISION) -> str:
+    """Geohash of a coordinate; nearby points share a prefix"""
+    lat_range = [-90.0, 90.0]
+    lon_range = [-180.0, 180.0]
+    chars = []
+    bits = 0
+    value = 0
+    even = True
+    while len(chars) < precision:
+        interval, coordinate = (lon_range, lon) if even else (lat_range, lat)
+        middle = (interval[0] + interval[1]) / 2
+        value <<= 1
+        if coordinate >= middle:
+            value |= 1
+            interval[0] = middle
+        else:
+            interval[1] = middle
+        even = not even
+        bits += 1
+        if bits == 5:
+            chars.append(_BASE32[value])
+            bits = 0
+            value = 0
+    return ''.join(chars)
+
+def decode_geohash(geohash: str) -> Tuple[float, float]:
+    """Center (lat, lon) of a geohash cell"""
+    lat_range = [-90.0, 90.0]
+    lon_range = [-180.0, 180.0]
+    even = True
+    for char in geohash:
+        value = _BASE32.index(char)
+        for shift in range(4, -1, -1):
+            interval = lon_range if even else lat_range
+            middle = (interval[0] + interval[1]) / 2
+            if value >> shift & 1:
+                interval[0] = middle
+            else:
+                interval[1] = middle
+            even = not even
+    return (lat_range[0] + lat_range[1]) / 2, (lon_range[0] + lon_range[1]) / 2
+
+def geojson_point(lat: float, lon: float) -> Dict:
+    return {'type': 'Point', 'coordinates': [lon, lat]}
+
+def route_geometry(track, tolerance: float = ROUTE_TOLERANCE_M) -> Optional[Dict]:
+    """
+    Simplified track as a GeoJSON LineString for the 2dsphere index
+
+    Returns None when the track has fewer than two distinct points, which
+    MongoDB cannot index as a line.
+    """
+    from trips.simplify import simplify_track  # NumPy, only when a trip is saved
+
+    simplified, _ = simplify_track(track, tolerance)
+    coordinates = []
+    for lon, lat in zip(simplified.lons, simplified.lats):
+        if not coordinates or coordinates[-1] != [lon, lat]:
+            coordinates.append([lon, lat])
+    if len(coordinates) < 2:
+        return None
+    return {'type': 'LineString', 'coordinates': coordinates}
+
+def spatial_fields(trip: Dict) -> Dict:
+    """Indexed location fields stored with a finalized trip"""
+    start, end = trip['start_location'], trip['end_location']
+    fields = {
+        'start_point': geojson_point(start['lat'], start['lon']),
+        'end_point': geojson_point(end['lat'], end['lon']),
+        'start_geohash': encode_geohash(start['lat'], start['lon']),
+        'end_geohash': encode_geohash(end['lat'], end['lon'])
+    }
+    route = route_geometry(trip['track']) if len(trip['track']) else None
+    if route is not None:
+        fields['route'] = route
+    return fields
+
+# Stored fields searched by each `where` option of the queries below
+WHERE_FIELDS = {
+    'start': ('start_point',),
+    'end': ('end_point',),
+    'endpoint': ('start_point', 'end_point'),
+    'route': ('route',)
+}
+
+def _any_of(where: str, condition: Dict) -> Dict:
+    if where not in WHERE_FIELDS:
+        raise ValueError(f"Unknown location {where!r}, expected one of {', '.join(WHERE_FIELDS)}")
+    fields = WHERE_FIELDS[where]
+    if len(fields) == 1:
+        return {fields[0]: condition}
+    return {'$or': [{field: condition} for field in fields]}
+
+def radius_query(lat: float, lon: float, radius_m: float, where: str = 'endpoint') -> Dict:
+    """Trips whose start/end point or route comes within radius_m of a location"""
+    condition = {'$geoWithin': {'$centerSphere': [[lon, lat], radius_m / EARTH_RADIUS_M]}}
+    if where == 'route':
+        # A line is rarely *within* a circle; ask for any intersection instead
+        condition = {'$geoIntersects': {'$geometry': _circle(lat, lon, radius_m)}}
+    return _any_of(where, condition)
+
+def box_query(min_lat: float, min_lon: float, max_lat: float, max_lon: float,
+              where: str = 'endpoint') -> Dict:
+    """Trips whose start/end point or route lies in (or crosses) a bounding box"""
+    ring = [[min_lon, min_lat], [max_lon, min_lat], [max_lon, max_lat],
+            [min_lon, max_lat], [min_lon, min_lat]]
+    polygon = {'type': 'Polygon', 'coordinates': [ring]}
+    operator = '$geoIntersects' if where == 'route' else '$geoWithin'
+    return _any_of(where, {operator: {'$geometry': polygon}})
+
+def _circle(lat: float, lon: float, radius_m: float, sides: int = 32) -> Dict:
+    """Polygon approximating a circle, for intersecting routes"""
+    ring = []
+    for i in range(sides):
+        angle = 2 * math.pi * i / sides
+        d_lat = radius_m * math.cos(angle) / EARTH_RADIUS_M
+        d_lon = radius_m * math.sin(angle) / (EARTH_RADIUS_M * math.cos(math.radians(lat)))
+        ring.append([lon + math.degrees(d_lon), lat + math.degrees(d_lat)])
+    ring.append(ring[0])
+    return {'type': 'Polygon', 'coordinates': [ring]}
+
+def place_updates(trip_fields: Dict, sign: int = 1) -> List[Tuple[str, Dict]]:
+    """
+    Counter updates for the `trip_places` collection
+
+    Returns:
+    - List of (geohash, $inc document) for the trip's start and end cells
+    """
+    updates = []
+    for role in ('start', 'end'):
+        geohash = trip_fields.get(f'{role}_geohash')
+        if geohash is None:
+            continue
+        lon, lat = trip_fields[f'{role}_point']['coordinates']
+        updates.append((geohash, {
+            f'{role}s': sign, 'visits': sign,
+            'lat_sum': sign * lat, 'lon_sum': sign * lon
+        }))
+    return updates
+
+def frequent_places_pipeline(precision: int = PLACE_PRECISION, limit: int = 10,
+                             min_visits: int = 1, vehicle: str = None) -> List[Dict]:
+    """
+    Aggregation over one vehicle's `trip_places` merging cells into coarser geohash prefixes
+
+    Each result has the prefix, visit/start/end counts and the mean location
+    of the trip endpoints in it.
+    """
+    return [
+        {'$match': {'vehicle_id': vehicle, 'visits': {'$gt': 0}}},
+        {'$group': {
+            '_id': {'$substrBytes': ['$geohash', 0, precision]},
+            'visits': {'$sum': '$visits'},
+            'starts': {'$sum': '$starts'},
+            'ends': {'$sum': '$ends'},
+            'lat_sum': {'$sum': '$lat_sum'},
+            'lon_sum': {'$sum': '$lon_sum'}
+        }},
+        {'$match': {'visits': {'$gte': min_visits}}},
+        {'$sort': {'visits': -1}},
+        {'$limit': limit},
+        {'$project': {
+            '_id': 0,
+            'geohash': '$_id',
+            'visits': 1,
+            'starts': 1,
+            'ends': 1,
+            'lat': {'$divide': ['$lat_sum', '$visits']},
+            'lon': {'$divide': ['$lon_sum', '$visits']}
+        }}
+    ]
@@ -0,0 +1,297 @@
+import os
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional
+import pymongo
+from helpers.vehicle import vehicle_id
+from trips.fingerprint import route_fingerprint, band_keys, similarity
+from trips.spatial import spatial_fields, place_updates, radius_query, box_query, frequent_places_pipeline, PLACE_PRECISION
+from trips.track import TripTrack, to_epoch_us
+
+class TripStore:
+    """
+    Finalized trips in the `trips` collection plus the detector's resume state.
+
+    Everything is per vehicle: trips are keyed by (vehicle_id, start time),
+    so re-detecting a range overwrites the same documents instead of adding
+    duplicates and vehicles sharing a database never collide; place counts,
+    the checkpoint and every query are scoped to the store's vehicle. Tracks can be simplified
+    before saving; the tolerance and the resulting error are stored in
+    the trip's `track_simplification`.
+
+    Each trip also stores GeoJSON start/end points and a simplified route
+    (2dsphere indexed) plus endpoint geohashes, and `trip_places` keeps
+    per-geohash-cell visit counts so frequent places never scan trips.
+    A MinHash route fingerprint with indexed LSH band keys finds earlier
+    trips along the same route.
+    """
+
+    STATE_ID = 'trip_detector'
+
+    def __init__(self, db, track_tolerance: float = None, vehicle: str = None):
+        """
+        Parameters:
+        - db: pymongo Database holding the logs
+        - track_tolerance: Douglas-Peucker tolerance in meters for saved
+          tracks (default: TRIP_TRACK_TOLERANCE_M, 0 keeps every point)
+        - vehicle: Vehicle whose trips are stored and read (default: vehicle_id())
+        """
+        self.vehicle_id = vehicle or vehicle_id()
+        self.scope = {'vehicle_id': self.vehicle_id}
+        self.state_id = f"{self.STATE_ID}:{self.vehicle_id}"
+        self.trips = db['trips']
+        self.state = db['trip_detector_state']
+        self.places = db['trip_places']
+        if track_tolerance is None:
+            track_tolerance = float(os.environ.get('TRIP_TRACK_TOLERANCE_M', 0))
+        self.track_tolerance = track_tolerance
+
+    def _to_document(self, trip: Dict) -> Dict:
+        doc = {key: value for key, value in trip.items() if key != 'track'}
+        doc['vehicle_id'] = self.vehicle_id
+        doc['_id'] = self.trip_id(trip)
+        doc.update(spatial_fields(trip))
+        doc.update(route_fingerprint(trip['track']) or {})
+        track = trip['track']
+        if self.track_tolerance > 0:
+            from trips.simplify import simplify_track  # NumPy, only when enabled
+            simplified, max_error = simplify_track(track, self.track_tolerance)
+            doc['track_simplification'] = {
+                'tolerance_m': self.track_tolerance,
+                'max_error_m': max_error,
+                'points': len(simplified)
+            }
+            track = simplified
+        doc['track'] = track.to_dict()
+        return doc
+
+    def trip_id(self, trip: Dict) -> Dict:
+        """`_id` of a trip of this vehicle"""
+        return {'vehicle_id': self.vehicle_id, 'start_time': trip['start_time']}
+
+    def _from_document(self, doc: Dict) -> Dict:
+        trip = {key: value for key, value in doc.items() if key != '_id'}
+        trip['track'] = TripTrack.from_dict(doc.get('track', {}))
+        return trip
+
+    def save_trip(self, trip: Dict):
+        """Insert or replace a finalized trip and update the place counts"""
+        doc = self._to_document(trip)
+        previous = self.trips.find_one_and_replace(
+            {'_id': doc['_id']}, doc, upsert=True,
+            projection={'start_point': 1, 'end_point': 1, 'start_geohash': 1, 'end_geohash': 1}
+        )
+        updates = place_updates(doc)
+        if previous is not None:
+            updates += place_updates(previous, sign=-1)
+        for geohash, increments in updates:
+            self.places.update_one(
+                {'_id': f"{self.vehicle_id}:{geohash}"},
+                {'$inc': increments, '$setOnInsert': {'vehicle_id': self.vehicle_id, 'geohash': geohash}},
+                upsert=True
+            )
+
+    def find_trips(self, start_date: datetime = None, end_date: datetime = None,
+                   include_track: bool = True) -> List[Dict]:
+        """
+        Trips that started in [start_date, end_date], oldest first
+
+        Parameters:
+        - start_date/end_date: Optional bounds on the trip start time
+        - include_track: Set to False to skip loading the point arrays
+        """
+        return list(self.iter_trips(start_date, end_date, include_track))
+
+    def iter_trips(self, start_date: datetime = None, end_date: datetime = None,
+                   include_track: bool = True) -> Iterator[Dict]:
+        """Same as find_trips(), but yields trips one at a time from the cursor"""
+        query = dict(self.scope)
+        if start_date or end_date:
+            query['start_time'] = {}
+            if start_date:
+                query['start_time']['$gte'] = start_date
+            if end_date:
+                query['start_time']['$lte'] = end_date
+        projection = None if include_track else {'track': 0, 'route': 0}
+        for doc in self.trips.find(query, projection).sort('start_time', pymongo.ASCENDING):
+            if include_track:
+                yield self._from_document(doc)
+            else:
+                yield {key: value for key, value in doc.items() if key != '_id'}
+
+    def save_state(self, last_processed_timestamp: datetime, next_trip_id: int,
+                   current_incomplete_trip: Optional[Dict]):
+        """Checkpoint the detector so a restart resumes after the last processed log"""
+        incomplete = None
+        if current_incomplete_trip is not None:
+            incomplete = dict(current_incomplete_trip)
+            incomplete['track'] = current_incomplete_trip['track'].to_dict()
+        self.state.replace_one(
+            {'_id': self.state_id},
+            {
+                '_id': self.state_id,
+                'vehicle_id': self.vehicle_id,
+                'last_processed_timestamp': last_processed_timestamp,
+                'next_trip_id': next_trip_id,
+                'current_incomplete_trip': incomplete
+            },
+            upsert=True
+        )
+
+    def reserve_trip_ids(self, count: int) -> int:
+        """
+        Take `count` consecutive trip IDs from the checkpoint's next_trip_id
+
+        For trips saved outside the detector (trips.backfill), so they
+        don't reuse the detector's numbers. The counter is advanced with
+        one atomic $inc; the rest of the checkpoint is left alone.
+
+        Returns:
+        - The first reserved ID
+        """
+        self.state.update_one(
+            {'_id': self.state_id},
+            {'$setOnInsert': {'vehicle_id': self.vehicle_id, 'last_processed_timestamp': None,
+                              'next_trip_id': 1, 'current_incomplete_trip': None}},
+            upsert=True
+        )
+        state = self.state.find_one_and_update(
+            {'_id': self.state_id}, {'$inc': {'next_trip_id': count}},
+            return_document=pymongo.ReturnDocument.BEFORE
+        )
+        return state['next_trip_id']
+
+    def load_state(self) -> Optional[Dict]:
+        """
+        Returns:
+        - Dict with last_processed_timestamp, next_trip_id and
+          current_incomplete_trip, or None if nothing was checkpointed
+        """
+        state = self.state.find_one({'_id': self.state_id})
+        if state is None:
+            return None
+        incomplete = state.get('current_incomplete_trip')
+        if incomplete is not None:
+            incomplete['track'] = TripTrack.from_dict(incomplete['track'])
+        return {
+            'last_processed_timestamp': state.get('last_processed_timestamp'),
+            'next_trip_id': state.get('next_trip_id', 1),
+            'current_incomplete_trip': incomplete
+        }
+
+    def trips_near(self, lat: float, lon: float, radius_m: float, where: str = 'endpoint',
+                   include_track: bool = False) -> List[Dict]:
+        """
+        Trips that started, ended or passed within radius_m of a location
+
+        Parameters:
+        - lat/lon: Center of the search
+        - radius_m: Search radius in meters
+        - where: 'start', 'end', 'endpoint' (either) or 'route'
+        - include_track: Also load the point arrays
+        """
+        return self._find_spatial(radius_query(lat, lon, radius_m, where), include_track)
+
+    def trips_in_box(self, min_lat: float, min_lon: float, max_lat: float, max_lon: float,
+                     where: str = 'endpoint', include_track: bool = False) -> List[Dict]:
+        """Trips that started, ended or passed inside a bounding box (see trips_near)"""
+        return self._find_spatial(box_query(min_lat, min_lon, max_lat, max_lon, where), include_track)
+
+    def _find_spatial(self, query: Dict, include_track: bool) -> List[Dict]:
+        projection = None if include_track else {'track': 0, 'route': 0}
+        cursor = self.trips.find(dict(query, **self.scope), projection).sort('start_time', pymongo.ASCENDING)
+        if include_track:
+            return [self._from_document(doc) for doc in cursor]
+        return [{key: value for key, value in doc.items() if key != '_id'} for doc in cursor]
+
+    def frequent_places(self, precision: int = PLACE_PRECISION - 1, limit: int = 10,
+                        min_visits: int = 2) -> List[Dict]:
+        """
+        Most visited trip start/end locations
+
+        Parameters:
+        - precision: Geohash length to cluster by (6 is about 1.2 x 0.6 km,
+          7 about 150 x 150 m)
+        - limit: Number of places to return
+        - min_visits: Ignore places with fewer trip starts and ends
+
+        Returns:
+        - List of dicts with geohash, visits, starts, ends, lat and lon
+        """
+        if precision >= PLACE_PRECISION:
+            # Stored cells need no merging; read them straight off the visits index
+            query = dict(self.scope, visits={'$gte': min_visits})
+            cursor = self.places.find(query).sort('visits', pymongo.DESCENDING).limit(limit)
+            return [{
+                'geohash': doc['geohash'], 'visits': doc['visits'],
+                'starts': doc.get('starts', 0), 'ends': doc.get('ends', 0),
+                'lat': doc['lat_sum'] / doc['visits'], 'lon': doc['lon_sum'] / doc['visits']
+            } for doc in cursor]
+        return list(self.places.aggregate(frequent_places_pipeline(precision, limit, min_visits, self.vehicle_id)))
+
+    def similar_trips(self, trip: Dict, min_similarity: float = 0.5,
+                      same_direction: bool = True) -> List[Dict]:
+        """
+        Other stored trips along the same route, oldest first
+
+        Candidates come from the route_bands index, so only trips sharing
+        an LSH band are compared.
+
+        Parameters:
+        - trip: A finalized or stored trip
+        - min_similarity: Minimum estimated Jaccard similarity of the routes
+        - same_direction: Also require matching start and end areas, so the
+          commute home is not mixed with the commute to work
+
+        Returns:
+        - Trips without tracks, each with its 'route_similarity'
+        """
+        signature = trip.get('route_signature')
+        if signature is None:
+            fingerprint = route_fingerprint(trip['track'])
+            if fingerprint is None:
+                return []
+            signature = fingerprint['route_signature']
+
+        query = dict(self.scope, route_bands={'$in': band_keys(signature)}, _id={'$ne': self.trip_id(trip)})
+        projection = {'track': 0, 'route': 0}
+        matches = []
+        for doc in self.trips.find(query, projection):
+            score = similarity(signature, doc['route_signature'])
+            if score < min_similarity:
+                continue
+            if same_direction and not self._same_direction(trip, doc):
+                continue
+            doc = {key: value for key, value in doc.items() if key != '_id'}
+            doc['route_similarity'] = score
+            matches.append(doc)
+        matches.sort(key=lambda doc: to_epoch_us(doc['start_time']))
+        return matches
+
+    @staticmethod
+    def _same_direction(trip: Dict, other: Dict) -> bool:
+        """Start and end within the same ~1 km geohash cells"""
+        prefix = PLACE_PRECISION - 1
+        fields = trip if 'start_geohash' in trip else spatial_fields(trip)
+        return (fields['start_geohash'][:prefix] == other.get('start_geohash', '')[:prefix] and
+                fields['end_geohash'][:prefix] == other.get('end_geohash', '')[:prefix])
+
+    def route_durations(self, trip: Dict, min_similarity: float = 0.5) -> List[Dict]:
+        """
+        Duration trend of a repeated route: one entry per similar trip, the trip included
+
+        Returns:
+        - List of dicts with start_time, duration_seconds,
+          total_distance_meters and route_similarity, oldest first
+        """
+        keys = ('start_time', 'duration_seconds', 'total_distance_meters')
+        history = [{**{key: doc[key] for key in keys}, 'route_similarity': doc['route_similarity']}
+                   for doc in self.similar_trips(trip, min_similarity)]
+        history.append({**{key: trip[key] for key in keys}, 'route_similarity': 1.0})
+        history.sort(key=lambda entry: to_epoch_us(entry['start_time']))
+        return history
+
+    def clear(self):
+        """Remove this vehicle's stored trips, place counts and checkpoint"""
+        self.trips.delete_many(self.scope)
+        self.places.delete_many(self.scope)
+        self.state.delete_one({'_id': self.state_id})
@@ -0,0 +1,153 @@
+import argparse
+import itertools
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from typing import Dict, Iterable, List
+import numpy as np
+from loggers.mongodb import MongoClient, vehicle_filter, GPS_FIX_FILTER
+from trips.backfill import DEFAULT_PARAMS, _local_date
+from trips.batch import FIELDS, to_columns, point_deltas, classify_points, group_trips
+
+# Thresholds that change where trips split; the rest only filter trips
+SEGMENT_KEYS = ('min_speed', 'max_stop_duration', 'max_stationary_distance')
+
+def prepare(logs: List[Dict]) -> Dict[str, np.ndarray]:
+    """
+    Column arrays plus per-point distances and gaps, shared by every parameter set
+
+    Parameters:
+    - logs: Logs sorted by timestamp
+    """
+    columns = to_columns(logs)
+    columns['distance'], columns['gap_us'] = point_deltas(columns)
+    del columns['index']
+    return columns
+
+def load(start: datetime = None, end: datetime = None, collection=None, vehicle: str = None) -> Dict[str, np.ndarray]:
+    """Query one vehicle's logs once and prepare them (see prepare())"""
+    if collection is None:
+        _, _, collection = MongoClient()
+    query = dict(GPS_FIX_FILTER, **vehicle_filter(vehicle))
+    if start or end:
+        query['timestamp'] = {}
+        if start:
+            query['timestamp']['$gte'] = start
+        if end:
+            query['timestamp']['$lte'] = end
+    projection = {field: 1 for field in FIELDS}
+    return prepare(list(collection.find(query, projection).sort('timestamp', 1)))
+
+def parameter_grid(**values: Iterable) -> List[Dict]:
+    """
+    Every combination of the given threshold values, defaults for the rest
+
+    Example: parameter_grid(min_speed=[0.5, 1, 2], max_stop_duration=[120, 300])
+    """
+    unknown = set(values) - set(DEFAULT_PARAMS)
+    if unknown:
+        raise ValueError(f"Unknown parameters: {', '.join(sorted(unknown))}")
+    keys = list(values)
+    return [{**DEFAULT_PARAMS, **dict(zip(keys, combination))}
+            for combination in itertools.product(*(values[key] for key in keys))]
+
+def _segments(data: Dict[str, np.ndarray], params: Dict):
+    """Per-trip distance (m) and duration (s) before the minimum filters"""
+    moving, gap = classify_points(data, data['distance'], data['gap_us'], params['min_speed'],
+                                  params['max_stop_duration'], params['max_stationary_distance'])
+    moving_index, starts, ends, _ = group_trips(data['t'], moving, gap, params['max_stop_duration'])
+    if len(starts) == 0:
+        return np.zeros(0), np.zeros(0)
+    # Same arithmetic as build_raw_trips and finalize_trip
+    cumulative = np.cumsum(data['distance'][moving_index])
+    distances = cumulative[ends - 1] - cumulative[starts]
+    times = data['t'][moving_index]
+    durations = (times[ends - 1] - times[starts]) / 1e6
+    return distances, durations
+
+def _summary(params: Dict, distances: np.ndarray, durations: np.ndarray) -> Dict:
+    valid = (distances >= params['min_trip_distance']) & (durations >= params['min_trip_duration'])
+    return {
+        **params,
+        'trip_count': int(valid.sum()),
+        'total_distance_meters': float(distances[valid].sum()),
+        'total_duration_seconds': float(durations[valid].sum()),
+        'rejected_trips': int((~valid).sum())
+    }
+
+def _evaluate_group(data: Dict[str, np.ndarray], parameter_sets: List[Dict]) -> List[Dict]:
+    """Segment once for parameter sets that share SEGMENT_KEYS, then filter for each"""
+    distances, durations = _segments(data, parameter_sets[0])
+    return [_summary(params, distances, durations) for params in parameter_sets]
+
+def evaluate(data: Dict[str, np.ndarray], params: Dict) -> Dict:
+    """
+    Trip count and totals for one parameter set
+
+    Gives the same trips as detect_trips(use_cache=False) over the prepared logs.
+    """
+    return _evaluate_group(data, [{**DEFAULT_PARAMS, **params}])[0]
+
+# Prepared data of a worker process, sent once by the pool initializer
+_worker_data = None
+
+def _init_worker(data):
+    global _worker_data
+    _worker_data = data
+
+def _evaluate_in_worker(parameter_sets):
+    return _evaluate_group(_worker_data, parameter_sets)
+
+def sweep(data: Dict[str, np.ndarray], parameter_sets: List[Dict], workers: int = 1) -> List[Dict]:
+    """
+    Evaluate many parameter sets against the same prepared logs
+
+    Parameter sets that only differ in min_trip_distance/min_trip_duration
+    share one segmentation. With workers > 1 the groups are spread over a
+    process pool that receives the prepared arrays once per process.
+
+    Returns:
+    - One summary per parameter set, in the given order
+    """
+    parameter_sets = [{**DEFAULT_PARAMS, **params} for params in parameter_sets]
+    groups = {}
+    for position, params in enumerate(parameter_sets):
+        key = tuple(params[k] for k in SEGMENT_KEYS)
+        groups.setdefault(key, []).append(position)
+    batches = [[parameter_sets[position] for position in positions] for positions in groups.values()]
+
+    if workers == 1 or len(batches) == 1:
+        results = [_evaluate_group(data, batch) for batch in batches]
+    else:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(data,)) as pool:
+            results = list(pool.map(_evaluate_in_worker, batches))
+
+    summaries = [None] * len(parameter_sets)
+    for positions, batch_results in zip(groups.values(), results):
+        for position, summary in zip(positions, batch_results):
+            summaries[position] = summary
+    return summaries
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Compare trip detection thresholds on the same logs")
+    parser.add_argument('--start', type=_local_date, help="first day (YYYY-MM-DD, local)")
+    parser.add_argument('--end', type=_local_date, help="last moment to include (YYYY-MM-DD, local)")
+    parser.add_argument('--workers', type=int, default=os.cpu_count())
+    parser.add_argument('--vehicle', help="vehicle whose logs are loaded (default: VEHICLE_ID)")
+    for key, default in DEFAULT_PARAMS.items():
+        parser.add_argument(f"--{key.replace('_', '-')}", type=float, nargs='+', default=[default])
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    data = load(args.start, args.end, vehicle=args.vehicle)
+    loaded = time.perf_counter() - started
+    grid = parameter_grid(**{key: getattr(args, key) for key in DEFAULT_PARAMS})
+    summaries = sweep(data, grid, args.workers)
+    elapsed = time.perf_counter() - started - loaded
+    print(f"[OK] {len(data['t'])} points loaded in {loaded:.1f}s, {len(grid)} parameter sets in {elapsed:.1f}s")
+
+    columns = list(DEFAULT_PARAMS) + ['trip_count', 'total_distance_meters']
+    print('  '.join(f"{column:>14.14}" for column in columns))
+    for summary in summaries:
+        print('  '.join(f"{summary[column]:>14.6g}" for column in columns))
@@ -0,0 +1,117 @@
+import math
+from array import array
+from datetime import datetime, timedelta, UTC
+from typing import Dict, Iterator, List
+
+_EPOCH = datetime(1970, 1, 1)
+_EPOCH_UTC = _EPOCH.replace(tzinfo=UTC)
+_MICROSECOND = timedelta(microseconds=1)
+NAN = float('nan')
+
+def to_epoch_us(timestamp: datetime) -> int:
+    """Microseconds since the epoch for an aware, or naive UTC, datetime"""
+    epoch = _EPOCH_UTC if timestamp.tzinfo else _EPOCH
+    return (timestamp - epoch) // _MICROSECOND
+
+def from_epoch_us(us: int) -> datetime:
+    """Aware UTC datetime for microseconds since the epoch"""
+    return _EPOCH_UTC + timedelta(microseconds=int(us))
+
+class TripTrack:
+    """
+    A trip's path as compact typed arrays instead of full log documents.
+
+    Per point this keeps 40 bytes: timestamp (int64 microseconds since the
+    epoch), latitude, longitude, speed and altitude (float64, NaN when the
+    fix had none). Full documents can be loaded on demand with
+    TripDetector.load_points().
+    """
+
+    FIELDS = ('timestamps', 'lats', 'lons', 'speeds', 'altitudes')
+
+    def __init__(self):
+        self.timestamps = array('q')
+        self.lats = array('d')
+        self.lons = array('d')
+        self.speeds = array('d')
+        self.altitudes = array('d')
+
+    def append(self, timestamp: datetime, lat: float, lon: float, speed: float, altitude: float = None):
+        self.timestamps.append(to_epoch_us(timestamp))
+        self.lats.append(lat)
+        self.lons.append(lon)
+        self.speeds.append(speed or 0)
+        self.altitudes.append(NAN if altitude is None else altitude)
+
+    def extend(self, other: 'TripTrack'):
+        """Append another track's points"""
+        for field in self.FIELDS:
+            getattr(self, field).extend(getattr(other, field))
+
+    @classmethod
+    def from_points(cls, points: List[Dict]) -> 'TripTrack':
+        """Build a track from log documents"""
+        track = cls()
+        for point in points:
+            track.append(point['timestamp'], point['gps_latitude'],
+                         point['gps_longitude'], point.get('gps_speed'), point.get('gps_altitude'))
+        return track
+
+    @classmethod
+    def from_arrays(cls, timestamps, lats, lons, speeds, altitudes=None) -> 'TripTrack':
+        """Build a track from NumPy arrays (int64 microseconds, float64 the rest)"""
+        track = cls()
+        track.timestamps.frombytes(timestamps.astype('int64').tobytes())
+        track.lats.frombytes(lats.astype('float64').tobytes())
+        track.lons.frombytes(lons.astype('float64').tobytes())
+        track.speeds.frombytes(speeds.astype('float64').tobytes())
+        if altitudes is None:
+            track.altitudes.extend([NAN] * len(track.timestamps))
+        else:
+            track.altitudes.frombytes(altitudes.astype('float64').tobytes())
+        return track
+
+    def __len__(self) -> int:
+        return len(self.timestamps)
+
+    def __eq__(self, other) -> bool:
+        # Compare bytes so missing (NaN) altitudes compare equal
+        return isinstance(other, TripTrack) and all(
+            getattr(self, field).tobytes() == getattr(other, field).tobytes() for field in self.FIELDS
+        )
+
+    @property
+    def nbytes(self) -> int:
+        return sum(getattr(self, field).itemsize * len(getattr(self, field)) for field in self.FIELDS)
+
+    def times(self) -> Iterator[datetime]:
+        """Point timestamps as aware UTC datetimes"""
+        return (from_epoch_us(us) for us in self.timestamps)
+
+    def points(self) -> List[Dict]:
+        """Lightweight point dicts with the tracked fields only"""
+        return [
+            {'timestamp': t, 'gps_latitude': lat, 'gps_longitude': lon, 'gps_speed': speed,
+             'gps_altitude': None if math.isnan(altitude) else altitude}
+            for t, lat, lon, speed, altitude in zip(self.times(), self.lats, self.lons,
+                                                    self.speeds, self.altitudes)
+        ]
+
+    def to_dict(self) -> Dict:
+        """Plain lists for storage in MongoDB (missing altitudes as None)"""
+        data = {field: getattr(self, field).tolist() for field in self.FIELDS}
+        data['altitudes'] = [None if math.isnan(a) else a for a in data['altitudes']]
+        return data
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> 'TripTrack':
+        track = cls()
+        for field in cls.FIELDS[:-1]:
+            getattr(track, field).extend(data.get(field, []))
+        # Tracks stored before altitude was kept have none
+        altitudes = data.get('altitudes') or [None] * len(track.timestamps)
+        track.altitudes.extend(NAN if a is None else a for a in altitudes)
+        return track
+
+    def __repr__(self) -> str:
+        return f"TripTrack(points={len(self)}, bytes={self.nbytes})"